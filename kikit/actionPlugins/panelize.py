@@ -13,19 +13,32 @@ import json
 import tempfile
 import shutil
 import os
-from threading import Thread
+import multiprocessing
+import sys
 from itertools import chain
 
 PLATFORMS = ["Linux/MacOS", "Windows"]
 
-class ExceptionThread(Thread):
-    def run(self):
-        self.exception = None
-        try:
-            super().run()
-        except Exception as e:
-            self.exception = e
-            self.traceback = traceback.format_exc()
+class PanelizationCancelled(Exception):
+    pass
+
+def pythonExecutable():
+    """
+    Find the Python interpreter for child processes. Inside KiCAD,
+    sys.executable is usually the KiCAD binary itself and the bundled
+    interpreter lives next to it.
+    """
+    executable = sys.executable
+    if os.path.basename(executable).lower().startswith("python"):
+        return executable
+    for name in ["python.exe", "python3", "python"]:
+        candidate = os.path.join(os.path.dirname(executable), name)
+        if os.path.isfile(candidate):
+            return candidate
+    candidate = shutil.which("python3") or shutil.which("python")
+    if candidate is None:
+        raise RuntimeError("Cannot find Python interpreter to run the panelization")
+    return candidate
 
 def replaceExt(file, ext):
     return os.path.splitext(file)[0] + ext
@@ -49,50 +62,70 @@ def presetDifferential(source, target):
     return result
 
 
-def transplateBoard(source, target, update=lambda x: None):
+def transplateBoard(source, target, update=lambda message, fraction: None):
+    """
+    Replace the content of target by the content of source. The items are
+    moved, not copied, so the source board is left empty; keep it alive as it
+    still owns some of the internal structures of the items.
+
+    The progress is reported via update with a message and a fraction of the
+    work done. It is invoked only when the progress advances by at least a
+    percent so it is safe to redraw the UI in it.
+    """
     CLEAR_MSG = "Clearing the old board in UI"
     RENDER_MSG = "Rendering the new board in UI"
 
     target.ClearProject()
     target.DeleteAllFootprints()
 
-    items = chain(
-        list(target.GetDrawings()),
-        list(target.GetFootprints()),
-        list(target.GetTracks()),
-        list(target.Zones()))
-    for x in items:
-        update(CLEAR_MSG)
+    oldItems = list(chain(
+        target.GetDrawings(),
+        target.GetTracks(),
+        target.Zones()))
+    oldNets = list(target.GetNetInfo().NetsByNetcode().values())
+    newItems = list(chain(
+        source.GetDrawings(),
+        source.GetFootprints(),
+        source.GetTracks(),
+        source.Zones()))
+    newNets = [source.GetNetInfo().GetNetItem(netId)
+               for netId in source.GetNetInfo().NetsByNetcode()]
+
+    total = len(oldItems) + len(oldNets) + len(newItems) + len(newNets)
+    step = max(1, total // 100)
+    done = 0
+    def advance(message, count):
+        nonlocal done
+        before = done
+        done += count
+        if done // step != before // step:
+            update(message, done / max(1, total))
+
+    update(CLEAR_MSG, 0)
+    for x in oldItems:
         target.Remove(x)
-
-    for x in list(target.GetNetInfo().NetsByNetcode().values()):
-        update(CLEAR_MSG)
+        advance(CLEAR_MSG, 1)
+    for x in oldNets:
         target.Remove(x)
+        advance(CLEAR_MSG, 1)
 
-    update(RENDER_MSG)
+    update(RENDER_MSG, done / max(1, total))
     target.SetProperties(source.GetProperties())
-    update(RENDER_MSG)
     target.SetPageSettings(source.GetPageSettings())
-    update(RENDER_MSG)
     target.SetTitleBlock(source.GetTitleBlock())
-    for x in source.GetDrawings():
-        update(RENDER_MSG)
-        appendItem(target, x)
-    for x in source.GetFootprints():
-        update(RENDER_MSG)
-        appendItem(target, x)
-    for x in source.GetTracks():
-        update(RENDER_MSG)
-        appendItem(target, x)
-    for x in source.Zones():
-        update(RENDER_MSG)
-        appendItem(target, x)
-
-    update(RENDER_MSG)
+    # Nets go first, so the items find them in the target board
+    for x in newNets:
+        target.Add(x)
+        advance(RENDER_MSG, 1)
+    for x in newItems:
+        source.Remove(x)
+        target.Add(x)
+        advance(RENDER_MSG, 1)
+
     d = target.GetDesignSettings()
     d.CloneFrom(source.GetDesignSettings())
     target.SetEnabledLayers(source.GetEnabledLayers())
-
+    update(RENDER_MSG, 1)
 
 
 def drawTemporaryNotification(board, sourceFilename):
@@ -462,22 +495,80 @@ class PanelizeDialog(wx.Dialog):
                 self.progressDlg.Refresh()
             wx.GetApp().Yield()
 
-    def _panelizationRoutine(self, tempdir, input, panelFile, preset):
-        panelize_ui.doPanelization(input, panelFile, preset)
-
-        # KiCAD 6 does something strange here, so we will load an empty
-        # file if we read it directly, but we can always make a copy and
-        # read that. Copying a file can be lengthy, so we will copy the
-        # file in a thread.
-        copyPanelName = os.path.join(tempdir, "panel-copy.kicad_pcb")
-        shutil.copy(panelFile, copyPanelName)
+    def _updateTransplantProgress(self, message, fraction):
+        if self.progressDlg is not None:
+            self.progressDlg.Update(int(100 * fraction),
+                                    newmsg=f"Running KiKit: {message}")
+        wx.GetApp().Yield()
+
+    def _runPanelizationProcess(self, tempdir, input, panelFile, args):
+        """
+        Run the panelization in a child process, so it does not compete with
+        the UI for the GIL and it can be cancelled. The panel is created in
+        tempdir and copied to panelFile once it is saved. Returns the path to
+        the panel in tempdir and the description of non-fatal errors (or None).
+        """
+        context = multiprocessing.get_context("spawn")
+        context.set_executable(pythonExecutable())
+        tempPanel = os.path.join(tempdir, os.path.basename(panelFile))
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=panelize_ui.panelizationWorker,
+            args=(sender, os.path.abspath(input), tempPanel, args))
+        process.start()
+        sender.close()
+
+        stages = panelize_ui.PANELIZATION_STAGES
+        self.stageTimes = []
+        current, started = "Starting up", time.time()
+        warning = None
         try:
-            shutil.copy(replaceExt(panelFile, ".kicad_pro"), replaceExt(copyPanelName, "kicad_pro"))
-            shutil.copy(replaceExt(panelFile, ".kicad_prl"), replaceExt(copyPanelName, "kicad_prl"))
-        except FileNotFoundError:
-            # We don't care if we didn't manage to copy the files
-            pass
-        self.temporary_panel = pcbnew.LoadBoard(copyPanelName)
+            while True:
+                percent = 0
+                if current in stages:
+                    percent = int(100 * stages.index(current) / len(stages))
+                message = f"Running KiKit: {current} ({percent} %)"
+                if len(self.stageTimes) > 0:
+                    lastStage, lastDuration = self.stageTimes[-1]
+                    message += f"; {lastStage} took {lastDuration:.1f} s"
+                keepGoing, _ = self.progressDlg.Update(percent, newmsg=message)
+                if not keepGoing:
+                    raise PanelizationCancelled()
+                wx.GetApp().Yield()
+
+                if not receiver.poll(1 / 50):
+                    if not process.is_alive() and not receiver.poll():
+                        raise RuntimeError("The panelization process terminated "
+                                           f"unexpectedly (exit code {process.exitcode})")
+                    continue
+                try:
+                    event = receiver.recv()
+                except EOFError:
+                    continue
+                if event[0] == "progress":
+                    _, stage, timestamp = event
+                    self.stageTimes.append((current, timestamp - started))
+                    current, started = stage, timestamp
+                elif event[0] in ["done", "warning"]:
+                    self.stageTimes.append((current, time.time() - started))
+                    if event[0] == "warning":
+                        warning = event[1]
+                    break
+                elif event[0] == "error":
+                    _, error, trace = event
+                    print(trace)
+                    raise RuntimeError(error)
+        finally:
+            receiver.close()
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        for stage, duration in self.stageTimes:
+            print(f"KiKit panelization stage {stage}: {duration:.1f} s")
+
+        for ext in [".kicad_pcb", ".kicad_pro", ".kicad_prl", ".kicad_dru"]:
+            if os.path.exists(replaceExt(tempPanel, ext)):
+                shutil.copy(replaceExt(tempPanel, ext), replaceExt(panelFile, ext))
+        return tempPanel, warning
 
     def _pulseWhilePcbnewRefresh(self):
         while not self.refreshDone:
@@ -490,12 +581,14 @@ class PanelizeDialog(wx.Dialog):
             try:
                 self.progressDlg = wx.ProgressDialog(
                     "Running kikit", f"Running KiKit:",
-                    parent=self)
+                    parent=self,
+                    style=wx.PD_APP_MODAL | wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME)
                 self._updatePanelizationProgress("Starting up")
                 self.progressDlg.Show()
 
                 args = self.kikitArgs()
-                preset = obtainPreset([], **args)
+                # Validate the configuration before we spawn the worker
+                obtainPreset([], **args)
                 input = self.sections["Input"].items["Input file"].getValue()
                 if len(input) == 0:
                     dlg = wx.MessageDialog(
@@ -520,28 +613,26 @@ class PanelizeDialog(wx.Dialog):
                     dlg.Destroy()
                     return
 
-                # We run as much as possible in a separate thread to not stall
+                # We run the panelization in a separate process to not stall
                 # the UI...
-                thread = ExceptionThread(target=self._panelizationRoutine,
-                                         args=(dirname, input, panelFile, preset))
-                thread.daemon = True
-                thread.start()
-                while True:
-                    self._updatePanelizationProgress("Panelization")
-                    thread.join(timeout=1 / 50)
-                    if not thread.is_alive():
-                        break
-                if thread.exception:
-                    raise thread.exception
+                tempPanel, warning = self._runPanelizationProcess(dirname, input, panelFile, args)
+                self.temporary_panel = pcbnew.LoadBoard(tempPanel)
 
                 # ...however, transplate board and pcbnew.Refresh has to happen
-                # in the main thread
-                transplateBoard(self.temporary_panel, self.board, self._updatePanelizationProgress)
+                # in the main process
+                transplateBoard(self.temporary_panel, self.board, self._updateTransplantProgress)
                 drawTemporaryNotification(self.board, panelFile)
                 self._updatePanelizationProgress("Pcbnew will now refresh panel, the UI might freeze", force=True)
                 pcbnew.Refresh()
                 self._updatePanelizationProgress("Done", force=True)
                 self.dirty = True
+                if warning is not None:
+                    dlg = wx.MessageDialog(
+                        None, f"The panel was created, but:\n\n{warning}", "Warning", wx.OK)
+                    dlg.ShowModal()
+                    dlg.Destroy()
+            except PanelizationCancelled:
+                pass
             except Exception as e:
                 dlg = wx.MessageDialog(
                     None, f"Cannot perform:\n\n{e}", "Error", wx.OK)
@@ -0,0 +1,363 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# An opt-in, content-addressed cache for outputs of KiKit commands. An entry
+# maps a key (a hash of everything the outputs depend on) to a set of files.
+# The file contents are stored as blobs named after their hash, so identical
+# outputs of different entries are stored only once.
+#
+# Layout of the cache directory:
+#   entries/<key>.json   - relative output paths mapped to blob hashes
+#   blobs/<xx>/<hash>    - file contents
+#   stats.json           - hit/miss counters
+
+PROJECT_SUFFIXES = [".kicad_pro", ".kicad_dru"]
+
+def hashFile(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def hashFiles(paths: Iterable[str]) -> Dict[str, Optional[str]]:
+    """
+    Hash given files; the result is indexed by the file names. Missing files
+    are recorded as None so their later appearance changes the key.
+    """
+    return {os.path.basename(p): hashFile(p) if os.path.isfile(p) else None
+            for p in paths}
+
+def projectFiles(boardFile: str) -> List[str]:
+    """
+    Return the board file and the project files that live next to it.
+    """
+    base = os.path.splitext(boardFile)[0]
+    return [boardFile] + [base + suffix for suffix in PROJECT_SUFFIXES]
+
+def parseSize(size: str) -> int:
+    """
+    Parse a human-readable size (e.g., 500M or 2G) into bytes.
+    """
+    size = str(size).strip().upper()
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    try:
+        if size[-1] in units:
+            return int(float(size[:-1]) * units[size[-1]])
+        return int(size)
+    except (ValueError, IndexError):
+        raise RuntimeError(f"Invalid size '{size}'") from None
+
+def pluginSourceFile(spec: str) -> Optional[str]:
+    """
+    Given a module specification of a plugin (either a path to a Python file or
+    a module name), find its source file without importing it.
+    """
+    import importlib.util
+
+    if spec.endswith(".py"):
+        return spec
+    try:
+        moduleSpec = importlib.util.find_spec(spec)
+    except (ImportError, ValueError):
+        return None
+    if moduleSpec is None or moduleSpec.origin is None or not os.path.isfile(moduleSpec.origin):
+        return None
+    return moduleSpec.origin
+
+def kicadVersion() -> str:
+    """
+    Return the version of KiCAD. Prefer the already imported pcbnew; otherwise,
+    ask kicad-cli so computing a cache key does not import pcbnew.
+    """
+    import sys
+    if "pcbnew" not in sys.modules:
+        import shutil
+        import subprocess
+        kicadCli = shutil.which("kicad-cli")
+        if kicadCli is not None:
+            try:
+                result = subprocess.run([kicadCli, "version"], capture_output=True,
+                                        text=True, timeout=30)
+                if result.returncode == 0 and result.stdout.strip() != "":
+                    return result.stdout.strip()
+            except (OSError, subprocess.SubprocessError):
+                pass
+    import pcbnew
+    return pcbnew.Version()
+
+def kikitVersion() -> str:
+    from kikit import __version__
+    return __version__
+
+def computeKey(description: Any) -> str:
+    """
+    Compute the cache key of a JSON-serializable description of the inputs.
+    """
+    serialized = json.dumps(description, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+def snapshotDirectory(directory: str,
+                      predicate: Callable[[str], bool]=lambda x: True) \
+                        -> Dict[str, Tuple[int, int]]:
+    """
+    Collect (mtime, size) of all files in the directory whose relative path
+    satisfies the predicate.
+    """
+    result = {}
+    if not os.path.isdir(directory):
+        return result
+    for root, _, files in os.walk(directory):
+        for f in files:
+            path = os.path.join(root, f)
+            rel = os.path.relpath(path, directory)
+            if not predicate(rel):
+                continue
+            st = os.stat(path)
+            result[rel] = (st.st_mtime_ns, st.st_size)
+    return result
+
+class BuildCache:
+    """
+    Content-addressed cache of command outputs. maxSize is in bytes, maxAge in
+    seconds since the last use of an entry; None disables the limit.
+    """
+    def __init__(self, directory: str, maxSize: Optional[int]=None,
+                 maxAge: Optional[float]=None):
+        self.directory = directory
+        self.maxSize = maxSize
+        self.maxAge = maxAge
+        os.makedirs(self._entriesDir, exist_ok=True)
+        os.makedirs(self._blobsDir, exist_ok=True)
+
+    @property
+    def _entriesDir(self) -> str:
+        return os.path.join(self.directory, "entries")
+
+    @property
+    def _blobsDir(self) -> str:
+        return os.path.join(self.directory, "blobs")
+
+    def _entryPath(self, key: str) -> str:
+        return os.path.join(self._entriesDir, key + ".json")
+
+    def _blobPath(self, digest: str) -> str:
+        return os.path.join(self._blobsDir, digest[:2], digest)
+
+    def _readEntry(self, key: str) -> Optional[Dict[str, str]]:
+        try:
+            with open(self._entryPath(key), "r", encoding="utf-8") as f:
+                return json.load(f)["files"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _bumpStat(self, name: str) -> None:
+        # The counters are informative only, we do not care about races
+        path = os.path.join(self.directory, "stats.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            stats = {}
+        stats[name] = stats.get(name, 0) + 1
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(stats, f)
+        except OSError:
+            pass
+
+    def restore(self, key: str, destination: str) -> bool:
+        """
+        Restore outputs of the entry into destination. Returns False when there
+        is no such entry.
+        """
+        files = self._readEntry(key)
+        if files is None or not all(os.path.isfile(self._blobPath(d)) for d in files.values()):
+            self._bumpStat("misses")
+            return False
+        for rel, digest in files.items():
+            target = os.path.join(destination, rel)
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            shutil.copyfile(self._blobPath(digest), target)
+        # Mark the entry as recently used
+        os.utime(self._entryPath(key))
+        self._bumpStat("hits")
+        return True
+
+    def store(self, key: str, source: str, files: Iterable[str]) -> None:
+        """
+        Store the given files (relative to source) as outputs of an entry.
+        """
+        mapping = {}
+        for rel in files:
+            path = os.path.join(source, rel)
+            digest = hashFile(path)
+            blob = self._blobPath(digest)
+            if not os.path.exists(blob):
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(blob))
+                os.close(fd)
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, blob)
+            mapping[rel.replace(os.sep, "/")] = digest
+        fd, tmp = tempfile.mkstemp(dir=self._entriesDir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "files": mapping}, f)
+        os.replace(tmp, self._entryPath(key))
+        self._bumpStat("stores")
+
+    def _entries(self) -> List[Tuple[str, float, Dict[str, str]]]:
+        entries = []
+        for name in os.listdir(self._entriesDir):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-len(".json")]
+            files = self._readEntry(key)
+            if files is None:
+                continue
+            entries.append((key, os.stat(self._entryPath(key)).st_mtime, files))
+        return entries
+
+    def _blobs(self) -> Dict[str, int]:
+        blobs = {}
+        for root, _, files in os.walk(self._blobsDir):
+            for f in files:
+                blobs[f] = os.stat(os.path.join(root, f)).st_size
+        return blobs
+
+    def evict(self) -> None:
+        """
+        Remove entries not used for more than maxAge and then the least
+        recently used entries until the cache fits into maxSize.
+        """
+        entries = sorted(self._entries(), key=lambda x: x[1])
+        now = time.time()
+        if self.maxAge is not None:
+            for key, used, _ in [e for e in entries if now - e[1] > self.maxAge]:
+                os.remove(self._entryPath(key))
+            entries = [e for e in entries if now - e[1] <= self.maxAge]
+        blobs = self._blobs()
+        if self.maxSize is not None:
+            def referencedSize(entries):
+                used = set(d for _, _, files in entries for d in files.values())
+                return sum(blobs.get(d, 0) for d in used)
+            while len(entries) > 0 and referencedSize(entries) > self.maxSize:
+                key, _, _ = entries.pop(0)
+                os.remove(self._entryPath(key))
+        # Collect blobs that are no longer referenced
+        used = set(d for _, _, files in entries for d in files.values())
+        for digest in set(blobs.keys()).difference(used):
+            try:
+                os.remove(self._blobPath(digest))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.directory, "stats.json"), "r", encoding="utf-8") as f:
+                counters = json.load(f)
+        except (OSError, ValueError):
+            counters = {}
+        blobs = self._blobs()
+        return {
+            "entries": len(self._entries()),
+            "blobs": len(blobs),
+            "size": sum(blobs.values()),
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "stores": counters.get("stores", 0)
+        }
+
+    def formatStats(self) -> str:
+        s = self.stats()
+        lookups = s["hits"] + s["misses"]
+        ratio = 100 * s["hits"] / lookups if lookups > 0 else 0
+        return (f"Cache {self.directory}: {s['entries']} entries, "
+                f"{s['size'] / (1 << 20):.1f} MiB in {s['blobs']} files; "
+                f"{s['hits']} hits, {s['misses']} misses ({ratio:.0f} % hit rate)")
+
+def cachedRun(cache: BuildCache, key: str, outputDir: str,
+              run: Callable[[], Any],
+              predicate: Callable[[str], bool]=lambda x: True) -> bool:
+    """
+    Restore outputs for key into outputDir or invoke run and store the files in
+    outputDir that it created or modified (and that satisfy the predicate).
+    Returns True on a cache hit. When run raises, nothing is stored.
+    """
+    if cache.restore(key, outputDir):
+        return True
+    before = snapshotDirectory(outputDir, predicate)
+    run()
+    after = snapshotDirectory(outputDir, predicate)
+    changed = [f for f, stamp in after.items() if before.get(f) != stamp]
+    cache.store(key, outputDir, changed)
+    cache.evict()
+    return False
+
+def presetPluginModules(value: Any) -> List[str]:
+    if hasattr(value, "__kikit_preset_repr"):
+        module = getattr(value, "__kikit_preset_repr").rsplit(".", maxsplit=1)[0]
+        return [module]
+    if isinstance(value, dict):
+        return [x for v in value.values() for x in presetPluginModules(v)]
+    if isinstance(value, list):
+        return [x for v in value for x in presetPluginModules(v)]
+    return []
+
+def moduleSourceHashes(modules: Iterable[str]) -> Dict[str, Optional[str]]:
+    result = {}
+    for module in modules:
+        path = pluginSourceFile(module)
+        result[module] = hashFile(path) if path is not None and os.path.isfile(path) else None
+    return result
+
+def panelizeCacheKey(input: str, output: str, preset: Dict[str, Any],
+                     plugins: List[Tuple[str, str, str]]) -> str:
+    """
+    Compute the cache key of a panelization. Expects a post-processed preset.
+    """
+    from kikit.panelize_ui_impl import dumpPreset
+
+    scripts = [preset["post"]["script"]] if preset["post"]["script"] else []
+    return computeKey({
+        "kind": "panelize",
+        "kikit": kikitVersion(),
+        "kicad": kicadVersion(),
+        "input": os.path.basename(input),
+        "inputs": hashFiles(projectFiles(input)),
+        "output": os.path.basename(output),
+        "preset": dumpPreset(preset),
+        "hookPlugins": [list(p) for p in plugins],
+        "sources": moduleSourceHashes(presetPluginModules(preset) +
+                                 [m for m, _, _ in plugins] + scripts)
+    })
+
+def fabCacheKey(kind: str, options: Dict[str, Any]) -> str:
+    """
+    Compute the cache key of a fab command given its options.
+    """
+    options = dict(options)
+    board = options.pop("board")
+    options.pop("outputdir")
+    inputs = {"board": hashFiles(projectFiles(board))}
+    if options.get("schematic"):
+        # Hierarchical schematics are spread across multiple files
+        schDir = os.path.dirname(os.path.abspath(options["schematic"]))
+        inputs["schematic"] = hashFiles(sorted(
+            os.path.join(schDir, x) for x in os.listdir(schDir)
+            if x.endswith(".kicad_sch") or x.endswith(".sch")))
+    if options.get("correctionpatterns"):
+        inputs["correctionpatterns"] = hashFiles([options["correctionpatterns"]])
+    return computeKey({
+        "kind": kind,
+        "kikit": kikitVersion(),
+        "kicad": kicadVersion(),
+        "board": os.path.basename(board),
+        "inputs": inputs,
+        "options": options
+    })
@@ -0,0 +1,34 @@
+import click
+
+CACHE_OPTIONS = ["cache", "cache_max_size", "cache_max_age", "cache_stats"]
+
+def cacheOptions(f):
+    """
+    A decorator adding the build cache options to a command
+    """
+    # Note that the decorators has to be specified in a reverse order
+    f = click.option("--cache-stats", is_flag=True, default=False,
+        help="Print cache statistics at the end.")(f)
+    f = click.option("--cache-max-age", type=click.FloatRange(min=0), default=30,
+        help="Evict cache entries not used for given number of days.")(f)
+    f = click.option("--cache-max-size", type=str, default="2G",
+        help="Maximal size of the cache, e.g., 500M or 2G.")(f)
+    f = click.option("--cache", type=click.Path(file_okay=False), default=None,
+        envvar="KIKIT_CACHE",
+        help="Directory of the build cache. If outputs for the same inputs are in the cache, they are reused.")(f)
+    return f
+
+def openCache(options):
+    """
+    Remove the cache options from the dictionary of command options and open
+    the cache (or return None if the cache is not used).
+    """
+    from kikit.cache import BuildCache, parseSize
+
+    cacheOptions = {k: options.pop(k) for k in CACHE_OPTIONS}
+    if cacheOptions["cache"] is None:
+        return None, False
+    cache = BuildCache(cacheOptions["cache"],
+                       maxSize=parseSize(cacheOptions["cache_max_size"]),
+                       maxAge=cacheOptions["cache_max_age"] * 24 * 3600)
+    return cache, cacheOptions["cache_stats"]
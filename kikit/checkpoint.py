@@ -0,0 +1,217 @@
+import os
+import pickle
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import pcbnew
+
+from kikit.panelize import Panel
+
+# Checkpoints of the panelization process. When tuning a preset, usually only
+# the late stages (text, fiducials, copper fill, page) change, but every run
+# redoes the expensive layout, tabs and framing. Therefore, doPanelization can
+# store the state of the panel after the expensive stages and, on the next run,
+# resume from the latest checkpoint whose inputs did not change.
+#
+# A checkpoint consists of the panel board (saved as a regular board file) and
+# the pickled Python-side state of the panel and of the stage results. KiCAD
+# objects referenced from the Python state are stored by value (vectors,
+# angles) or by their UUID (board items).
+
+# The stages in the order they are performed. For each stage, there are the
+# preset sections (or individual keys of the sections) the stage depends on
+# (including the previous stages).
+CHECKPOINT_STAGES = ["layout", "framing", "cuts"]
+_LAYOUT_DEPENDENCIES = {
+    "layout": None, "source": None, "framing": None, "debug": None,
+    "tabs": ["tabfootprints"]
+}
+STAGE_DEPENDENCIES = {
+    "layout": _LAYOUT_DEPENDENCIES,
+    "framing": {**_LAYOUT_DEPENDENCIES, "tabs": None, "post": ["lowmemory"]},
+    "cuts": {**_LAYOUT_DEPENDENCIES, "tabs": None, "cuts": None,
+             "tooling": None, "fiducials": None, "text": None, "text2": None,
+             "text3": None, "text4": None, "post": None}
+}
+
+# How many checkpoints of a single stage we keep
+KEEP_CHECKPOINTS = 4
+
+class CheckpointError(RuntimeError):
+    pass
+
+class _Pickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        if isinstance(obj, pcbnew.VECTOR2I):
+            return ("VECTOR2I", obj.x, obj.y)
+        if isinstance(obj, pcbnew.EDA_ANGLE):
+            return ("EDA_ANGLE", obj.AsDegrees())
+        if isinstance(obj, pcbnew.BOARD_ITEM):
+            return ("BOARD_ITEM", obj.m_Uuid.AsString())
+        return None
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, items: Dict[str, pcbnew.BOARD_ITEM]):
+        super().__init__(file)
+        self.items = items
+
+    def persistent_load(self, pid):
+        if pid[0] == "VECTOR2I":
+            return pcbnew.VECTOR2I(pid[1], pid[2])
+        if pid[0] == "EDA_ANGLE":
+            return pcbnew.EDA_ANGLE(pid[1], pcbnew.DEGREES_T)
+        if pid[0] == "BOARD_ITEM":
+            try:
+                return self.items[pid[1]]
+            except KeyError:
+                raise pickle.UnpicklingError(f"Unknown board item {pid[1]}") from None
+        raise pickle.UnpicklingError(f"Unknown persistent id {pid[0]}")
+
+def _boardItems(board: pcbnew.BOARD) -> Dict[str, pcbnew.BOARD_ITEM]:
+    items = {}
+    def add(item):
+        items[item.m_Uuid.AsString()] = item
+    for x in board.GetDrawings():
+        add(x)
+    for x in board.GetTracks():
+        add(x)
+    for x in board.Zones():
+        add(x)
+    for f in board.GetFootprints():
+        add(f)
+        for x in (*f.Pads(), *f.GraphicalItems(), *f.Zones()):
+            add(x)
+    return items
+
+def _selectSections(preset: Dict[str, Any], dependencies) -> Dict[str, Any]:
+    from kikit.panelize_ui_impl import encodePreset
+
+    selected = {}
+    for section, keys in dependencies.items():
+        if keys is None:
+            selected[section] = encodePreset(preset[section])
+        else:
+            selected[section] = {k: encodePreset(preset[section].get(k)) for k in keys}
+    return selected
+
+@dataclass
+class Checkpoint:
+    stage: str
+    state: Dict[str, Any]
+
+class PanelCheckpoints:
+    """
+    Checkpoints of a single panelization stored in the given directory.
+    """
+    def __init__(self, directory: str, input: str, preset: Dict[str, Any]):
+        from kikit.cache import (computeKey, hashFiles, projectFiles,
+            kikitVersion, kicadVersion, presetPluginModules, moduleSourceHashes)
+
+        self.directory = directory
+        inputs = {
+            "kikit": kikitVersion(),
+            "kicad": kicadVersion(),
+            "input": hashFiles(projectFiles(input)),
+            "sources": moduleSourceHashes(presetPluginModules(preset))
+        }
+        self.keys = {stage: computeKey({
+                "stage": stage,
+                "inputs": inputs,
+                "preset": _selectSections(preset, STAGE_DEPENDENCIES[stage])
+            }) for stage in CHECKPOINT_STAGES}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, stage: str) -> str:
+        return os.path.join(self.directory, f"{stage}-{self.keys[stage]}")
+
+    def save(self, stage: str, panel: Panel, state: Dict[str, Any]) -> bool:
+        """
+        Save a checkpoint of the panel after stage. Returns False when the state
+        cannot be stored (e.g., because of a plugin that stores unpicklable
+        objects). A failure to store a checkpoint never breaks the
+        panelization.
+        """
+        panelState = {k: v for k, v in panel.__dict__.items()
+                      if k not in ["board", "filename", "zonesToRefill", "_checkpointBoard",
+                                   "_sourceBoards"]}
+        panelState["zonesToRefill"] = [z.m_Uuid.AsString() for z in panel.zonesToRefill]
+        tmpDir = tempfile.mkdtemp(dir=self.directory)
+        try:
+            with open(os.path.join(tmpDir, "state.pickle"), "wb") as f:
+                _Pickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump({
+                    "panel": panelState,
+                    "stage": state
+                })
+            # We are saving the board under a different name; the board
+            # remembers its filename, so restore it
+            panel.board.Save(os.path.join(tmpDir, "panel.kicad_pcb"))
+            panel.board.SetFileName(panel.filename)
+            target = self._path(stage)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.replace(tmpDir, target)
+        except Exception:
+            shutil.rmtree(tmpDir, ignore_errors=True)
+            panel.board.SetFileName(panel.filename)
+            return False
+        self._prune(stage)
+        return True
+
+    def _prune(self, stage: str) -> None:
+        candidates = [os.path.join(self.directory, x)
+                      for x in os.listdir(self.directory) if x.startswith(stage + "-")]
+        candidates.sort(key=os.path.getmtime, reverse=True)
+        for path in candidates[KEEP_CHECKPOINTS:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def restore(self, panel: Panel) -> Optional[Checkpoint]:
+        """
+        Restore the latest valid checkpoint into a freshly set up panel. Returns
+        None if there is no checkpoint to resume from.
+        """
+        for stage in reversed(CHECKPOINT_STAGES):
+            path = self._path(stage)
+            if not os.path.isdir(path):
+                continue
+            try:
+                return Checkpoint(stage, self._restore(path, panel))
+            except (OSError, pickle.UnpicklingError, CheckpointError):
+                # The checkpoint is broken, try an older one
+                shutil.rmtree(path, ignore_errors=True)
+        return None
+
+    def _restore(self, path: str, panel: Panel) -> Dict[str, Any]:
+        board = pcbnew.LoadBoard(os.path.join(path, "panel.kicad_pcb"))
+        if board is None:
+            raise CheckpointError(f"Cannot load checkpoint {path}")
+        items = _boardItems(board)
+        with open(os.path.join(path, "state.pickle"), "rb") as f:
+            data = _Unpickler(f, items).load()
+
+        panelState = data["panel"]
+        zonesToRefill = pcbnew.ZONES()
+        for uuid in panelState.pop("zonesToRefill"):
+            if uuid not in items:
+                raise CheckpointError(f"Unknown zone {uuid}")
+            zonesToRefill.append(items[uuid])
+
+        # Move the content of the checkpoint board into the panel board. We
+        # move the items instead of duplicating them so they keep their
+        # identity (the state refers to them) and their UUIDs.
+        for netId in board.GetNetInfo().NetsByNetcode():
+            panel.board.Add(board.GetNetInfo().GetNetItem(netId))
+        for item in [*board.GetDrawings(), *board.GetFootprints(),
+                     *board.GetTracks(), *board.Zones()]:
+            board.Remove(item)
+            panel.board.Add(item)
+        panel.board.SetCopperLayerCount(board.GetCopperLayerCount())
+        panel.board.SetEnabledLayers(board.GetEnabledLayers())
+
+        panel.__dict__.update(panelState)
+        panel.zonesToRefill = zonesToRefill
+        # The items now belong to the panel board, however, we have to keep the
+        # original board alive as it still owns some of the internal structures
+        panel._checkpointBoard = board
+        return data["stage"]
@@ -1,7 +1,7 @@
 from __future__ import annotations
 import sys
 import traceback
-from typing import List, Optional, Tuple, Union, Callable
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from kikit.defs import Layer
 from kikit.typing import Box
 import pcbnew
@@ -11,7 +11,9 @@ import os
 from itertools import product, chain, islice
 import numpy as np
 from shapely.geometry import LinearRing
+import shapely
 import shapely.geometry
+import shapely.ops
 
 PKG_BASE = os.path.dirname(__file__)
 KIKIT_LIB = os.path.join(PKG_BASE, "resources/kikit.pretty")
@@ -67,15 +69,29 @@ def combineBoundingBoxes(a, b):
 def collectEdges(board, layerId, sourceArea=None):
     """ Collect edges in sourceArea on given layer including footprints """
     edges = []
-    for edge in chain(board.GetDrawings(), *[m.GraphicalItems() for m in board.GetFootprints()]):
-        if edge.GetLayer() != layerId:
-            continue
-        if isinstance(edge, pcbnew.PCB_DIMENSION_BASE):
-            continue
-        if isinstance(edge, pcbnew.PCB_TEXT):
-            continue
-        if not sourceArea or fitsIn(edge.GetBoundingBox(), sourceArea):
-            edges.append(edge)
+    def collect(items, checkArea):
+        for edge in items:
+            if edge.GetLayer() != layerId:
+                continue
+            if isinstance(edge, pcbnew.PCB_DIMENSION_BASE):
+                continue
+            if isinstance(edge, pcbnew.PCB_TEXT):
+                continue
+            if not checkArea or fitsIn(edge.GetBoundingBox(), sourceArea):
+                edges.append(edge)
+
+    collect(board.GetDrawings(), bool(sourceArea))
+    for footprint in board.GetFootprints():
+        checkArea = bool(sourceArea)
+        if checkArea:
+            # The footprint bounding box covers all its graphical items, so we
+            # can skip whole footprints outside of the area and we do not have
+            # to check items of footprints that are fully inside
+            footprintBox = footprint.GetBoundingBox()
+            if not sourceArea.Intersects(footprintBox):
+                continue
+            checkArea = not fitsIn(footprintBox, sourceArea)
+        collect(footprint.GraphicalItems(), checkArea)
     return edges
 
 def collectItems(boardCollection, sourceArea):
@@ -88,19 +104,130 @@ def collectFootprints(boardCollection, sourceArea):
     """
     return list([x for x in boardCollection if fitsIn(x.GetPosition(), sourceArea)])
 
+def zoneCentroid(zone: pcbnew.ZONE) -> pcbnew.VECTOR2I:
+    """
+    Return the centroid of the zone outline
+    """
+    items = []
+    for outline in [zone.Outline().Outline(i) for i in range(zone.Outline().OutlineCount())]:
+        p = shapely.geometry.Polygon([(x.x, x.y) for x in outline.CPoints()])
+        items.append(p)
+    polygon = shapely.ops.unary_union(items)
+    return pcbnew.VECTOR2I(*[int(x) for x in polygon.centroid.coords[0]])
+
 def collectZones(boardCollection, sourceArea):
     """
     Returns a list of board zones which centroid fits inside the source area.
     """
-    def zoneCentroid(zone: pcbnew.ZONE) -> pcbnew.VECTOR2I:
-        items = []
-        for outline in [zone.Outline().Outline(i) for i in range(zone.Outline().OutlineCount())]:
-            p = shapely.geometry.Polygon([outline.CPoint(i) for i in range(outline.PointCount())])
-            items.append(p)
-        polygon = shapely.ops.unary_union(items)
-        return pcbnew.VECTOR2I(*[int(x) for x in polygon.centroid.coords[0]])
     return list([x for x in boardCollection if fitsIn(zoneCentroid(x), sourceArea)])
 
+class _BoxIndex:
+    """
+    Spatial index of items given by their bounding boxes (an array of shape
+    (n, 4) with rows x1, y1, x2, y2). Points are boxes with zero size.
+    """
+    def __init__(self, items: List, boxes: np.ndarray) -> None:
+        self.items = items
+        self.boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        self.tree = shapely.STRtree(shapely.box(*self.boxes.T))
+
+    def contained(self, area: BOX2I) -> List:
+        """
+        Return items fully contained in the area (in the same sense as fitsIn)
+        in their original order.
+        """
+        x1, y1 = area.GetX(), area.GetY()
+        x2, y2 = x1 + area.GetWidth(), y1 + area.GetHeight()
+        # The tree gives us candidates whose boxes intersect the area, the
+        # exact test is performed on the integer coordinates
+        candidates = np.sort(self.tree.query(shapely.box(x1, y1, x2, y2)))
+        boxes = self.boxes[candidates]
+        mask = ((boxes[:, 0] >= x1) & (boxes[:, 2] <= x2) &
+                (boxes[:, 1] >= y1) & (boxes[:, 3] <= y2))
+        return [self.items[i] for i in candidates[mask]]
+
+def _itemBoxes(items) -> np.ndarray:
+    boxes = np.empty((len(items), 4), dtype=np.int64)
+    for i, item in enumerate(items):
+        box = item.GetBoundingBox()
+        x, y = box.GetX(), box.GetY()
+        boxes[i] = (x, y, x + box.GetWidth(), y + box.GetHeight())
+    return boxes
+
+def _pointBoxes(points) -> np.ndarray:
+    points = np.array([(p[0], p[1]) for p in points], dtype=np.int64).reshape(-1, 2)
+    return np.concatenate([points, points], axis=1)
+
+class BoardItemIndex:
+    """
+    Spatial index of board items. Build it once per board and use it instead
+    of collectItems, collectFootprints, collectZones and collectEdges when you
+    extract multiple areas from a single board. The queries give the same
+    results as the collect functions as long as the items are not modified.
+
+    Only the item kinds and the layers that are queried are indexed; each of
+    them is indexed in full on its first query.
+    """
+    def __init__(self, board: pcbnew.BOARD) -> None:
+        self._board = board
+        self._indices: Dict[Any, _BoxIndex] = {}
+        self._layerItems: Optional[Dict[int, List[pcbnew.BOARD_ITEM]]] = None
+
+    def _index(self, key: Any, build: Callable[[], _BoxIndex]) -> _BoxIndex:
+        index = self._indices.get(key)
+        if index is None:
+            index = build()
+            self._indices[key] = index
+        return index
+
+    def _layerEdges(self, layerId: int) -> List[pcbnew.BOARD_ITEM]:
+        if self._layerItems is None:
+            self._layerItems = {}
+            footprints = self._board.GetFootprints()
+            for edge in chain(self._board.GetDrawings(), *[m.GraphicalItems() for m in footprints]):
+                if isinstance(edge, pcbnew.PCB_DIMENSION_BASE):
+                    continue
+                if isinstance(edge, pcbnew.PCB_TEXT):
+                    continue
+                self._layerItems.setdefault(edge.GetLayer(), []).append(edge)
+        return self._layerItems.get(layerId, [])
+
+    def drawings(self, sourceArea: BOX2I) -> List[pcbnew.BOARD_ITEM]:
+        """ Drawings fully contained in the source area """
+        def build():
+            items = list(self._board.GetDrawings())
+            return _BoxIndex(items, _itemBoxes(items))
+        return self._index("drawings", build).contained(sourceArea)
+
+    def tracks(self, sourceArea: BOX2I) -> List[pcbnew.BOARD_ITEM]:
+        """ Tracks fully contained in the source area """
+        def build():
+            items = list(self._board.GetTracks())
+            return _BoxIndex(items, _itemBoxes(items))
+        return self._index("tracks", build).contained(sourceArea)
+
+    def footprints(self, sourceArea: BOX2I) -> List[pcbnew.FOOTPRINT]:
+        """ Footprints which origin fits inside the source area """
+        def build():
+            items = list(self._board.GetFootprints())
+            return _BoxIndex(items, _pointBoxes(f.GetPosition() for f in items))
+        return self._index("footprints", build).contained(sourceArea)
+
+    def zones(self, sourceArea: BOX2I) -> List[pcbnew.ZONE]:
+        """ Zones which centroid fits inside the source area """
+        def build():
+            items = list(self._board.Zones())
+            return _BoxIndex(items, _pointBoxes(zoneCentroid(z) for z in items))
+        return self._index("zones", build).contained(sourceArea)
+
+    def edges(self, layerId: int, sourceArea: Optional[BOX2I]=None) -> List[pcbnew.BOARD_ITEM]:
+        """ Edges in the source area on given layer including footprints """
+        items = self._layerEdges(layerId)
+        if not sourceArea:
+            return list(items)
+        return self._index(("edges", layerId),
+            lambda: _BoxIndex(items, _itemBoxes(items))).contained(sourceArea)
+
 def getBBoxWithoutContours(edge):
     width = edge.GetWidth()
     edge.SetWidth(0)
@@ -124,17 +251,25 @@ def findBoundingBox(edges):
     """
     if len(edges) == 0:
         raise RuntimeError("No board edges found")
-    boundingBox = getBBoxWithoutContours(edges[0])
-    for edge in edges[1:]:
-        boundingBox = combineBoundingBoxes(boundingBox, getBBoxWithoutContours(edge))
-    return boundingBox
+    boxes = np.empty((len(edges), 4), dtype=np.int64)
+    for i, edge in enumerate(edges):
+        box = getBBoxWithoutContours(edge)
+        boxes[i] = (box.GetX(), box.GetY(),
+                    box.GetX() + box.GetWidth(), box.GetY() + box.GetHeight())
+    x1, y1 = boxes[:, 0].min(), boxes[:, 1].min()
+    x2, y2 = boxes[:, 2].max(), boxes[:, 3].max()
+    return BOX2I(toKiCADPoint((x1, y1)), toKiCADPoint((x2 - x1, y2 - y1)))
 
-def findBoardBoundingBox(board, sourceArea=None):
+def findBoardBoundingBox(board, sourceArea=None, index=None):
     """
     Returns a bounding box (BOX2I) of all Edge.Cuts items either in
-    specified source area (BOX2I) or in the whole board
+    specified source area (BOX2I) or in the whole board. Optionally, you can
+    pass a BoardItemIndex of the board to speed up the search.
     """
-    edges = collectEdges(board, Layer.Edge_Cuts, sourceArea)
+    if index is not None:
+        edges = index.edges(Layer.Edge_Cuts, sourceArea)
+    else:
+        edges = collectEdges(board, Layer.Edge_Cuts, sourceArea)
     return findBoundingBox(edges)
 
 def rectCenter(rect):
@@ -19,6 +19,9 @@ from kikit.drc_ui import ReportLevel
 
 NULL_UUID = "00000000-0000-0000-0000-000000000000"
 
+# How many DRC reports we keep in the cache
+DRC_CACHE_ENTRIES = 64
+
 def _find_kicad_cli() -> Optional[str]:
     """Locate the kicad-cli binary."""
     # Try PATH first
@@ -221,8 +224,82 @@ def _readExclusionsFromProjectFile(boardFilename: str) -> List[CliDrcExclusion]:
         result.append(CliDrcExclusion(items[0], uuids))
     return result
 
-def _runCliDrc(kicadCli: str, boardFile: str, strict: bool) -> DrcReport:
-    """Run DRC via kicad-cli and return a DrcReport with CliViolation objects."""
+def _drcCacheDir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "kikit", "drc")
+
+def _drcCacheKey(boardFile: str, strict: bool) -> str:
+    from kikit.cache import computeKey, hashFiles, projectFiles
+
+    # The project files contain the rules (.kicad_dru) and the severities and
+    # exclusions (.kicad_pro)
+    return computeKey({
+        "kind": "drc",
+        "kicad": pcbnew.Version(),
+        "inputs": hashFiles(projectFiles(boardFile)),
+        "strict": strict
+    })
+
+def _readCachedDrc(key: str) -> Optional[Dict]:
+    path = os.path.join(_drcCacheDir(), key + ".json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Mark the entry as recently used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return data
+
+def _storeCachedDrc(key: str, data: Dict) -> None:
+    # The cache is only an optimization, never fail because of it
+    directory = _drcCacheDir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmpName = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmpName, os.path.join(directory, key + ".json"))
+        entries = sorted((os.path.join(directory, x) for x in os.listdir(directory)
+                          if x.endswith(".json")), key=os.path.getmtime, reverse=True)
+        for path in entries[DRC_CACHE_ENTRIES:]:
+            os.remove(path)
+    except OSError:
+        pass
+
+def _runCliDrc(kicadCli: str, boardFile: str, strict: bool,
+               cache: bool=False) -> DrcReport:
+    """
+    Run DRC via kicad-cli and return a DrcReport with CliViolation objects.
+    With cache, reuse the result of a previous run on the same board, project
+    files, KiCAD version and strictness.
+    """
+    key = _drcCacheKey(boardFile, strict) if cache else None
+    data = _readCachedDrc(key) if cache else None
+    if data is None:
+        data = _runCliDrcJson(kicadCli, boardFile, strict)
+        if cache:
+            _storeCachedDrc(key, data)
+
+    def parseViolations(items: List[Dict]) -> List[CliViolation]:
+        return [CliViolation(
+            type=v["type"],
+            description=v["description"],
+            severity=v["severity"],
+            items=v.get("items", [])
+        ) for v in items]
+
+    return DrcReport(
+        drc=parseViolations(data.get("violations", [])),
+        unconnected=parseViolations(data.get("unconnected_items", [])),
+        footprint=parseViolations(data.get("schematic_parity", []))
+    )
+
+def _runCliDrcJson(kicadCli: str, boardFile: str, strict: bool) -> Dict:
+    """Run DRC via kicad-cli and return its JSON report."""
     with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as tmp:
         tmpName = tmp.name
     try:
@@ -244,27 +321,13 @@ def _runCliDrc(kicadCli: str, boardFile: str, strict: bool) -> DrcReport:
                 f"{proc.stderr.strip() or proc.stdout.strip()}")
 
         with open(tmpName, encoding="utf-8") as f:
-            data = json.load(f)
+            return json.load(f)
     finally:
         try:
             os.unlink(tmpName)
         except OSError:
             pass
 
-    def parseViolations(items: List[Dict]) -> List[CliViolation]:
-        return [CliViolation(
-            type=v["type"],
-            description=v["description"],
-            severity=v["severity"],
-            items=v.get("items", [])
-        ) for v in items]
-
-    return DrcReport(
-        drc=parseViolations(data.get("violations", [])),
-        unconnected=parseViolations(data.get("unconnected_items", [])),
-        footprint=parseViolations(data.get("schematic_parity", []))
-    )
-
 def readBoardItem(text: str,
                   fingerprints: Dict[ItemFingerprint, pcbnew.BOARD_ITEM]) \
                     -> pcbnew.BOARD_ITEM:
@@ -379,7 +442,12 @@ def readBoardDrcExclusions(board: pcbnew.BOARD) -> List[DrcExclusion]:
         exclusions = [x[0] for x in exclusions]
     return [deserializeExclusion(e, board) for e in exclusions]
 
-def runImpl(board, useMm, ignoreExcluded, strict, level, yieldViolation):
+def runImpl(board, useMm, ignoreExcluded, strict, level, yieldViolation, cache=True):
+    """
+    Run DRC of the board and report failures via yieldViolation. Returns True
+    when the DRC failed. With cache, the result of kicad-cli DRC on unchanged
+    board and project files is reused from previous runs.
+    """
     import faulthandler
     faulthandler.enable(sys.stderr)
 
@@ -388,7 +456,7 @@ def runImpl(board, useMm, ignoreExcluded, strict, level, yieldViolation):
 
     kicadCli = _find_kicad_cli()
     if kicadCli is not None:
-        report = _runCliDrc(kicadCli, boardFile, strict)
+        report = _runCliDrc(kicadCli, boardFile, strict, cache)
         if ignoreExcluded:
             report.pruneExclusions(_readExclusionsFromProjectFile(boardFile))
     else:
@@ -36,7 +36,9 @@ def drc():
     help="Report items that are excluded")
 @click.option("--level", type=EnumType(ReportLevel), default=ReportLevel.error,
     help="Minimum severity to report")
-def run(boardfile, usemm, ignoreexcluded, strict, level):
+@click.option("--cache/--no-cache", default=True,
+    help="Reuse the result of a previous DRC run on unchanged board and project files")
+def run(boardfile, usemm, ignoreexcluded, strict, level, cache):
     """
     Check DRC rules. If no rules are validated, the process exists with code 0.
 
@@ -51,7 +53,8 @@ def run(boardfile, usemm, ignoreexcluded, strict, level):
 
     try:
         board = pcbnew.LoadBoard(boardfile)
-        failed = runImpl(board, usemm, ignoreexcluded, strict, level, lambda x: print(x))
+        failed = runImpl(board, usemm, ignoreexcluded, strict, level,
+                         lambda x: print(x), cache=cache)
         if not failed:
             print("No DRC errors found.")
         else:
@@ -71,24 +71,7 @@ def setExcludeEdgeLayer(plotOptions, excludeEdge):
         else:
             plotOptions.SetLayerSelection(LSET(Layer.Edge_Cuts))
 
-def gerberImpl(boardfile, outputdir, plot_plan=fullGerberPlotPlan, drilling=True, settings=exportSettingsJlcpcb):
-    """
-    Export board to gerbers.
-
-    If no output dir is specified, use '<board file>-gerber'
-    """
-    basename = os.path.basename(boardfile)
-    if outputdir:
-        plotDir = outputdir
-    else:
-        plotDir = basename + "-gerber"
-    plotDir = os.path.abspath(plotDir)
-
-    board = LoadBoard(boardfile)
-
-    pctl = PLOT_CONTROLLER(board)
-    popt = pctl.GetPlotOptions()
-
+def _setupGerberPlotOptions(popt, plotDir, settings):
     popt.SetOutputDirectory(plotDir)
 
     popt.SetPlotFrameRef(False)
@@ -110,71 +93,257 @@ def gerberImpl(boardfile, outputdir, plot_plan=fullGerberPlotPlan, drilling=True
     popt.SetDrillMarksType(pcbnew.DRILL_MARKS_NO_DRILL_SHAPE)
     popt.SetSkipPlotNPTH_Pads(False)
 
-    # prepare the gerber job file
-    jobfile_writer = GERBER_JOBFILE_WRITER(board)
-
+def _gerberLayerPlan(board, plot_plan, settings):
+    """
+    Expand the plot plan into a list of (layer, suffix, comment) including the
+    inner copper layers.
+    """
+    plan = []
     for name, id, comment in plot_plan:
-        if id <= B_Cu:
-            popt.SetSkipPlotNPTH_Pads(True)
-        else:
-            popt.SetSkipPlotNPTH_Pads(False)
-
-        pctl.SetLayer(id)
         suffix = "" if settings["NoSuffix"] else name
-        pctl.OpenPlotfile(suffix, PLOT_FORMAT_GERBER, comment)
-        jobfile_writer.AddGbrFile(id, os.path.basename(pctl.GetPlotFileName()))
-        if pctl.PlotLayer() == False:
-            raise RuntimeError("KiCAD plot error")
-
+        plan.append((id, suffix, comment))
     if hasCopper(plot_plan):
         #generate internal copper layers, if any
         for i, layer in enumerate(Layer.innerCu(board.GetCopperLayerCount())):
-            popt.SetSkipPlotNPTH_Pads(True)
-            pctl.SetLayer(layer)
             layerName = "" if settings["NoSuffix"] else f"inner{i + 1}"
-            pctl.OpenPlotfile(layerName, PLOT_FORMAT_GERBER, "inner")
-            jobfile_writer.AddGbrFile(layer, os.path.basename(pctl.GetPlotFileName()))
-            if pctl.PlotLayer() == False:
-                raise RuntimeError("KiCAD plot error")
+            plan.append((layer, layerName, "inner"))
+    return plan
 
-    # At the end you have to close the last plot, otherwise you don't know when
-    # the object will be recycled!
-    pctl.ClosePlot()
+def _plotGerberLayers(board, plotDir, settings, layerPlan, onPlotted=lambda x: None):
+    """
+    Plot the given layers of the board. Return a list of (layer, plot file
+    name) in the order of the plan. onPlotted is invoked with the file name as
+    soon as the file is finished.
+    """
+    pctl = PLOT_CONTROLLER(board)
+    popt = pctl.GetPlotOptions()
+    _setupGerberPlotOptions(popt, plotDir, settings)
+
+    plotted = []
+    for id, suffix, comment in layerPlan:
+        popt.SetSkipPlotNPTH_Pads(id <= B_Cu)
 
+        pctl.SetLayer(id)
+        pctl.OpenPlotfile(suffix, PLOT_FORMAT_GERBER, comment)
+        plotted.append((id, pctl.GetPlotFileName()))
+        if pctl.PlotLayer() == False:
+            raise RuntimeError("KiCAD plot error")
+        # Close the plot explicitly, otherwise you don't know when the object
+        # will be recycled and the file finished!
+        pctl.ClosePlot()
+        onPlotted(plotted[-1][1])
+    return plotted
+
+def _exportDrill(board, plotDir, settings):
+    # Fabricators need drill files.
+    # sometimes a drill map file is asked (for verification purpose)
+    drlwriter = EXCELLON_WRITER(board)
+    mapFmt = settings['MapFileFormat']
+    drlwriter.SetMapFileFormat(mapFmt)
+
+    mirror = False
+    minimalHeader = settings["MinimalHeader"]
+    if settings["UseAuxOrigin"]:
+        offset = board.GetDesignSettings().GetAuxOrigin()
+    else:
+        offset = VECTOR2I(0, 0)
+
+    # False to generate 2 separate drill files (one for plated holes, one for non plated holes)
+    # True to generate only one drill file
+    mergeNPTH = settings["MergeNPTH"]
+    drlwriter.SetOptions(mirror, minimalHeader, offset, mergeNPTH)
+    drlwriter.SetRouteModeForOvalHoles(False)
+
+    metricFmt = True
+    zerosFmt = settings["ZerosFormat"]
+    drlwriter.SetFormat(metricFmt, zerosFmt)
+    genDrl = True
+    genMap = True
+    plotDirName = os.path.join(plotDir, "")
+    drlwriter.CreateDrillandMapFilesSet(plotDirName, genDrl, genMap)
+
+    # One can create a text file to report drill statistics
+    rptfn = plotDirName + 'drill_report.rpt'
+    drlwriter.GenDrillReportFile(rptfn)
+
+def _parallelPlotTask(boardfile, plotDir, settings, layerPlan, drilling):
+    """
+    Entry point of a worker process of the parallel Gerber export; loads the
+    board and plots its share of the work.
+    """
+    board = LoadBoard(boardfile)
+    plotted = _plotGerberLayers(board, plotDir, settings, layerPlan) \
+              if len(layerPlan) > 0 else []
+    if drilling:
+        _exportDrill(board, plotDir, settings)
+    return [(int(id), name) for id, name in plotted]
+
+def _initPlotWorker():
+    from kikit.common import fakeKiCADGui
+    global _plotWorkerApp
+    _plotWorkerApp = fakeKiCADGui()
+
+def _plotGerbersInParallel(boardfile, plotDir, settings, layerPlan, drilling, jobs):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Distribute the layers round-robin; the drill files form a separate task
+    # as they are usually as expensive as a layer
+    chunks = [layerPlan[i::jobs] for i in range(jobs)]
+    tasks = [(chunk, False) for chunk in chunks if len(chunk) > 0]
     if drilling:
-        # Fabricators need drill files.
-        # sometimes a drill map file is asked (for verification purpose)
-        drlwriter = EXCELLON_WRITER(board)
-        mapFmt = settings['MapFileFormat']
-        drlwriter.SetMapFileFormat(mapFmt)
-
-        mirror = False
-        minimalHeader = settings["MinimalHeader"]
-        if settings["UseAuxOrigin"]:
-            offset = board.GetDesignSettings().GetAuxOrigin()
+        tasks.append(([], True))
+
+    # pcbnew is not fork-safe, therefore, always spawn fresh workers
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), mp_context=context,
+                             initializer=_initPlotWorker) as executor:
+        futures = [executor.submit(_parallelPlotTask, os.path.abspath(boardfile),
+                                   plotDir, settings, chunk, drill)
+                   for chunk, drill in tasks]
+        results = dict(x for f in futures for x in f.result())
+    return [(id, results[int(id)]) for id, _, _ in layerPlan]
+
+def _stagingRoot():
+    """
+    Return a directory for short-lived files; prefer a memory-backed one.
+    """
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        return shm
+    return None
+
+class ExportSink:
+    """
+    Destination of exported files. KiCAD plotters insist on writing to a file
+    path, therefore, a sink provides a directory to plot into and it is
+    notified via add() about every finished file.
+    """
+    directory = None
+
+    def add(self, path):
+        pass
+
+    def close(self):
+        pass
+
+    def discard(self):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
         else:
-            offset = VECTOR2I(0, 0)
-
-        # False to generate 2 separate drill files (one for plated holes, one for non plated holes)
-        # True to generate only one drill file
-        mergeNPTH = settings["MergeNPTH"]
-        drlwriter.SetOptions(mirror, minimalHeader, offset, mergeNPTH)
-        drlwriter.SetRouteModeForOvalHoles(False)
-
-        metricFmt = True
-        zerosFmt = settings["ZerosFormat"]
-        drlwriter.SetFormat(metricFmt, zerosFmt)
-        genDrl = True
-        genMap = True
-        drlwriter.CreateDrillandMapFilesSet(pctl.GetPlotDirName(), genDrl, genMap)
-
-        # One can create a text file to report drill statistics
-        rptfn = pctl.GetPlotDirName() + 'drill_report.rpt'
-        drlwriter.GenDrillReportFile(rptfn)
-
-    job_fn=os.path.dirname(pctl.GetPlotFileName()) + '/' + os.path.basename(boardfile)
+            self.discard()
+
+class DirectorySink(ExportSink):
+    """
+    Keep the exported files in the given directory.
+    """
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+
+class ZipSink(ExportSink):
+    """
+    Stream the exported files into a zip archive under the given prefix. The
+    files are plotted into a (preferably memory-backed) staging directory and
+    moved into the archive as soon as they are finished, so they never hit the
+    disk twice.
+    """
+    def __init__(self, zipPath, prefix=""):
+        import tempfile
+        import zipfile
+
+        self.zipPath = zipPath
+        self.prefix = prefix
+        self.directory = tempfile.mkdtemp(prefix="kikit-", dir=_stagingRoot())
+        self.archive = zipfile.ZipFile(zipPath, "w", compression=zipfile.ZIP_DEFLATED)
+        if prefix:
+            # Mimic shutil.make_archive which stores the directory entry too
+            self.archive.writestr(zipfile.ZipInfo(prefix + "/"), b"")
+
+    def add(self, path):
+        name = os.path.basename(path)
+        arcname = self.prefix + "/" + name if self.prefix else name
+        self.archive.write(path, arcname)
+        os.remove(path)
+
+    def close(self):
+        import shutil
+
+        # Collect the files we were not notified about (e.g., drill maps)
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path):
+                self.add(path)
+        self.archive.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def discard(self):
+        import shutil
+
+        self.archive.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        if os.path.exists(self.zipPath):
+            os.remove(self.zipPath)
+
+def loadBoardOnce(board):
+    """
+    Given either a board file name or an already loaded board, return a tuple
+    (board, filename). The board is loaded only when a file name is given.
+    """
+    if isinstance(board, pcbnew.BOARD):
+        return board, board.GetFileName()
+    return LoadBoard(board), board
+
+def gerberImpl(boardfile, outputdir, plot_plan=fullGerberPlotPlan, drilling=True,
+               settings=exportSettingsJlcpcb, jobs=1):
+    """
+    Export board to gerbers. The board is either a file name or an already
+    loaded board.
+
+    The output is either a directory or an ExportSink. If no output dir is
+    specified, use '<board file>-gerber'
+
+    With jobs > 1, the layers and drill files are plotted in that many worker
+    processes; each of them loads the board file on its own, therefore, a
+    loaded board has to match its file. The resulting files are the same as
+    from the serial export.
+    """
+    board, boardfile = loadBoardOnce(boardfile)
+
+    if isinstance(outputdir, ExportSink):
+        sink = outputdir
+    else:
+        basename = os.path.basename(boardfile)
+        sink = DirectorySink(outputdir if outputdir else basename + "-gerber")
+    plotDir = sink.directory
+
+    layerPlan = _gerberLayerPlan(board, plot_plan, settings)
+    if jobs > 1:
+        # The workers would race on creating the directory
+        os.makedirs(plotDir, exist_ok=True)
+        plotted = _plotGerbersInParallel(boardfile, plotDir, settings,
+                                         layerPlan, drilling, jobs)
+        for _, plotFile in plotted:
+            sink.add(plotFile)
+    else:
+        plotted = _plotGerberLayers(board, plotDir, settings, layerPlan, sink.add)
+        if drilling:
+            _exportDrill(board, plotDir, settings)
+
+    # prepare the gerber job file
+    jobfile_writer = GERBER_JOBFILE_WRITER(board)
+    for id, plotFile in plotted:
+        jobfile_writer.AddGbrFile(id, os.path.basename(plotFile))
+
+    job_fn=os.path.join(plotDir, os.path.basename(boardfile))
     job_fn=os.path.splitext(job_fn)[0] + '.gbrjob'
     jobfile_writer.CreateJobFile(job_fn)
+    sink.add(job_fn)
 
 def pasteDxfExport(board, plotDir):
     pctl = PLOT_CONTROLLER(board)
@@ -10,12 +10,14 @@ def export():
 @click.command()
 @click.argument("boardfile", type=click.Path(dir_okay=False))
 @click.argument("outputdir", type=click.Path(file_okay=False), default=None)
-def gerber(boardfile, outputdir):
+@click.option("--jobs", "-j", type=click.IntRange(min=1), default=1,
+    help="Plot the layers in this many worker processes")
+def gerber(boardfile, outputdir, jobs):
     from kikit.export import gerberImpl
     from kikit.common import fakeKiCADGui
     app = fakeKiCADGui()
 
-    gerberImpl(boardfile, outputdir)
+    gerberImpl(boardfile, outputdir, jobs=jobs)
 
 @click.command()
 @click.argument("boardfile", type=click.Path(dir_okay=False))
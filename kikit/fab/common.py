@@ -1,4 +1,5 @@
 import csv
+import os
 from dataclasses import dataclass
 from enum import Enum
 import re
@@ -38,6 +39,88 @@ def getReference(component):
         return eeschema_v6.getReference(component)
     return eeschema.getReference(component)
 
+# Names of the numbered fields of legacy (v5) schematic symbols
+_LEGACY_FIELD_NAMES = {0: "Reference", 1: "Value", 2: "Footprint", 3: "Datasheet"}
+
+def getFields(component):
+    """
+    Return all fields of the component as a dictionary. Unlike getField, which
+    scans the fields of the component, it is suitable for repeated lookups.
+    """
+    if isinstance(component, eeschema_v6.Symbol):
+        return component.properties
+    fields = {}
+    for f in component["fields"]:
+        # The first field of the given name wins, the same as in getField
+        if f["number"] in _LEGACY_FIELD_NAMES:
+            fields.setdefault(_LEGACY_FIELD_NAMES[f["number"]], f["text"])
+        if "name" in f:
+            fields.setdefault(f["name"], f["text"])
+    return fields
+
+def firstField(fields, names, accept=lambda x: x is not None):
+    """
+    Given fields of a component, return the value of the first field from names
+    that is accepted. If there is no such field, return the value of the last
+    field.
+    """
+    value = None
+    for name in names:
+        value = fields.get(name)
+        if accept(value):
+            break
+    return value
+
+def bomComponents(components, ignore):
+    """
+    Yield (reference, fields) of components that should be placed in BOM, i.e.,
+    first units of components that are not ignored, virtual or excluded from
+    the BOM.
+    """
+    ignore = set(ignore)
+    for c in components:
+        if getUnit(c) != 1:
+            continue
+        reference = getReference(c)
+        if reference.startswith("#PWR") or reference.startswith("#FL"):
+            continue
+        if reference in ignore:
+            continue
+        if hasattr(c, "in_bom") and not c.in_bom:
+            continue
+        if hasattr(c, "on_board") and not c.on_board:
+            continue
+        if hasattr(c, "dnp") and c.dnp:
+            continue
+        yield reference, getFields(c)
+
+def groupBom(entries, componentType):
+    """
+    Group (reference, fields) entries by the component type given by a function
+    of fields. The groups and the references in them keep the order of entries.
+    """
+    bom = {}
+    for reference, fields in entries:
+        cType = componentType(fields)
+        group = bom.get(cType)
+        if group is None:
+            bom[cType] = [reference]
+        else:
+            group.append(reference)
+    return bom
+
+def restrictBom(bom, references):
+    """
+    Keep only given references in the BOM and drop the groups that become
+    empty.
+    """
+    result = {}
+    for cType, group in bom.items():
+        group = [r for r in group if r in references]
+        if len(group) > 0:
+            result[cType] = group
+    return result
+
 def ensurePassingDrc(board):
     failed = drc.runImpl(board,
         useMm=True,
@@ -49,6 +132,85 @@ def ensurePassingDrc(board):
         print("DRC failed. See report above. No files produced")
         sys.exit(1)
 
+class BackgroundDrc:
+    """
+    DRC of a board file running in a separate process with the same settings
+    as ensurePassingDrc.
+    """
+    def __init__(self, boardFile):
+        import subprocess
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "kikit.ui", "drc", "run", "--level", "error",
+             os.path.abspath(boardFile)],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        self.output = ""
+
+    def wait(self):
+        """
+        Wait for the DRC to finish; return True if it passed.
+        """
+        self.output, _ = self.process.communicate()
+        return self.process.returncode == 0
+
+    def cancel(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.communicate()
+
+def commitStagedOutputs(staging, outputdir):
+    """
+    Move all files from the staging directory into the output directory.
+    """
+    for root, _, files in os.walk(staging):
+        targetDir = os.path.join(outputdir, os.path.relpath(root, staging))
+        os.makedirs(targetDir, exist_ok=True)
+        for f in files:
+            os.replace(os.path.join(root, f), os.path.join(targetDir, f))
+
+def withBackgroundDrc(procedure):
+    """
+    Given a fab export procedure, return a procedure with the same arguments
+    that, when DRC is requested, runs the DRC in a separate process while
+    the outputs are being generated. The outputs are staged and moved into the
+    output directory only when the DRC passes, so there are no output files
+    when it fails.
+    """
+    def run(**kwargs):
+        if not kwargs.get("drc"):
+            return procedure(**kwargs)
+        import shutil
+        import tempfile
+
+        outputdir = os.path.abspath(kwargs["outputdir"])
+        # Stage inside the output directory, so we can move the files and we
+        # do not touch anything outside of it
+        createdOutputdir = not os.path.isdir(outputdir)
+        os.makedirs(outputdir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".kikit-staging-", dir=outputdir)
+        drcRun = BackgroundDrc(kwargs["board"])
+        committed = False
+        try:
+            try:
+                result = procedure(**{**kwargs, "outputdir": staging, "drc": False})
+            except BaseException:
+                drcRun.cancel()
+                raise
+            if not drcRun.wait():
+                print(drcRun.output, end="")
+                print("DRC failed. See report above. No files produced")
+                sys.exit(1)
+            commitStagedOutputs(staging, outputdir)
+            committed = True
+            return result
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+            if createdOutputdir and not committed:
+                try:
+                    os.rmdir(outputdir)
+                except OSError:
+                    pass
+    return run
+
 def hasNonSMDPins(footprint):
     for pad in footprint.Pads():
         if pad.GetAttribute() != pcbnew.PAD_ATTRIB_SMD:
@@ -152,11 +314,62 @@ def readCorrectionPatterns(filename):
             )
     return correctionPatterns
 
+class CorrectionPatternIndex:
+    """
+    Match footprint names against correction patterns; the first matching
+    pattern wins. The patterns are combined into a single regular expression
+    and the result is cached per footprint name.
+    """
+    def __init__(self, correctionPatterns):
+        self.patterns = list(correctionPatterns)
+        self.combined = self._combine(self.patterns)
+        self.cache = {}
+
+    @staticmethod
+    def _combine(patterns):
+        # Patterns with their own groups (e.g., backreferences) or inline flags
+        # cannot be safely combined, use a linear scan for them
+        defaultFlags = re.compile("").flags
+        if len(patterns) == 0 or any(p.footprint.groups > 0 or p.footprint.flags != defaultFlags
+                                     for p in patterns):
+            return None
+        try:
+            return re.compile("|".join(f"(?P<p{i}>{p.footprint.pattern})"
+                                       for i, p in enumerate(patterns)))
+        except re.error:
+            return None
+
+    def _find(self, footprintName):
+        if self.combined is not None:
+            # Alternatives are tried from left to right, so the first pattern
+            # that matches is the one the linear scan would find
+            match = self.combined.match(footprintName)
+            if match is None:
+                return None
+            return self.patterns[int(match.lastgroup[1:])]
+        for corpat in self.patterns:
+            if corpat.footprint.match(footprintName):
+                return corpat
+        return None
+
+    def lookup(self, footprintName):
+        try:
+            return self.cache[footprintName]
+        except KeyError:
+            pass
+        corpat = self._find(footprintName)
+        result = (0, 0, 0) if corpat is None else \
+                 (corpat.x_correction, corpat.y_correction, corpat.rotation)
+        self.cache[footprintName] = result
+        return result
+
 def applyCorrectionPattern(correctionPatterns, footprint):
     # FIXME: part ID is currently ignored
     # GetUniStringLibId returns the full footprint name including the
     # library in the form of "Resistor_SMD:R_0402_1005Metric"
     footprintName = str(footprint.GetFPID().GetUniStringLibId())
+    if isinstance(correctionPatterns, CorrectionPatternIndex):
+        return correctionPatterns.lookup(footprintName)
     for corpat in correctionPatterns:
         if corpat.footprint.match(footprintName):
             return (corpat.x_correction, corpat.y_correction, corpat.rotation)
@@ -180,11 +393,12 @@ def collectPosData(board, correctionFields, posFilter=lambda x : True,
     if bom is None:
         bom = {}
     else:
-        bom = { getReference(comp): comp for comp in bom }
+        bom = { getReference(comp): getFields(comp) for comp in bom }
 
     correctionPatterns = []
     if correctionFile is not None:
         correctionPatterns = readCorrectionPatterns(correctionFile)
+    correctionPatterns = CorrectionPatternIndex(correctionPatterns)
 
     footprints = []
     placeOffset = board.GetDesignSettings().GetAuxOrigin()
@@ -196,11 +410,7 @@ def collectPosData(board, correctionFields, posFilter=lambda x : True,
     def getCompensation(footprint):
         if footprint.GetReference() not in bom:
             return 0, 0, 0
-        field = None
-        for fieldName in correctionFields:
-            field = getField(bom[footprint.GetReference()], fieldName)
-            if field is not None:
-                break
+        field = firstField(bom[footprint.GetReference()], correctionFields)
         if field is None or field == "":
             return applyCorrectionPattern(
                 correctionPatterns,
@@ -209,11 +419,15 @@ def collectPosData(board, correctionFields, posFilter=lambda x : True,
             return parseCompensation(field)
         except FormatError as e:
             raise FormatError(f"{footprint.GetReference()}: {e}")
-    return [(footprint.GetReference(),
-             footprintX(footprint, placeOffset, getCompensation(footprint)),
-             footprintY(footprint, placeOffset, getCompensation(footprint)),
+    posData = []
+    for footprint in footprints:
+        compensation = getCompensation(footprint)
+        posData.append((footprint.GetReference(),
+             footprintX(footprint, placeOffset, compensation),
+             footprintY(footprint, placeOffset, compensation),
              layerToSide(footprint.GetLayer()),
-             footprintOrientation(footprint, getCompensation(footprint), orientationHandling)) for footprint in footprints]
+             footprintOrientation(footprint, compensation, orientationHandling)))
+    return posData
 
 def posDataToFile(posData, filename):
     with open(filename, "w", newline="", encoding="utf-8") as csvfile:
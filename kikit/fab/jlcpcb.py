@@ -7,38 +7,21 @@ import shutil
 from pathlib import Path
 from kikit.fab.common import *
 from kikit.common import *
-from kikit.export import gerberImpl
+from kikit.export import gerberImpl, ZipSink
 
 def collectBom(components, lscsFields, ignore):
-    bom = {}
-    for c in components:
-        if getUnit(c) != 1:
-            continue
-        reference = getReference(c)
-        if reference.startswith("#PWR") or reference.startswith("#FL"):
-            continue
-        if reference in ignore:
-            continue
-        if getField(c, "JLCPCB_IGNORE") is not None and getField(c, "JLCPCB_IGNORE") != "":
-            continue
-        if hasattr(c, "in_bom") and not c.in_bom:
-            continue
-        if hasattr(c, "on_board") and not c.on_board:
-            continue
-        if hasattr(c, "dnp") and c.dnp:
-            continue
-        orderCode = None
-        for fieldName in lscsFields:
-            orderCode = getField(c, fieldName)
-            if orderCode is not None and orderCode.strip() != "":
-                break
-        cType = (
-            getField(c, "Value"),
-            getField(c, "Footprint"),
-            orderCode
+    def notIgnored(entry):
+        ignoreField = entry[1].get("JLCPCB_IGNORE")
+        return ignoreField is None or ignoreField == ""
+    def componentType(fields):
+        return (
+            fields.get("Value"),
+            fields.get("Footprint"),
+            firstField(fields, lscsFields,
+                       lambda x: x is not None and x.strip() != "")
         )
-        bom[cType] = bom.get(cType, []) + [reference]
-    return bom
+    return groupBom(filter(notIgnored, bomComponents(components, ignore)),
+                    componentType)
 
 def bomToCsv(bomData, filename):
     with open(filename, "w", newline="", encoding="utf-8") as csvfile:
@@ -57,7 +40,7 @@ def bomToCsv(bomData, filename):
 
 def exportJlcpcb(board, outputdir, assembly, schematic, ignore, field,
            corrections, correctionpatterns, missingerror, nametemplate, drc,
-           autoname):
+           autoname, jobs=1):
     """
     Prepare fabrication files for JLCPCB including their assembly service
     """
@@ -67,20 +50,20 @@ def exportJlcpcb(board, outputdir, assembly, schematic, ignore, field,
     if drc:
         ensurePassingDrc(loadedBoard)
 
-    refsToIgnore = parseReferences(ignore)
-    removeComponents(loadedBoard, refsToIgnore)
     Path(outputdir).mkdir(parents=True, exist_ok=True)
 
-    gerberdir = os.path.join(outputdir, "gerber")
-    shutil.rmtree(gerberdir, ignore_errors=True)
-    gerberImpl(board, gerberdir)
-
     if autoname:
         boardName = os.path.basename(board.replace(".kicad_pcb", ""))
         archiveName = expandNameTemplate(nametemplate, boardName + "-gerbers", loadedBoard)
     else:
         archiveName = expandNameTemplate(nametemplate, "gerbers", loadedBoard)
-    shutil.make_archive(os.path.join(outputdir, archiveName), "zip", outputdir, "gerber")
+    # Plot the board before we remove the ignored components; they are ignored
+    # only for the assembly
+    with ZipSink(os.path.join(outputdir, archiveName + ".zip"), "gerber") as sink:
+        gerberImpl(loadedBoard, sink, jobs=jobs)
+
+    refsToIgnore = parseReferences(ignore)
+    removeComponents(loadedBoard, refsToIgnore)
 
     if not assembly:
         return
@@ -100,10 +83,7 @@ def exportJlcpcb(board, outputdir, assembly, schematic, ignore, field,
     posData = collectPosData(loadedBoard, correctionFields,
         bom=bom_components, posFilter=noFilter, correctionFile=correctionpatterns,
         orientationHandling=FootprintOrientationHandling.MirrorBottom)
-    boardReferences = set([x[0] for x in posData])
-    bom = {key: [v for v in val if v in boardReferences] for key, val in bom.items()}
-    bom = {key: val for key, val in bom.items() if len(val) > 0}
-
+    bom = restrictBom(bom, set(x[0] for x in posData))
 
     missingFields = False
     for type, references in bom.items():
@@ -19,27 +19,8 @@ FOOTPRIINTREGEX = {
 }
 
 def collectBom(components, ignore):
-    bom = {}
-    for c in components:
-        if getUnit(c) != 1:
-            continue
-        reference = getReference(c)
-        if reference.startswith("#PWR") or reference.startswith("#FL"):
-            continue
-        if reference in ignore:
-            continue
-        if hasattr(c, "in_bom") and not c.in_bom:
-            continue
-        if hasattr(c, "on_board") and not c.on_board:
-            continue
-        if hasattr(c, "dnp") and c.dnp:
-            continue
-        cType = (
-            getField(c, "Value"),
-            getField(c, "Footprint")
-        )
-        bom[cType] = bom.get(cType, []) + [reference]
-    return bom
+    return groupBom(bomComponents(components, ignore),
+                    lambda fields: (fields.get("Value"), fields.get("Footprint")))
 
 def transcodeFootprint(footprint):
     for pattern, replacement in FOOTPRIINTREGEX.items():
@@ -151,9 +132,7 @@ def exportNeodenYY1(board, outputdir, schematic, ignore,
 
     posData = collectPosData(loadedBoard, correctionFields,
         bom=components, posFilter=noFilter, correctionFile=correctionpatterns)
-    boardReferences = set([x[0] for x in posData])
-    bom = {key: [v for v in val if v in boardReferences] for key, val in bom.items()}
-    bom = {key: val for key, val in bom.items() if len(val) > 0}
+    bom = restrictBom(bom, set(x[0] for x in posData))
 
     boundingBox = loadedBoard.GetBoardEdgesBoundingBox()
     pcbSize = (boundingBox.GetHeight() / mm, boundingBox.GetWidth() / mm, )
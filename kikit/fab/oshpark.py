@@ -2,12 +2,12 @@ import pcbnew
 import os
 import shutil
 from pathlib import Path
-from kikit.export import gerberImpl, exportSettingsOSHPark, fullGerberPlotPlan
+from kikit.export import gerberImpl, exportSettingsOSHPark, fullGerberPlotPlan, ZipSink
 from kikit.fab.common import ensurePassingDrc, expandNameTemplate
 
 plotPlanNoVCuts = [(name, id, comment) for name, id, comment in fullGerberPlotPlan if name != "CmtUser"]
 
-def exportOSHPark(board, outputdir, nametemplate, drc):
+def exportOSHPark(board, outputdir, nametemplate, drc, jobs=1):
     """
     Prepare fabrication files for OSH Park
     """
@@ -17,9 +17,7 @@ def exportOSHPark(board, outputdir, nametemplate, drc):
     if drc:
         ensurePassingDrc(loadedBoard)
 
-    gerberdir = os.path.join(outputdir, "gerber")
-    shutil.rmtree(gerberdir, ignore_errors=True)
-    gerberImpl(board, gerberdir, plot_plan=plotPlanNoVCuts, settings=exportSettingsOSHPark)
-
     archiveName = expandNameTemplate(nametemplate, "gerbers", loadedBoard)
-    shutil.make_archive(os.path.join(outputdir, archiveName), "zip", outputdir, "gerber")
+    with ZipSink(os.path.join(outputdir, archiveName + ".zip"), "gerber") as sink:
+        gerberImpl(loadedBoard, sink, plot_plan=plotPlanNoVCuts,
+                   settings=exportSettingsOSHPark, jobs=jobs)
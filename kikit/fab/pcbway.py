@@ -8,7 +8,7 @@ import shutil
 from pathlib import Path
 from kikit.fab.common import *
 from kikit.common import *
-from kikit.export import gerberImpl, exportSettingsPcbway
+from kikit.export import gerberImpl, exportSettingsPcbway, ZipSink
 
 def collectSolderTypes(board):
     result = {}
@@ -30,66 +30,21 @@ def addVirtualToRefsToIgnore(refsToIgnore, board):
 def collectBom(components, manufacturerFields, partNumberFields,
                descriptionFields, notesFields, typeFields, footprintFields,
                ignore):
-    bom = {}
-
     # Use KiCad footprint as fallback for footprint
-    footprintFields.append("Footprint")
+    footprintFields = footprintFields + ["Footprint"]
     # Use value as fallback for description
-    descriptionFields.append("Value")
-
-    for c in components:
-        if getUnit(c) != 1:
-            continue
-        reference = getReference(c)
-        if reference.startswith("#PWR") or reference.startswith("#FL") or reference in ignore:
-            continue
-        if hasattr(c, "in_bom") and not c.in_bom:
-            continue
-        if hasattr(c, "on_board") and not c.on_board:
-            continue
-        if hasattr(c, "dnp") and c.dnp:
-            continue
-        manufacturer = None
-        for manufacturerName in manufacturerFields:
-            manufacturer = getField(c, manufacturerName)
-            if manufacturer is not None:
-                break
-        partNumber = None
-        for partNumberName in partNumberFields:
-            partNumber = getField(c, partNumberName)
-            if partNumber is not None:
-                break
-        description = None
-        for descriptionName in descriptionFields:
-            description = getField(c, descriptionName)
-            if description is not None:
-                break
-        notes = None
-        for notesName in notesFields:
-            notes = getField(c, notesName)
-            if notes is not None:
-                break
-        solderType = None
-        for typeName in typeFields:
-            solderType = getField(c, typeName)
-            if solderType is not None:
-                break
-        footprint = None
-        for footprintName in footprintFields:
-            footprint = getField(c, footprintName)
-            if footprint is not None:
-                break
-
-        cType = (
-            description,
-            footprint,
-            manufacturer,
-            partNumber,
-            notes,
-            solderType
+    descriptionFields = descriptionFields + ["Value"]
+
+    def componentType(fields):
+        return (
+            firstField(fields, descriptionFields),
+            firstField(fields, footprintFields),
+            firstField(fields, manufacturerFields),
+            firstField(fields, partNumberFields),
+            firstField(fields, notesFields),
+            firstField(fields, typeFields)
         )
-        bom[cType] = bom.get(cType, []) + [reference]
-    return bom
+    return groupBom(bomComponents(components, ignore), componentType)
 
 def bomToCsv(bomData, filename, nBoards, types):
     with open(filename, "w", newline="", encoding="utf-8") as csvfile:
@@ -118,7 +73,8 @@ def bomToCsv(bomData, filename, nBoards, types):
 
 def exportPcbway(board, outputdir, assembly, schematic, ignore,
                  manufacturer, partnumber, description, notes, soldertype,
-                 footprint, corrections, correctionpatterns, missingerror, nboards, nametemplate, drc):
+                 footprint, corrections, correctionpatterns, missingerror, nboards, nametemplate, drc,
+                 jobs=1):
     """
     Prepare fabrication files for PCBWay including their assembly service
     """
@@ -128,16 +84,16 @@ def exportPcbway(board, outputdir, assembly, schematic, ignore,
     if drc:
         ensurePassingDrc(loadedBoard)
 
-    refsToIgnore = parseReferences(ignore)
-    removeComponents(loadedBoard, refsToIgnore)
     Path(outputdir).mkdir(parents=True, exist_ok=True)
 
-    gerberdir = os.path.join(outputdir, "gerber")
-    shutil.rmtree(gerberdir, ignore_errors=True)
-    gerberImpl(board, gerberdir, settings=exportSettingsPcbway)
-
+    # Plot the board before we remove the ignored components; they are ignored
+    # only for the assembly
     archiveName = expandNameTemplate(nametemplate, "gerbers", loadedBoard)
-    shutil.make_archive(os.path.join(outputdir, archiveName), "zip", outputdir, "gerber")
+    with ZipSink(os.path.join(outputdir, archiveName + ".zip"), "gerber") as sink:
+        gerberImpl(loadedBoard, sink, settings=exportSettingsPcbway, jobs=jobs)
+
+    refsToIgnore = parseReferences(ignore)
+    removeComponents(loadedBoard, refsToIgnore)
 
     if not assembly:
         return
@@ -3,6 +3,7 @@ import sys
 import click
 
 from .common import execute_with_debug
+from .cache_ui import cacheOptions, openCache
 
 def fabCommand(f):
     """
@@ -18,10 +19,38 @@ def fabCommand(f):
         help="Template for naming the output files.")(f)
     f = click.option("--debug", is_flag=True, default=False,
         help="Print extra debugging information")(f)
+    f = cacheOptions(f)
     return f
 
+def gerberJobsOption(f):
+    """
+    A decorator to add the option for parallel Gerber plotting
+    """
+    return click.option("--jobs", "-j", type=click.IntRange(min=1), default=1,
+        help="Plot the Gerber layers in this many worker processes")(f)
+
+def executeFab(kind, procedure, kwargs):
+    """
+    Execute the fab procedure, possibly reusing the outputs from the cache.
+    """
+    from kikit.fab.common import withBackgroundDrc
+    procedure = withBackgroundDrc(procedure)
+
+    cache, printStats = openCache(kwargs)
+    if cache is None:
+        return execute_with_debug(procedure, kwargs)
+
+    from kikit.cache import cachedRun, fabCacheKey
+    # The number of jobs does not affect the outputs
+    options = {k: v for k, v in kwargs.items() if k not in ["debug", "jobs"]}
+    cachedRun(cache, fabCacheKey(kind, options), kwargs["outputdir"],
+        lambda: execute_with_debug(procedure, kwargs))
+    if printStats:
+        sys.stderr.write(cache.formatStats() + "\n")
+
 @click.command()
 @fabCommand
+@gerberJobsOption
 @click.option("--assembly/--no-assembly", help="Generate files for SMT assembly (schematics is required)")
 @click.option("--schematic", type=click.Path(dir_okay=False), help="Board schematics (required for assembly files)")
 @click.option("--ignore", type=str, default="", help="Comma separated list of designators to exclude from SMT assembly")
@@ -39,10 +68,11 @@ def jlcpcb(**kwargs):
     from kikit.fab import jlcpcb
     from kikit.common import fakeKiCADGui
     app = fakeKiCADGui()
-    return execute_with_debug(jlcpcb.exportJlcpcb, kwargs)
+    return executeFab("jlcpcb", jlcpcb.exportJlcpcb, kwargs)
 
 @click.command()
 @fabCommand
+@gerberJobsOption
 @click.option("--assembly/--no-assembly", help="Generate files for SMT assembly (schematics is required)")
 @click.option("--schematic", type=click.Path(dir_okay=False), help="Board schematics (required for assembly files)")
 @click.option("--ignore", type=str, default="", help="Comma separated list of designators to exclude from SMT assembly")
@@ -71,11 +101,12 @@ def pcbway(**kwargs):
     from kikit.fab import pcbway
     from kikit.common import fakeKiCADGui
     app = fakeKiCADGui()
-    return execute_with_debug(pcbway.exportPcbway, kwargs)
+    return executeFab("pcbway", pcbway.exportPcbway, kwargs)
 
 
 @click.command()
 @fabCommand
+@gerberJobsOption
 def oshpark(**kwargs):
     """
     Prepare fabrication files for OSH Park
@@ -83,7 +114,7 @@ def oshpark(**kwargs):
     from kikit.fab import oshpark
     from kikit.common import fakeKiCADGui
     app = fakeKiCADGui()
-    return execute_with_debug(oshpark.exportOSHPark, kwargs)
+    return executeFab("oshpark", oshpark.exportOSHPark, kwargs)
 
 @click.command()
 @fabCommand
@@ -99,7 +130,7 @@ def neodenyy1(**kwargs):
     from kikit.fab import neodenyy1
     from kikit.common import fakeKiCADGui
     app = fakeKiCADGui()
-    return execute_with_debug(neodenyy1.exportNeodenYY1, kwargs)
+    return executeFab("neodenyy1", neodenyy1.exportNeodenYY1, kwargs)
 
 @click.command()
 @fabCommand
@@ -110,7 +141,7 @@ def openpnp(**kwargs):
     from kikit.fab import openpnp
     from kikit.common import fakeKiCADGui
     app = fakeKiCADGui()
-    return execute_with_debug(openpnp.exportOpenPnp, kwargs)
+    return executeFab("openpnp", openpnp.exportOpenPnp, kwargs)
 
 @click.group()
 def fab():
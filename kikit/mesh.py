@@ -0,0 +1,152 @@
+import numpy as np
+import shapely
+from shapely.geometry import Polygon, MultiPolygon, GeometryCollection
+from shapely.geometry.polygon import orient
+from typing import List, Tuple, Union
+
+# Direct generation of triangle meshes out of shapely geometry. The meshes are
+# prisms (extruded polygons), which is everything we need for stencils. We do
+# not depend on any 3D library; the polygons are triangulated by a conforming
+# Delaunay triangulation built on top of the (unconstrained) Delaunay
+# triangulation of GEOS.
+
+class MeshError(RuntimeError):
+    pass
+
+def _ringCoords(ring) -> np.ndarray:
+    # Drop the closing point
+    return np.asarray(ring.coords)[:-1, :2]
+
+def _edgeCodes(a: np.ndarray, b: np.ndarray, count: int) -> np.ndarray:
+    lo = np.minimum(a, b).astype(np.int64)
+    hi = np.maximum(a, b).astype(np.int64)
+    return lo * count + hi
+
+def triangulatePolygon(polygon: Polygon, maxIterations: int=32) \
+        -> Tuple[np.ndarray, List[np.ndarray]]:
+    """
+    Triangulate a polygon with holes. Returns an array of triangles of shape
+    (n, 3, 2) in counter-clockwise orientation and the rings of the polygon
+    (exterior first, counter-clockwise; holes clockwise). The rings may contain
+    extra points on their edges; the triangles share all the ring edges, so
+    the rings can be used to build side walls of a closed mesh.
+    """
+    polygon = orient(polygon, 1.0)
+    rings = [_ringCoords(polygon.exterior)] + [_ringCoords(r) for r in polygon.interiors]
+    for _ in range(maxIterations):
+        ringPoints = np.concatenate(rings)
+        triangulation = shapely.delaunay_triangles(shapely.multipoints(ringPoints))
+        triangles = shapely.get_coordinates(triangulation).reshape(-1, 4, 2)[:, :3, :]
+
+        # Index all the points; the triangulation reuses the input coordinates
+        allPoints = np.ascontiguousarray(np.concatenate([ringPoints, triangles.reshape(-1, 2)]))
+        # Viewing the points as complex numbers makes np.unique much faster
+        # than with axis=0
+        _, indices = np.unique(allPoints.view(np.complex128), return_inverse=True)
+        indices = indices.reshape(-1)
+        count = indices.max() + 1
+        ringIdx = indices[:len(ringPoints)]
+        triIdx = indices[len(ringPoints):].reshape(-1, 3)
+
+        edges = np.concatenate([
+            _edgeCodes(triIdx[:, 0], triIdx[:, 1], count),
+            _edgeCodes(triIdx[:, 1], triIdx[:, 2], count),
+            _edgeCodes(triIdx[:, 2], triIdx[:, 0], count)])
+
+        # Every ring segment has to be an edge of the triangulation, otherwise
+        # we split the segment and try again
+        bounds = np.cumsum([0] + [len(r) for r in rings])
+        successors = np.concatenate([np.roll(ringIdx[s:e], -1)
+                                     for s, e in zip(bounds[:-1], bounds[1:])])
+        missing = ~np.isin(_edgeCodes(ringIdx, successors, count), edges)
+        if not missing.any():
+            break
+        newRings = []
+        for ring, s, e in zip(rings, bounds[:-1], bounds[1:]):
+            positions = np.nonzero(missing[s:e])[0]
+            if len(positions) > 0:
+                midpoints = (ring[positions] + np.roll(ring, -1, axis=0)[positions]) / 2
+                ring = np.insert(ring, positions + 1, midpoints, axis=0)
+            newRings.append(ring)
+        rings = newRings
+    else:
+        raise MeshError("Cannot triangulate the polygon; its edges are too close to each other")
+
+    # The triangles are either completely inside or completely outside of the
+    # polygon, so the centroid decides
+    centroids = triangles.mean(axis=1)
+    shapely.prepare(polygon)
+    inside = shapely.contains_xy(polygon, centroids[:, 0], centroids[:, 1])
+    triangles = triangles[inside]
+    area = _signedArea(triangles)
+    triangles = triangles[np.abs(area) > 0]
+    area = area[np.abs(area) > 0]
+    triangles[area < 0] = triangles[area < 0][:, ::-1, :]
+    return triangles, rings
+
+def _signedArea(triangles: np.ndarray) -> np.ndarray:
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    return ((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) -
+            (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])) / 2
+
+def _polygons(geometry) -> List[Polygon]:
+    if isinstance(geometry, Polygon):
+        return [] if geometry.is_empty else [geometry]
+    if isinstance(geometry, (MultiPolygon, GeometryCollection)):
+        return [p for g in geometry.geoms for p in _polygons(g)]
+    return []
+
+def extrude(geometry: Union[Polygon, MultiPolygon], bottom: float, top: float) \
+        -> np.ndarray:
+    """
+    Extrude the polygons in geometry between given heights. Returns the facets
+    of a closed mesh as an array of shape (n, 3, 3) with outward-facing
+    counter-clockwise vertex order.
+    """
+    facets = []
+    for polygon in _polygons(geometry):
+        triangles, rings = triangulatePolygon(polygon)
+        n = len(triangles)
+        bottomCap = np.concatenate([triangles[:, ::-1, :], np.full((n, 3, 1), bottom)], axis=2)
+        topCap = np.concatenate([triangles, np.full((n, 3, 1), top)], axis=2)
+        facets += [bottomCap, topCap]
+        for ring in rings:
+            a = ring
+            b = np.roll(ring, -1, axis=0)
+            a0 = np.column_stack([a, np.full(len(a), bottom)])
+            b0 = np.column_stack([b, np.full(len(b), bottom)])
+            a1 = np.column_stack([a, np.full(len(a), top)])
+            b1 = np.column_stack([b, np.full(len(b), top)])
+            facets.append(np.stack([a0, b0, b1], axis=1))
+            facets.append(np.stack([a0, b1, a1], axis=1))
+    if len(facets) == 0:
+        return np.zeros((0, 3, 3))
+    return np.concatenate(facets)
+
+def mirrorY(facets: np.ndarray) -> np.ndarray:
+    """
+    Mirror the mesh along the XZ plane, keeping the facets outward-facing.
+    """
+    mirrored = facets * np.array([1, -1, 1])
+    return mirrored[:, ::-1, :]
+
+def writeBinaryStl(filename: str, facets: np.ndarray, name: str="KiKit") -> None:
+    """
+    Write the facets (an array of shape (n, 3, 3)) as a binary STL file.
+    """
+    normals = np.cross(facets[:, 1] - facets[:, 0], facets[:, 2] - facets[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    lengths[lengths == 0] = 1
+    normals = normals / lengths[:, None]
+
+    record = np.dtype([
+        ("normal", "<f4", (3,)),
+        ("vertices", "<f4", (3, 3)),
+        ("attribute", "<u2")])
+    data = np.zeros(len(facets), dtype=record)
+    data["normal"] = normals
+    data["vertices"] = facets
+    with open(filename, "wb") as f:
+        f.write(name.encode("ascii", errors="replace")[:80].ljust(80, b" "))
+        f.write(np.uint32(len(facets)).tobytes())
+        f.write(data.tobytes())
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from ..substrate import linestringToKicad
+from ..substrate import appendToShapePolySet
 from ..defs import Layer
 from ..common import KiAngle, KiLength, fromDegrees, fromMm
 from ..pcbnew_utils import increaseZonePriorities
@@ -41,9 +41,7 @@ class KiCADCopperFillMixin(PanelFeature):
                 continue
             zoneContainer = pcbnew.ZONE(panel.board)
             self._adjustZoneParameters(zoneContainer)
-            zoneContainer.Outline().AddOutline(linestringToKicad(g.exterior))
-            for hole in g.interiors:
-                zoneContainer.Outline().AddHole(linestringToKicad(hole))
+            appendToShapePolySet(zoneContainer.Outline(), g)
             zoneContainer.SetAssignedPriority(0)
 
             for l in self.layers:
@@ -144,9 +142,7 @@ class HexCopperFill(PanelFeature):
             if g.area < self.threshold * baseHexArea:
                 continue
             zoneContainer = pcbnew.ZONE(panel.board)
-            zoneContainer.Outline().AddOutline(linestringToKicad(g.exterior))
-            for hole in g.interiors:
-                zoneContainer.Outline().AddHole(linestringToKicad(hole))
+            appendToShapePolySet(zoneContainer.Outline(), g)
             zoneContainer.SetAssignedPriority(0)
 
             for l in self.layers:
@@ -9,7 +9,7 @@ from kikit.pcbnew_utils import resolveItem, setDoNotAllowZoneFills, DIM_UNITS_MO
 
 from pathlib import Path
 
-from typing import Any, Callable, Dict, Iterable, List, Set, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 from enum import Enum
 from shapely.geometry import (Polygon, MultiPolygon, Point, LineString, box,
                               GeometryCollection, MultiLineString)
@@ -28,7 +28,8 @@ from dataclasses import dataclass
 from kikit import substrate
 from kikit import units
 from kikit.kicadUtil import getPageDimensionsFromAst
-from kikit.substrate import Substrate, linestringToKicad, extractRings, TabError, TabFilletError
+from kikit.substrate import (Substrate, linestringToKicad, appendToShapePolySet,
+    extractRings, TabError, TabFilletError)
 from kikit.defs import PAPER_DIMENSIONS, STROKE_T, Layer, EDA_TEXT_HJUSTIFY_T, EDA_TEXT_VJUSTIFY_T, PAPER_SIZES
 from kikit.common import *
 from kikit.sexpr import isElement, parseSexprF, SExpr, Atom, findNode, parseSexprListF
@@ -202,22 +203,33 @@ def getOriginCoord(origin, bBox):
         return VECTOR2I(bBox.GetX() + bBox.GetWidth(), bBox.GetY() + bBox.GetHeight())
 
 def appendItem(board: pcbnew.BOARD, item: pcbnew.BOARD_ITEM,
-               yieldMapping: Optional[Callable[[str, str], None]]=None) -> None:
+               yieldMapping: Optional[Callable[[str, str], None]]=None,
+               mappedIds: Optional[Set[str]]=None) -> None:
     """
     Make a coppy of the item and append it to the board. Allows to append items
     from one board to another.
 
     It can also yield mapping between old item identifier and a new one via the
     yieldMapping callback. This callback is invoked with an old ID and the new
-    ID. Mapping is applicable only in v6.
+    ID. Mapping is applicable only in v6. If mappedIds is given, the mapping is
+    yielded only for these old identifiers.
+    """
+    board.Add(duplicateItem(item, yieldMapping, mappedIds))
+
+def duplicateItem(item: pcbnew.BOARD_ITEM,
+                  yieldMapping: Optional[Callable[[str, str], None]]=None,
+                  mappedIds: Optional[Set[str]]=None) -> pcbnew.BOARD_ITEM:
+    """
+    Make a copy of the item with new identifiers that is not part of any board
+    yet. The mapping of the identifiers is yielded the same way as in
+    appendItem.
     """
     try:
-        newItem = item.Duplicate()
+        newItem = item.Duplicate().Cast()
     except TypeError: # Footprint has overridden the method, cannot be called directly
         newItem = pcbnew.Cast_to_BOARD_ITEM(item).Duplicate().Cast()
-    board.Add(newItem)
     if not yieldMapping:
-        return
+        return newItem
     if isinstance(item, pcbnew.FOOTPRINT):
         newFootprint = pcbnew.Cast_to_FOOTPRINT(newItem)
         for getter in [lambda x: x.Pads(), lambda x: x.GraphicalItems(), lambda x: x.Zones()]:
@@ -225,9 +237,15 @@ def appendItem(board: pcbnew.BOARD, item: pcbnew.BOARD_ITEM,
             newList = getter(newFootprint)
             assert len(oldList) == len(newList)
             for o, n in zip(oldList, newList):
+                oldId = o.m_Uuid.AsString()
+                if mappedIds is not None and oldId not in mappedIds:
+                    continue
                 assert o.GetPosition() == n.GetPosition()
-                yieldMapping(o.m_Uuid.AsString(), n.m_Uuid.AsString())
-    yieldMapping(item.m_Uuid.AsString(), newItem.m_Uuid.AsString())
+                yieldMapping(oldId, n.m_Uuid.AsString())
+    oldId = item.m_Uuid.AsString()
+    if mappedIds is None or oldId in mappedIds:
+        yieldMapping(oldId, newItem.m_Uuid.AsString())
+    return newItem
 
 def collectNetNames(board):
     return [str(x) for x in board.GetNetInfo().NetsByName() if len(str(x)) > 0]
@@ -312,6 +330,19 @@ def undoTransformation(point, rotation, origin, translation):
     # We build a fresh VECTOR2I - otherwise there is a shared reference
     return VECTOR2I(segment.GetStartX(), segment.GetStartY())
 
+class RevertTransformation:
+    """
+    Callable object that reverts a board placement; i.e., maps a point in the
+    panel to the source board. Unlike a closure, it can be pickled.
+    """
+    def __init__(self, rotation, origin, translation):
+        self.rotation = rotation
+        self.origin = origin
+        self.translation = translation
+
+    def __call__(self, point):
+        return undoTransformation(point, self.rotation, self.origin, self.translation)
+
 def removeCutsFromFootprint(footprint):
     """
     Find all graphical items in the footprint, remove them and return them as a
@@ -326,13 +357,26 @@ def removeCutsFromFootprint(footprint):
         footprint.Remove(e)
     return edges
 
-def renameNets(board, renamer):
+def renameNets(board, renamer, items=None):
     """
     Given a board and renaming function (taking original name, returning new
-    name) renames the nets
+    name) renames the nets. If items are given, only the nets used by the
+    items are renamed and only the items are remapped; otherwise all nets of
+    the board are renamed.
+
+    Returns a dictionary mapping original net names to the new nets (including
+    the unconnected net).
     """
-    originalNetNames = collectNetNames(board)
     netinfo = board.GetNetInfo()
+    wholeBoard = items is None
+    if wholeBoard:
+        originalNetNames = collectNetNames(board)
+        items = chain(board.GetPads(), board.GetTracks(), board.Zones(),
+                      (d for d in board.GetDrawings() if hasattr(d, "GetNetname")))
+    else:
+        items = [x for x in items if hasattr(x, "GetNetname")]
+        originalNetNames = list(dict.fromkeys(
+            x.GetNetname() for x in items if x.GetNetname() != ""))
 
     newNetMapping = { "": netinfo.GetNetItem("") }
     newNames = set()
@@ -343,22 +387,26 @@ def renameNets(board, renamer):
         board.Add(newNet)
         newNames.add(newName)
 
-    remapNets(board.GetPads(), newNetMapping)
-    remapNets(board.GetTracks(), newNetMapping)
-    remapNets(board.Zones(), newNetMapping)
-    remapNets((d for d in board.GetDrawings()
-               if hasattr(d, "GetNetname") and d.GetNetname() in newNetMapping), newNetMapping)
+    remapNets((x for x in items if x.GetNetname() in newNetMapping), newNetMapping)
 
+    if not wholeBoard:
+        # The items we did not remap still refer to the original nets
+        return newNetMapping
     for name in originalNetNames:
         if name != "" and name not in newNames:
             board.RemoveNative(netinfo.GetNetItem(name))
+    return newNetMapping
 
-def renameRefs(board, renamer, bakeRef):
+def renameRefs(board, renamer, bakeRef, footprints=None):
     """
     Given a board and renaming function (taking original name, returning new
-    name) renames the references
+    name) renames the references. If footprints are given, only these are
+    renamed. Returns a list of texts created by baking the references.
     """
-    for footprint in board.GetFootprints():
+    if footprints is None:
+        footprints = board.GetFootprints()
+    bakedTexts = []
+    for footprint in footprints:
         ref = footprint.Reference()
         if bakeRef:
             textObject = pcbnew.PCB_TEXT(board)
@@ -373,8 +421,10 @@ def renameRefs(board, renamer, bakeRef):
             textObject.SetLayer(ref.GetLayer())
             textObject.SetMirrored(ref.IsMirrored())
             board.Add(textObject)
+            bakedTexts.append(textObject)
             ref.SetVisible(False)
         ref.SetText(renamer(ref.GetText()))
+    return bakedTexts
 
 def isBoardEdge(edge):
     """
@@ -384,6 +434,124 @@ def isBoardEdge(edge):
     """
     return isinstance(edge, pcbnew.PCB_SHAPE) and edge.GetLayer() == pcbnew.Edge_Cuts
 
+def resolveSourceArea(board: pcbnew.BOARD, index: BoardItemIndex,
+                      sourceArea: Optional[BOX2I], shrink: bool) \
+                        -> Tuple[BOX2I, KiLength]:
+    """
+    Given the user-specified source area of a board, return the actual source
+    area (auto detected or shrunk) and the width of the widest board edge.
+    """
+    if not sourceArea:
+        sourceArea = findBoardBoundingBox(board, index=index)
+    elif shrink:
+        sourceArea = findBoardBoundingBox(board, sourceArea, index=index)
+    edgeMaxWidth = max(
+        (e.GetWidth() for e in index.edges(Layer.Edge_Cuts)),
+        default=0)
+    return sourceArea, edgeMaxWidth
+
+def placementTransform(rotation: KiAngle, origin: KiPoint,
+                       translation: KiPoint) -> List[float]:
+    """
+    Return the affine transformation (in the format of
+    shapely.affinity.affine_transform) that places a board item the same way
+    as rotating it by rotation around origin and moving it by translation.
+    """
+    # Abuse KiCAD to get the same rotation convention as for the board items.
+    # We probe far enough from the origin so the rounding doesn't matter.
+    probe = fromMm(100)
+    def place(x, y):
+        segment = pcbnew.PCB_SHAPE()
+        segment.SetShape(STROKE_T.S_SEGMENT)
+        segment.SetStart(VECTOR2I(int(origin[0] + x), int(origin[1] + y)))
+        segment.SetEnd(VECTOR2I(int(origin[0]), int(origin[1])))
+        segment.Rotate(toKiCADPoint(origin), rotation)
+        segment.Move(toKiCADPoint(translation))
+        return np.array([segment.GetStartX(), segment.GetStartY()], dtype=float)
+    center = np.array([origin[0] + translation[0], origin[1] + translation[1]], dtype=float)
+    xAxis = (place(probe, 0) - center) / probe
+    yAxis = (place(0, probe) - center) / probe
+    offset = center - xAxis * origin[0] - yAxis * origin[1]
+    return [xAxis[0], yAxis[0], xAxis[1], yAxis[1], offset[0], offset[1]]
+
+def placeGeometry(wkb: bytes, transformation: List[float]):
+    """
+    Place geometry given as WKB by the transformation from placementTransform.
+    The coordinates are rounded half away from zero like KiROUND does.
+    """
+    geometry = shapely.affinity.affine_transform(shapely.from_wkb(wkb),
+                                                 transformation)
+    return shapely.transform(geometry, lambda c: np.trunc(c + np.copysign(0.5, c)))
+
+@dataclass
+class PreparedSource:
+    """
+    The part of appending a board that doesn't depend on its placement: the
+    resolved source area (as a shapely box), the width of the widest board
+    edge, the board substrate in the source coordinates (as WKB) and the zone
+    outlines cropped by the substrate (as WKB indexed by the zone UUID; None
+    for zones that need no cropping). It can be computed in a worker process,
+    see Panel.appendBoards.
+
+    Arcs of the board edges are approximated in the source coordinates and the
+    result is placed afterwards. Therefore, the placed substrate and zone
+    outlines differ from the ones built from the placed board items by up to
+    the arc approximation error and rounding.
+    """
+    sourceArea: Box
+    edgeMaxWidth: int
+    substrate: bytes
+    zones: Dict[str, Optional[bytes]]
+
+    def sourceRect(self) -> BOX2I:
+        return shpBoxToRect(self.sourceArea)
+
+    def placedSubstrate(self, transformation: List[float],
+                        revertTransformation=None) -> Substrate:
+        s = Substrate([], revertTransformation=revertTransformation)
+        s.union(placeGeometry(self.substrate, transformation))
+        s.orient()
+        return s
+
+def prepareSourceBoard(filename: str, sourceArea: Optional[Box], shrink: bool,
+                       tolerance: KiLength) -> Optional[PreparedSource]:
+    """
+    Load the board and compute its PreparedSource. The source area is given as
+    a shapely box so the function can be invoked in a worker process. Returns
+    None when the substrate cannot be built; appendBoard then reports the
+    error with the proper context.
+    """
+    board = LoadBoard(str(filename))
+    itemIndex = BoardItemIndex(board)
+    area = shpBoxToRect(sourceArea) if sourceArea is not None else None
+    area, edgeMaxWidth = resolveSourceArea(board, itemIndex, area, shrink)
+    enlargedSourceArea = expandRect(area, tolerance + edgeMaxWidth)
+
+    edges = [e for f in itemIndex.footprints(enlargedSourceArea)
+               for e in f.GraphicalItems() if e.GetLayer() == Layer.Edge_Cuts]
+    edges += [d for d in itemIndex.drawings(enlargedSourceArea) if isBoardEdge(d)]
+    try:
+        s = Substrate(edges, 0)
+    except substrate.PositionError:
+        return None
+    exterior = s.exterior()
+    shapely.prepare(exterior)
+    zones = {}
+    for zone in itemIndex.zones(enlargedSourceArea):
+        cropped = cropZoneByPolygon(zone, exterior)
+        zones[zone.m_Uuid.AsString()] = \
+            shapely.to_wkb(cropped) if cropped is not None else None
+    return PreparedSource(
+        sourceArea=rectToShpBox(area).bounds,
+        edgeMaxWidth=edgeMaxWidth,
+        substrate=shapely.to_wkb(s.substrates),
+        zones=zones)
+
+def _initPrepareWorker():
+    from kikit.common import fakeKiCADGui
+    global _prepareWorkerApp
+    _prepareWorkerApp = fakeKiCADGui()
+
 def tabSpacing(width, count):
     """
     Given a width of board edge and tab count, return an iterable with tab
@@ -406,35 +574,44 @@ def polygonToZone(polygon, board):
     added to the board.
     """
     zone = pcbnew.ZONE(board)
-    boundary = polygon.exterior
-    zone.Outline().AddOutline(linestringToKicad(boundary))
-    for hole in polygon.interiors:
-        boundary = hole.exterior
-        zone.Outline().AddHole(linestringToKicad(boundary))
+    appendToShapePolySet(zone.Outline(), polygon)
     return zone
 
-def cropZoneByPolygon(zone: pcbnew.ZONE, polygon: Polygon) -> None:
+def cropZoneByPolygon(zone: pcbnew.ZONE, polygon: Polygon) \
+        -> Optional[Union[Polygon, MultiPolygon, GeometryCollection]]:
     """
     Modify the zone so it is cropped by the polygon. If the zone is split into
     multiple zones, return all of them. Handles holes in both the original zone
     and the cropping polygon.
+
+    Zones fully contained in the polygon are left intact. Returns the new
+    geometry of the zone or None if the zone was left intact. When cropping
+    many zones by a single polygon, prepare the polygon via shapely.prepare.
     """
+    bBox = zone.GetBoundingBox()
+    if polygon.contains(box(bBox.GetX(), bBox.GetY(),
+                            bBox.GetX() + bBox.GetWidth(),
+                            bBox.GetY() + bBox.GetHeight())):
+        return None
     zoneGeom = substrate.shapePolyToShapely(zone.Outline())
     if not zoneGeom.is_valid:
         # The zones might be self-intersecting.
         zoneGeom = zoneGeom.buffer(0)
         if not zoneGeom.is_valid:
             raise PanelError("Zone geometry is invalid")
+    elif polygon.contains(zoneGeom):
+        return None
     intersection = zoneGeom.intersection(polygon)
+    setZoneOutline(zone, intersection)
+    return intersection
 
+def setZoneOutline(zone: pcbnew.ZONE,
+                   geometry: Union[Polygon, MultiPolygon, GeometryCollection]) -> None:
+    """
+    Replace the outline of the zone by the polygons in the geometry.
+    """
     zone.Outline().RemoveAllContours()
-    geoms = [intersection] if isinstance(intersection, Polygon) else intersection.geoms
-    for geom in geoms:
-        if not hasattr(geom, "exterior"):
-            continue
-        zone.Outline().AddOutline(linestringToKicad(geom.exterior))
-        for hole in geom.interiors:
-            zone.Outline().AddHole(linestringToKicad(hole))
+    appendToShapePolySet(zone.Outline(), geometry)
 
 def buildTabs(panel: "Panel", substrate: Substrate,
               partitionLines: Union[GeometryCollection, LineString],
@@ -468,9 +645,11 @@ def addFrameFillets(frameGeometry, boardSubstrates, fillet, panel=None):
     carrying tab annotations, shoot reverse tabs toward the frame and fillet
     them. Returns the modified frame geometry.
 
-    If panel is provided, stores debug geometry (reverse tabs, raw frame) on it.
+    If panel is provided and it records debug geometry, stores the reverse tabs
+    and the raw frame on it.
     """
-    if panel is not None:
+    recordDebug = panel is not None and panel.recordDebugGeometry
+    if recordDebug:
         panel.debugRawFrame.append(frameGeometry)
 
     if fillet == 0:
@@ -494,7 +673,7 @@ def addFrameFillets(frameGeometry, boardSubstrates, fillet, panel=None):
             except (TabError, TabFilletError):
                 pass  # Tab doesn't reach this frame piece (e.g. board-to-board tab)
 
-    if panel is not None:
+    if recordDebug:
         panel.debugReverseTabs.extend(tabs)
 
     if tabs:
@@ -605,6 +784,9 @@ class Panel:
         self.backbonePieces: Optional[List[Polygon]] = None
         self.debugReverseTabs: List[Polygon] = []
         self.debugRawFrame: List[Union[Polygon, MultiPolygon]] = []
+        # The geometry above (except for backbonePieces) serves only for
+        # debugRenderTabFillet; you can turn off its recording to save memory
+        self.recordDebugGeometry: bool = True
 
         self.annotationReader: AnnotationReader = AnnotationReader.getDefault()
         self.drcExclusions: List[DrcExclusion] = []
@@ -613,6 +795,12 @@ class Panel:
         self.newNetClasses: Dict[str, Any] = {}
         self.netCLassPatterns: List[Dict[str, str]] = []
         self.netClassAssignments: Dict[str, List[str]] = {}
+        # Parsed source projects and net class assignments, see _sourceNetClasses
+        self._netClassCache: Dict[Tuple[str, int, Tuple[str, ...]], Any] = {}
+        # Zone crops of appended boards relative to the placement, see _cropZone
+        self._zoneCropCache: Dict[Tuple, Any] = {}
+        # Loaded source boards and their indices, see _sourceBoard
+        self._sourceBoards: Dict[str, Tuple[float, pcbnew.BOARD, BoardItemIndex]] = {}
         self.customDRCRules: List[SExpr] = []
 
         # KiCAD allows to keep text variables for project. We keep a set of
@@ -864,6 +1052,43 @@ class Panel:
 
         return assignment
 
+    def _sourceNetClasses(self, proFilename: str, boardNetsNames: List[str]) \
+            -> Optional[Tuple[Any, List[Tuple[str, str]], Dict[str, Set[str]], List[str]]]:
+        """
+        Read the project of a source board and assign the board nets to net
+        classes. Returns the project, net class patterns, assignment of nets to
+        classes and nets that fall into the Default class. The result is cached
+        per project file as we usually append the same board many times.
+
+        Returns None if there is no project.
+        """
+        try:
+            mtime = os.stat(proFilename).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        key = (os.path.abspath(proFilename), mtime, tuple(boardNetsNames))
+        cached = self._netClassCache.get(key)
+        if cached is not None:
+            return cached
+
+        with open(proFilename, encoding="utf-8") as f:
+            project = json.load(f)
+        netClassPatterns = [
+            (p["netclass"], p["pattern"])
+            for p in project["net_settings"].get("netclass_patterns", [])
+        ]
+        netAssignment = self._assignNetToClasses(boardNetsNames, netClassPatterns)
+
+        seenNets = set()
+        for c in project["net_settings"]["classes"]:
+            seenNets.update(c.get("nets", []))
+            seenNets.update(netAssignment.get(c["name"], []))
+        defaultNets = [name for name in boardNetsNames if name not in seenNets]
+
+        result = (project, netClassPatterns, netAssignment, defaultNets)
+        self._netClassCache[key] = result
+        return result
+
     def _inheritNetClasses(self, board, netRenamer):
         """
         KiCADhas broken API for net classes. Therefore, we have to load and save
@@ -874,41 +1099,38 @@ class Panel:
         non-conflicting way.
         """
         proFilename = os.path.splitext(board.GetFileName())[0]+'.kicad_pro'
-        try:
-            with open(proFilename, encoding="utf-8") as f:
-                project = json.load(f)
-        except FileNotFoundError:
+        netClasses = self._sourceNetClasses(proFilename, collectNetNames(board))
+        if netClasses is None:
             # If the source board doesn't contain project, there's nothing to
             # inherit.
             return
+        project, netClassPatterns, netAssignment, defaultNets = netClasses
 
-        boardNetsNames = collectNetNames(board)
-        netClassPatterns = [
-            (p["netclass"], p["pattern"])
-            for p in project["net_settings"].get("netclass_patterns", [])
-        ]
-        netAssignment = self._assignNetToClasses(boardNetsNames, netClassPatterns)
-
-        seenNets = set()
+        defaultClassNets = set(defaultNets)
         for c in project["net_settings"]["classes"]:
             origName = c["name"]
-            c["name"] = netRenamer(c["name"])
+            c = dict(c, name=netRenamer(origName))
             nc = NetClass(c)
             for net in chain(nc.originalNets, netAssignment.get(origName, [])):
-                seenNets.add(net)
                 nc.addNet(netRenamer(net))
+                if origName == "Default":
+                    defaultClassNets.add(net)
             self.newNetClasses[nc.name] = nc
 
         defaultNetClass = self.newNetClasses[netRenamer("Default")]
-        for name in boardNetsNames:
-            if name in seenNets:
-                continue
+        for name in defaultNets:
             defaultNetClass.addNet(netRenamer(name))
 
-        for net in defaultNetClass.nets:
+        # Listing every net of the Default class as a separate pattern bloats
+        # the project (boards x nets patterns) and slows down KiCAD. Therefore,
+        # we emit a single anchored regular expression for the whole board
+        # instance. It includes the nets explicitly listed in the Default class
+        # (KiCAD 6 projects).
+        if len(defaultClassNets) > 0:
+            renamedDefaultNets = sorted(netRenamer(name) for name in defaultClassNets)
             self.netCLassPatterns.append({
                 "netclass": defaultNetClass.name,
-                "pattern": net
+                "pattern": "^(" + "|".join(re.escape(n) for n in renamedDefaultNets) + ")$"
             })
         for netclass, pattern in netClassPatterns:
             self.netCLassPatterns.append({
@@ -1098,7 +1320,8 @@ class Panel:
                     netRenamer: Optional[Callable[[int, str], str]] = None,
                     refRenamer: Optional[Callable[[int, str], str]] = None,
                     inheritDrc: bool = True, interpretAnnotations: bool=True,
-                    bakeText: bool = False, bakeRef: bool = False):
+                    bakeText: bool = False, bakeRef: bool = False,
+                    prepared: Optional[PreparedSource] = None):
         """
         Appends a board to the panel.
 
@@ -1125,6 +1348,13 @@ class Panel:
 
         Similarly, you can substitute variables in the text via bakeText.
 
+        The source file is loaded and indexed only once per panel (and again when
+        it changes), so extracting multiple boards from a single file is cheap.
+
+        If you pass prepared (PreparedSource, see prepareSourceBoard), the
+        source area, the substrate and the zone crops are taken from it instead
+        of being computed from the loaded board. This is what appendBoards uses.
+
         Returns bounding box (BOX2I) of the extracted area placed at the
         destination and the extracted substrate of the board.
         """
@@ -1135,11 +1365,9 @@ class Panel:
             raise RuntimeError("Board rotation has to be passed as EDA_ANGLE, not a number")
 
 
-        board = LoadBoard(str(filename))
+        board, itemIndex = self._sourceBoard(filename)
         if inheritDrc:
             self.sourcePaths.add(filename)
-        if bakeText:
-            bakeTextVars(board)
 
         thickness = board.GetDesignSettings().GetBoardThickness()
         if len(self.substrates) == 0:
@@ -1153,18 +1381,6 @@ class Panel:
         self.inheritCopperLayers(board)
         self.inheritEnabledLayers(board)
 
-        if not sourceArea:
-            sourceArea = findBoardBoundingBox(board)
-        elif shrink:
-            sourceArea = findBoardBoundingBox(board, sourceArea)
-        edgeMaxWidth = max(
-            (e.GetWidth() for e in collectEdges(board, Layer.Edge_Cuts)),
-            default=0)
-        enlargedSourceArea = expandRect(sourceArea, tolerance + edgeMaxWidth)
-        originPoint = getOriginCoord(origin, sourceArea)
-        translation = VECTOR2I(destination[0] - originPoint[0],
-                              destination[1] - originPoint[1])
-
         if netRenamer is None:
             netRenamer = lambda x, y: self._uniquePrefix() + y
         bId = len(self.substrates)
@@ -1173,19 +1389,64 @@ class Panel:
         self._inheritNetClasses(board, netRenamerFn)
         self._inheriCustomDrcRules(board, netRenamerFn)
 
-        renameNets(board, netRenamerFn)
-        if refRenamer is not None:
-            renameRefs(board, lambda x: refRenamer(len(self.substrates), x), bakeRef)
+        if prepared is not None:
+            sourceArea = prepared.sourceRect()
+            edgeMaxWidth = prepared.edgeMaxWidth
+        else:
+            sourceArea, edgeMaxWidth = resolveSourceArea(board, itemIndex,
+                                                         sourceArea, shrink)
+        enlargedSourceArea = expandRect(sourceArea, tolerance + edgeMaxWidth)
+        originPoint = getOriginCoord(origin, sourceArea)
+        translation = VECTOR2I(destination[0] - originPoint[0],
+                              destination[1] - originPoint[1])
 
-        drawings = collectItems(board.GetDrawings(), enlargedSourceArea)
-        footprints = collectFootprints(board.GetFootprints(), enlargedSourceArea)
-        tracks = collectItems(board.GetTracks(), enlargedSourceArea)
-        zones = collectZones(board.Zones(), enlargedSourceArea)
+        try:
+            exclusions = readBoardDrcExclusions(board)
+        except FileNotFoundError:
+            exclusions = [] # Ignore boards without a project
 
+        # The source board is shared by all extractions from the file, so we
+        # modify and append copies of the extracted items. The mapping of item
+        # identifiers is needed only to transfer the DRC exclusions, so we
+        # track only the items the exclusions refer to and only once the item
+        # is appended to the panel.
         itemMapping: Dict[str, str] = {} # string KIID to string KIID
-        def yieldMapping(old: str, new: str) -> None:
-            nonlocal itemMapping
-            itemMapping[old] = new
+        copyMapping: Dict[str, List[Tuple[str, str]]] = {}
+        excludedIds = set(x.m_Uuid.AsString() for e in exclusions for x in e.objects)
+        def extract(item):
+            if len(excludedIds) == 0:
+                return duplicateItem(item)
+            mapping: List[Tuple[str, str]] = []
+            copy = duplicateItem(item, lambda o, n: mapping.append((o, n)), excludedIds)
+            copyMapping[copy.m_Uuid.AsString()] = mapping
+            return copy
+        def appendToPanel(item):
+            self.board.Add(item)
+            itemMapping.update(copyMapping.get(item.m_Uuid.AsString(), []))
+
+        drawings = [extract(x) for x in itemIndex.drawings(enlargedSourceArea)]
+        footprints = [extract(x) for x in itemIndex.footprints(enlargedSourceArea)]
+        tracks = [extract(x) for x in itemIndex.tracks(enlargedSourceArea)]
+        # We remember the source identifiers of the zones to reuse their crops
+        zones = [(x.m_Uuid.AsString(), extract(x))
+                 for x in itemIndex.zones(enlargedSourceArea)]
+
+        if bakeText:
+            for drawing in drawings:
+                if isinstance(drawing, pcbnew.PCB_TEXT):
+                    drawing.SetText(drawing.GetShownText(True))
+        # Rename only what we extract; the rest of the board is thrown away
+        if refRenamer is not None:
+            bakedRefs = renameRefs(board, lambda x: refRenamer(len(self.substrates), x),
+                                   bakeRef, footprints)
+            for text in bakedRefs:
+                # The texts are created in the source board, take them out
+                board.Remove(text)
+            drawings += [x for x in bakedRefs
+                         if fitsIn(x.GetBoundingBox(), enlargedSourceArea)]
+        newNets = renameNets(board, netRenamerFn,
+            chain((p for f in footprints for p in f.Pads()), tracks,
+                  (z for _, z in zones), drawings))
 
         edges = []
         annotations = []
@@ -1206,13 +1467,13 @@ class Panel:
             if interpretAnnotations and self.annotationReader.isAnnotation(footprint):
                 annotations.extend(self.annotationReader.convertToAnnotation(footprint))
             else:
-                appendItem(self.board, footprint, yieldMapping)
+                appendToPanel(footprint)
         for track in tracks:
             track.Rotate(originPoint, rotationAngle)
             track.Move(translation)
-            appendItem(self.board, track, yieldMapping)
-        for netId in board.GetNetInfo().NetsByNetcode():
-            self.board.Add(board.GetNetInfo().GetNetItem(netId))
+            appendToPanel(track)
+        for net in newNets.values():
+            self.board.Add(net)
 
         # Treat drawings differently since they contains board edges
         for drawing in drawings:
@@ -1221,15 +1482,16 @@ class Panel:
         edges += [edge for edge in drawings if isBoardEdge(edge)]
         otherDrawings = [edge for edge in drawings if not isBoardEdge(edge)]
 
-        def makeRevertTransformation(angle, origin, translation):
-            def f(point):
-                return undoTransformation(point, angle, origin, translation)
-            return f
-
-        revertTransformation = makeRevertTransformation(rotationAngle, originPoint, translation)
+        revertTransformation = RevertTransformation(rotationAngle, originPoint, translation)
         try:
-            s = Substrate(edges, 0,
-                revertTransformation=revertTransformation)
+            if prepared is not None:
+                transformation = placementTransform(rotationAngle, originPoint,
+                                                    translation)
+                s = prepared.placedSubstrate(transformation,
+                    revertTransformation=revertTransformation)
+            else:
+                s = Substrate(edges, 0,
+                    revertTransformation=revertTransformation)
             self.boardSubstrate.union(s)
             self.substrates.append(s)
             self.substrates[-1].annotations = annotations
@@ -1237,34 +1499,131 @@ class Panel:
             point = undoTransformation(e.point, rotationAngle, originPoint, translation)
             raise substrate.PositionError(f"{filename}: {e.origMessage}", point)
         for drawing in otherDrawings:
-            appendItem(self.board, drawing, yieldMapping)
-        for zone in zones:
+            appendToPanel(drawing)
+        exterior = None
+        for zoneId, zone in zones:
             zone.Rotate(originPoint, rotationAngle)
             zone.Move(translation)
-            cropZoneByPolygon(zone, s.exterior())
-            appendItem(self.board, zone, yieldMapping)
-
-        try:
-            exclusions = readBoardDrcExclusions(board)
-            for drcE in exclusions:
-                try:
-                    newObjects = [resolveItem(self.board, pcbnew.KIID(itemMapping[x.m_Uuid.AsString()])) for x in drcE.objects]
-                    assert all(x is not None for x in newObjects)
-                    newPosition = doTransformation(drcE.position, rotationAngle, originPoint, translation)
-                    self.drcExclusions.append(DrcExclusion(
-                        drcE.type,
-                        newPosition,
-                        newObjects
-                    ))
-                except KeyError as e:
-                    continue # We cannot handle DRC exclusions with board edges
-        except FileNotFoundError:
-            pass # Ignore boards without a project
+            if prepared is not None and zoneId in prepared.zones:
+                cropped = prepared.zones[zoneId]
+                if cropped is not None:
+                    setZoneOutline(zone, placeGeometry(cropped, transformation))
+                appendToPanel(zone)
+                continue
+            if exterior is None:
+                exterior = s.exterior()
+                shapely.prepare(exterior)
+            self._cropZone(zone, exterior, translation, (str(filename),
+                zoneId, rotationAngle.AsDegrees(),
+                sourceArea.GetX(), sourceArea.GetY(), sourceArea.GetWidth(),
+                sourceArea.GetHeight(), originPoint[0], originPoint[1],
+                tolerance, edgeMaxWidth))
+            appendToPanel(zone)
+
+        for drcE in exclusions:
+            try:
+                newObjects = [resolveItem(self.board, pcbnew.KIID(itemMapping[x.m_Uuid.AsString()])) for x in drcE.objects]
+                assert all(x is not None for x in newObjects)
+                newPosition = doTransformation(drcE.position, rotationAngle, originPoint, translation)
+                self.drcExclusions.append(DrcExclusion(
+                    drcE.type,
+                    newPosition,
+                    newObjects
+                ))
+            except KeyError as e:
+                continue # We cannot handle DRC exclusions with board edges
 
         self.projectVars.append(self._readProjectVariables(board))
 
         return findBoundingBox(edges)
 
+    def appendBoards(self, batch: Iterable[Dict[str, Any]],
+                     jobs: Optional[int] = None) -> List[BOX2I]:
+        """
+        Append multiple boards to the panel. Each item of the batch is a
+        dictionary of the arguments of appendBoard (at least filename and
+        destination).
+
+        The substrates of the distinct source boards and the crops of their
+        zones are built concurrently in up to jobs worker processes (by
+        default, one per CPU). Meanwhile, this process loads each distinct
+        source board once, so appending then only copies, places and renames
+        the items. The boards are appended in the order of the batch, so the
+        nets, references and items are the same as if you called appendBoard
+        for each item. The substrates and the zone outlines match up to the arc
+        approximation error, see PreparedSource. Within a daemonic process
+        (e.g., a worker of a pool), the boards are appended serially as such a
+        process cannot have children.
+
+        Returns a list of bounding boxes of the placed boards, see appendBoard.
+        """
+        batch = [dict(x) for x in batch]
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+
+        def sourceKey(item):
+            sourceArea = item.get("sourceArea")
+            return (os.path.abspath(str(item["filename"])),
+                    rectToShpBox(sourceArea).bounds if sourceArea else None,
+                    bool(item.get("shrink", False)),
+                    item.get("tolerance", 0))
+        sources = list(OrderedDict.fromkeys(sourceKey(x) for x in batch))
+
+        import multiprocessing
+        prepared: Dict[Tuple, Optional[PreparedSource]] = {}
+        if jobs > 1 and len(sources) > 1 and not multiprocessing.current_process().daemon:
+            from concurrent.futures import ProcessPoolExecutor
+
+            # pcbnew is not fork-safe, therefore, always spawn fresh workers
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(jobs, len(sources)),
+                                     mp_context=context,
+                                     initializer=_initPrepareWorker) as executor:
+                futures = [executor.submit(prepareSourceBoard, *key) for key in sources]
+                # Parse the boards while the workers prepare them
+                for path in OrderedDict.fromkeys(key[0] for key in sources):
+                    self._sourceBoard(path)
+                prepared = {key: f.result() for key, f in zip(sources, futures)}
+
+        return [self.appendBoard(**item, prepared=prepared.get(sourceKey(item)))
+                for item in batch]
+
+    def _cropZone(self, zone: pcbnew.ZONE, exterior: Polygon,
+                  translation: VECTOR2I, key: Tuple) -> None:
+        """
+        Crop the zone by the board exterior. Instances of the same source board
+        placed with the same rotation differ only by translation, so we reuse
+        the crop of the previous instance.
+        """
+        if key in self._zoneCropCache:
+            cropped = self._zoneCropCache[key]
+            if cropped is not None:
+                offset = np.array([translation[0], translation[1]])
+                setZoneOutline(zone, shapely.transform(cropped, lambda c: c + offset))
+            return
+        cropped = cropZoneByPolygon(zone, exterior)
+        if cropped is not None:
+            offset = np.array([translation[0], translation[1]])
+            cropped = shapely.transform(cropped, lambda c: c - offset)
+        self._zoneCropCache[key] = cropped
+
+    def _sourceBoard(self, filename: Union[str, Path]) \
+            -> Tuple[pcbnew.BOARD, BoardItemIndex]:
+        """
+        Return the loaded source board and its index. The board is loaded once
+        per file (and again when the file changes), so extracting multiple
+        boards from a single file parses and indexes it only once. Do not
+        modify the items of the board; work on their copies, see appendBoard.
+        """
+        path = os.path.abspath(str(filename))
+        mtime = os.path.getmtime(path)
+        cached = self._sourceBoards.get(path)
+        if cached is None or cached[0] != mtime:
+            board = LoadBoard(path)
+            cached = (mtime, board, BoardItemIndex(board))
+            self._sourceBoards[path] = cached
+        return cached[1], cached[2]
+
     def _readProjectVariables(self, board: pcbnew.BOARD) -> Dict[str, str]:
         projectPath = self.getProFilepath(board.GetFileName())
         try:
@@ -1930,7 +2289,8 @@ class Panel:
             t, c = buildTabs(self, s, s.partitionLine, s.annotations, fillet)
             tabs.extend(t)
             cuts.extend(c)
-        self.forwardTabs.extend(tabs)
+        if self.recordDebugGeometry:
+            self.forwardTabs.extend(tabs)
         self.boardSubstrate.union(tabs)
         return cuts
 
@@ -2199,9 +2559,7 @@ class Panel:
                 zoneContainer.SetHatchOrientation(orientation)
                 zoneContainer.SetHatchGap(strokeSpacing)
                 zoneContainer.SetHatchThickness(strokeWidth)
-            zoneContainer.Outline().AddOutline(linestringToKicad(g.exterior))
-            for hole in g.interiors:
-                zoneContainer.Outline().AddHole(linestringToKicad(hole))
+            appendToShapePolySet(zoneContainer.Outline(), g)
             zoneContainer.SetAssignedPriority(0)
 
             for l in layers:
@@ -2384,6 +2742,9 @@ class Panel:
         - Margin: forward tabs (board-side)
         - Eco1_User: reverse tabs (frame-side)
         - Eco2_User: raw support geometry (before fillets)
+
+        The geometry is available only if recordDebugGeometry was set when
+        building the tabs and the frame.
         """
         lines = [t.exterior for t in self.forwardTabs]
         self._renderLines(lines, Layer.Margin, fromMm(0.3))
@@ -2528,6 +2889,17 @@ class Panel:
             cutPoly = Polygon([t, v, h, t])
             self.boardSubstrate.cut(cutPoly)
 
+    def releaseLayoutGeometry(self) -> None:
+        """
+        Free the memory held by geometry needed only to build the tabs and the
+        frame. The substrates of the individual boards are stored compactly
+        (they are decoded on access) and the backbone pieces are dropped.
+        Useful for very large panels.
+        """
+        for s in self.substrates:
+            s.compact()
+        self.backbonePieces = None
+
     def translate(self, vec):
         """
         Translates the whole panel by vec. Such a feature can be useful to
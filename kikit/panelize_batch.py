@@ -0,0 +1,265 @@
+import csv
+import json
+import os
+import sys
+import time
+import traceback
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# This module is imported only by the panelize-batch command. It deliberately
+# does not import pcbnew at the top level so the worker processes and the
+# manifest parsing stay cheap; the heavy lifting happens in doPanelization.
+
+SECTION_NAMES = ["layout", "source", "tabs", "cuts", "framing", "tooling",
+    "fiducials", "text", "text2", "text3", "text4", "copperfill", "page",
+    "post", "debug"]
+
+class ManifestError(RuntimeError):
+    pass
+
+@dataclass
+class BatchJob:
+    """
+    A single panelization job of a batch. Paths are already resolved relative
+    to the manifest.
+    """
+    input: str
+    output: str
+    presets: List[str] = field(default_factory=list)
+    sections: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    plugins: List[Tuple[str, str, str]] = field(default_factory=list)
+    dump: Optional[str] = None
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of a single job. Status is one of "ok", "warning" (the panel was
+    produced, but it contains non-fatal errors) or "failed".
+    """
+    input: str
+    output: str
+    status: str
+    time: float
+    message: str = ""
+    # High-water mark of the RSS of the process that ran the job in bytes; the
+    # process might have run other jobs before
+    peakRss: Optional[int] = None
+
+    @property
+    def failed(self) -> bool:
+        return self.status == "failed"
+
+def _parseSection(name: str, value: Union[str, Dict[str, Any]]) -> Dict[str, str]:
+    from kikit.panelize_ui import Section
+    import click
+
+    if isinstance(value, dict):
+        # Same as a section in a preset file
+        return value
+    if not isinstance(value, str):
+        raise ManifestError(f"Section '{name}' has to be a string or an object")
+    try:
+        return Section().convert(value, None, None)
+    except click.BadParameter as e:
+        raise ManifestError(f"Invalid section '{name}': {e.message}") from None
+
+def _parsePlugin(value: str) -> Tuple[str, str, str]:
+    from kikit.panelize_ui import HookPlugin
+    import click
+
+    try:
+        return HookPlugin().convert(value, None, None)
+    except click.BadParameter as e:
+        raise ManifestError(f"Invalid plugin specification: {e.message}") from None
+
+def _resolvePath(base: str, path: str) -> str:
+    if os.path.isabs(path):
+        return path
+    return os.path.normpath(os.path.join(base, path))
+
+def _resolvePreset(base: str, preset: str) -> str:
+    # Built-in presets are referenced by name, not by path
+    if preset.startswith(":"):
+        return preset
+    return _resolvePath(base, preset)
+
+def _buildJob(base: str, spec: Dict[str, Any], index: int) -> BatchJob:
+    for key in ["input", "output"]:
+        if not spec.get(key):
+            raise ManifestError(f"Job {index + 1} is missing '{key}'")
+    presets = spec.get("preset", [])
+    if isinstance(presets, str):
+        presets = [x.strip() for x in presets.split(";") if x.strip() != ""]
+    plugins = spec.get("plugin", [])
+    if isinstance(plugins, str):
+        plugins = [x.strip() for x in plugins.split(";") if x.strip() != ""]
+    sections = {}
+    for name in SECTION_NAMES:
+        value = spec.get(name)
+        if value is None or value == "":
+            continue
+        sections[name] = _parseSection(name, value)
+    unknown = set(spec.keys()).difference(
+        SECTION_NAMES + ["input", "output", "preset", "plugin", "dump"])
+    if len(unknown) != 0:
+        raise ManifestError(f"Job {index + 1} contains unknown keys: {', '.join(sorted(unknown))}")
+    return BatchJob(
+        input=_resolvePath(base, spec["input"]),
+        output=_resolvePath(base, spec["output"]),
+        presets=[_resolvePreset(base, x) for x in presets],
+        sections=sections,
+        plugins=[_parsePlugin(x) for x in plugins],
+        dump=_resolvePath(base, spec["dump"]) if spec.get("dump") else None)
+
+def readManifest(path: str) -> List[BatchJob]:
+    """
+    Read a batch manifest. The manifest is either a JSON file with a list of
+    jobs or a CSV file with a header. Each job specifies "input", "output", an
+    optional preset chain ("preset"; a list or a semicolon separated string),
+    optional hook plugins ("plugin") and optional section overrides named after
+    the preset sections. Relative paths are resolved against the directory of
+    the manifest.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            if path.lower().endswith(".csv"):
+                specs = [{k.strip(): v.strip() for k, v in row.items() if k is not None and v is not None}
+                         for row in csv.DictReader(f)]
+            else:
+                import commentjson
+                specs = commentjson.load(f)
+    except OSError as e:
+        raise ManifestError(f"Cannot read manifest '{path}': {e}") from None
+    except ValueError as e:
+        raise ManifestError(f"Cannot parse manifest '{path}': {e}") from None
+    if isinstance(specs, dict):
+        specs = specs.get("jobs")
+    if not isinstance(specs, list):
+        raise ManifestError("The manifest has to contain a list of jobs")
+    return [_buildJob(base, spec, i) for i, spec in enumerate(specs)]
+
+def peakRss() -> Optional[int]:
+    """
+    Return the peak resident set size of the current process in bytes or None
+    if the platform doesn't provide it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def runJob(job: BatchJob, trace: bool=False) -> BatchResult:
+    """
+    Run a single job and capture its outcome. Errors never propagate out of
+    this function so a failing job cannot take down the rest of the batch.
+    """
+    from kikit import panelize_ui_impl as ki
+    from kikit.panelize_ui import doPanelization
+    from kikit.panelize import NonFatalErrors
+
+    start = time.perf_counter()
+    preset = None
+    try:
+        preset = ki.obtainPreset(job.presets, **job.sections)
+        outputDir = os.path.dirname(job.output)
+        if outputDir != "":
+            os.makedirs(outputDir, exist_ok=True)
+        doPanelization(job.input, job.output, preset, job.plugins)
+        if job.dump:
+            with open(job.dump, "w", encoding="utf-8") as f:
+                f.write(ki.dumpPreset(preset))
+        return BatchResult(job.input, job.output, "ok",
+                           time.perf_counter() - start, peakRss=peakRss())
+    except NonFatalErrors as e:
+        return BatchResult(job.input, job.output, "warning",
+                           time.perf_counter() - start, str(e), peakRss())
+    except Exception as e:
+        message = str(e)
+        if trace or (isinstance(preset, dict) and preset["debug"]["trace"]):
+            message += "\n" + traceback.format_exc()
+        return BatchResult(job.input, job.output, "failed",
+                           time.perf_counter() - start, message, peakRss())
+
+def _initWorker() -> None:
+    from kikit.common import fakeKiCADGui
+    global _workerApp
+    _workerApp = fakeKiCADGui()
+    # Pay the import price once per worker, not once per job
+    import pcbnew
+    import kikit.panelize_ui_impl
+
+def runBatch(jobs: List[BatchJob], workers: int=1, trace: bool=False,
+             onResult=None) -> List[BatchResult]:
+    """
+    Run all the jobs either in the current process (workers == 1) or in a pool
+    of worker processes. The results are returned in the order of the jobs.
+    onResult is invoked with (index, result) as soon as a job finishes.
+    """
+    def report(i, r):
+        if onResult is not None:
+            onResult(i, r)
+        return r
+
+    if workers <= 1 or len(jobs) <= 1:
+        return [report(i, runJob(job, trace)) for i, job in enumerate(jobs)]
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from concurrent.futures.process import BrokenProcessPool
+
+    # pcbnew is not fork-safe, therefore, always spawn fresh workers
+    context = multiprocessing.get_context("spawn")
+    results: List[Optional[BatchResult]] = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                             mp_context=context,
+                             initializer=_initWorker) as executor:
+        futures = {executor.submit(runJob, job, trace): i
+                   for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            job = jobs[i]
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                result = BatchResult(job.input, job.output, "failed", 0,
+                    "The worker process crashed (probably a crash in KiCAD)")
+            except Exception as e:
+                result = BatchResult(job.input, job.output, "failed", 0, str(e))
+            results[i] = report(i, result)
+    return results
+
+def formatRss(rss: Optional[int]) -> str:
+    """
+    Format the RSS given in bytes (see peakRss) for humans.
+    """
+    return "n/a" if rss is None else f"{rss / (1 << 20):.0f} MiB"
+
+def formatSummary(results: List[BatchResult], wallTime: float) -> str:
+    """
+    Format a human-readable summary table of the batch.
+    """
+    nameWidth = max([len(os.path.basename(r.output)) for r in results] + [6])
+    lines = [f"{'Output':<{nameWidth}}  {'Status':<8}  {'Time':>8}  {'Process peak RSS':>16}"]
+    for r in results:
+        lines.append(f"{os.path.basename(r.output):<{nameWidth}}  {r.status:<8}  {r.time:>7.2f}s  {formatRss(r.peakRss):>16}")
+    failed = len([r for r in results if r.failed])
+    jobTime = sum(r.time for r in results)
+    rss = [r.peakRss for r in results if r.peakRss is not None]
+    lines.append(f"{len(results)} jobs, {failed} failed; total job time {jobTime:.2f}s, wall time {wallTime:.2f}s, "
+                 f"process peak RSS {formatRss(max(rss) if rss else None)}")
+    return "\n".join(lines)
+
+def writeReport(path: str, results: List[BatchResult], wallTime: float) -> None:
+    """
+    Write a machine-readable JSON report of the batch.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "wallTime": wallTime,
+            "jobs": [asdict(r) for r in results]
+        }, f, indent=4)
@@ -5,6 +5,7 @@ import io
 import glob
 import traceback
 from kikit.panelize_ui_sections import *
+from kikit.cache_ui import cacheOptions, openCache
 
 PKG_BASE = os.path.dirname(__file__)
 PRESETS = os.path.join(PKG_BASE, "resources/panelizePresets")
@@ -195,9 +196,12 @@ def completeSection(section):
     **addCompatibleShellCompletion(completeSection(DEBUG_SECTION)))
 @click.option("--dump", "-d", type=click.Path(file_okay=True, dir_okay=False),
     help="Dump constructured preset into a JSON file.")
+@click.option("--checkpoints", type=click.Path(file_okay=False), default=None,
+    help="Store checkpoints of the panelization in the directory and resume from them when only later stages changed.")
+@cacheOptions
 def panelize(input, output, preset, plugin, layout, source, tabs, cuts, framing,
              tooling, fiducials, text, text2, text3, text4, copperfill, page,
-             post, debug, dump):
+             post, debug, dump, checkpoints, **cacheArgs):
     """
     Panelize boards
     """
@@ -214,7 +218,11 @@ def panelize(input, output, preset, plugin, layout, source, tabs, cuts, framing,
             text3=text3, text4=text4, copperfill=copperfill, page=page,
             post=post, debug=debug)
 
-        doPanelization(input, output, preset, plugin)
+        runPanelization(input, output, preset, plugin, checkpoints, cacheArgs)
+
+        from kikit.panelize_batch import peakRss, formatRss
+        if peakRss() is not None:
+            sys.stderr.write(f"Peak RSS: {formatRss(peakRss())}\n")
 
         if (dump):
             with open(dump, "w", encoding="utf-8") as f:
@@ -231,10 +239,46 @@ def panelize(input, output, preset, plugin, layout, source, tabs, cuts, framing,
             traceback.print_exc(file=sys.stderr)
         sys.exit(1)
 
-def doPanelization(input, output, preset, plugins=[]):
+def runPanelization(input, output, preset, plugins, checkpointDir, cacheArgs,
+                    reportProgress=None):
+    """
+    Run doPanelization with the checkpoints and the build cache given by the
+    command line options (cacheArgs are the options of cacheOptions).
+    """
+    import sys
+
+    cache, printStats = openCache(dict(cacheArgs))
+    if cache is None:
+        doPanelization(input, output, preset, plugins,
+                       reportProgress=reportProgress, checkpointDir=checkpointDir)
+        return
+    from kikit.cache import cachedRun, panelizeCacheKey
+    outputStem = os.path.splitext(os.path.basename(output))[0]
+    cachedRun(cache, panelizeCacheKey(input, output, preset, plugins),
+        os.path.dirname(os.path.abspath(output)),
+        lambda: doPanelization(input, output, preset, plugins,
+                               reportProgress=reportProgress,
+                               checkpointDir=checkpointDir),
+        predicate=lambda f: os.path.splitext(f)[0] == outputStem)
+    if printStats:
+        sys.stderr.write(cache.formatStats() + "\n")
+
+# Stages reported by doPanelization in the order they are performed
+PANELIZATION_STAGES = ["load", "layout", "tabs", "framing", "features", "cuts",
+                       "copperfill", "save"]
+
+def doPanelization(input, output, preset, plugins=[], reportProgress=None,
+                   checkpointDir=None):
     """
     The panelization logic is separated into a separate function so we can
     handle errors based on the context; e.g., CLI vs GUI
+
+    If reportProgress is specified, it is invoked with the name of a stage
+    (see PANELIZATION_STAGES) whenever the stage starts.
+
+    If checkpointDir is specified, the state of the panel after the expensive
+    stages is stored in it and the panelization resumes from the latest
+    checkpoint whose inputs did not change.
     """
     from kikit import panelize_ui_impl as ki
     from kikit.panelize import Panel, NonFatalErrors, PanelError
@@ -242,9 +286,14 @@ def doPanelization(input, output, preset, plugins=[]):
     from pcbnew import LoadBoard
     from itertools import chain
 
-    if preset["debug"]["drawtabfail"]:
-        import kikit.substrate
-        kikit.substrate.TABFAIL_VISUAL = True
+    def progress(stage):
+        if reportProgress is not None:
+            reportProgress(stage)
+
+    progress("load")
+    # Always assign the flag; the process might be reused for multiple jobs
+    import kikit.substrate
+    kikit.substrate.TABFAIL_VISUAL = preset["debug"]["drawtabfail"]
 
     board = LoadBoard(input)
     if preset["debug"]["deterministic"]:
@@ -252,6 +301,8 @@ def doPanelization(input, output, preset, plugins=[]):
     if board is None:
         raise PanelError(f"Cannot load board {input}. Check if the path is correct or if you have permissions to read it.")
     panel = Panel(output)
+    # The debug geometry of tabs and frame is needed only for rendering it
+    panel.recordDebugGeometry = preset["debug"]["drawTabFillet"]
 
     useHookPlugins = ki.loadHookPlugins(plugins, board, preset)
 
@@ -268,35 +319,82 @@ def doPanelization(input, output, preset, plugins=[]):
 
     useHookPlugins(lambda x: x.afterPanelSetup(panel))
 
-    sourceArea = ki.readSourceArea(preset["source"], board)
-    substrates, framingSubstrates, backboneCuts = \
-        ki.buildLayout(preset, panel, input, sourceArea)
+    checkpoints = None
+    if checkpointDir is not None and len(plugins) == 0:
+        # Hook plugins can keep arbitrary state we cannot restore, hence, we
+        # cannot use checkpoints with them
+        from kikit.checkpoint import PanelCheckpoints, CHECKPOINT_STAGES
+        checkpoints = PanelCheckpoints(checkpointDir, input, preset)
+
+    def checkpoint(stage, state):
+        if checkpoints is None:
+            return
+        checkpoints.save(stage, panel, state)
+        # Make the UUIDs of the following stages independent of whether we
+        # resumed from a checkpoint or not
+        if preset["debug"]["deterministic"]:
+            pcbnew.KIID.SeedGenerator(43 + CHECKPOINT_STAGES.index(stage))
+
+    resumed = checkpoints.restore(panel) if checkpoints is not None else None
+    doneStage = -1
+    state = {}
+    if resumed is not None:
+        doneStage = CHECKPOINT_STAGES.index(resumed.stage)
+        state = resumed.state
+        if preset["debug"]["deterministic"]:
+            pcbnew.KIID.SeedGenerator(43 + doneStage)
+
+    if doneStage < 0:
+        progress("layout")
+        sourceArea = ki.readSourceArea(preset["source"], board)
+        substrates, framingSubstrates, backboneCuts = \
+            ki.buildLayout(preset, panel, input, sourceArea)
+        state.update(substrates=substrates, framingSubstrates=framingSubstrates,
+                     backboneCuts=list(backboneCuts))
+
+        useHookPlugins(lambda x: x.afterLayout(panel, substrates))
+        checkpoint("layout", state)
 
-    useHookPlugins(lambda x: x.afterLayout(panel, substrates))
+    if doneStage < 1:
+        substrates = state["substrates"]
+        framingSubstrates = state["framingSubstrates"]
+        backboneCuts = state["backboneCuts"]
 
-    tabCuts = ki.buildTabs(preset, panel, substrates, framingSubstrates)
+        progress("tabs")
+        tabCuts = ki.buildTabs(preset, panel, substrates, framingSubstrates)
 
-    useHookPlugins(lambda x: x.afterTabs(panel, tabCuts, backboneCuts))
+        useHookPlugins(lambda x: x.afterTabs(panel, tabCuts, backboneCuts))
 
-    preFrameSubstrate = panel.boardSubstrate.substrates
+        preFrameSubstrate = panel.boardSubstrate.substrates
 
-    frameCuts = ki.buildFraming(preset, panel)
+        progress("framing")
+        frameCuts = ki.buildFraming(preset, panel)
 
-    useHookPlugins(lambda x: x.afterFraming(panel, frameCuts))
+        useHookPlugins(lambda x: x.afterFraming(panel, frameCuts))
 
-    ki.buildTabFillets(preset, panel, preFrameSubstrate)
+        ki.buildTabFillets(preset, panel, preFrameSubstrate)
+        if preset["post"]["lowmemory"]:
+            panel.releaseLayoutGeometry()
+        state.update(tabCuts=list(tabCuts), frameCuts=list(frameCuts))
+        checkpoint("framing", state)
 
-    ki.buildTooling(preset, panel)
-    ki.buildFiducials(preset, panel)
-    for textSection in ["text", "text2", "text3", "text4"]:
-        ki.buildText(preset[textSection], panel)
-    ki.buildPostprocessing(preset["post"], panel)
+    if doneStage < 2:
+        progress("features")
+        ki.buildTooling(preset, panel)
+        ki.buildFiducials(preset, panel)
+        for textSection in ["text", "text2", "text3", "text4"]:
+            ki.buildText(preset[textSection], panel)
+        ki.buildPostprocessing(preset["post"], panel)
 
-    ki.makeTabCuts(preset, panel, tabCuts)
-    ki.makeOtherCuts(preset, panel, chain(backboneCuts, frameCuts))
+        progress("cuts")
+        ki.makeTabCuts(preset, panel, state["tabCuts"])
+        ki.makeOtherCuts(preset, panel,
+            chain(state["backboneCuts"], state["frameCuts"]))
+        checkpoint("cuts", state)
 
     useHookPlugins(lambda x: x.afterCuts(panel))
 
+    progress("copperfill")
     ki.buildCopperfill(preset["copperfill"], panel)
 
     ki.setStackup(preset["source"], panel)
@@ -308,6 +406,7 @@ def doPanelization(input, output, preset, plugins=[]):
 
     ki.buildDebugAnnotation(preset["debug"], panel)
 
+    progress("save")
     panel.save(reconstructArcs=preset["post"]["reconstructarcs"],
                refillAllZones=preset["post"]["refillzones"],
                edgeWidth=preset["post"]["edgewidth"])
@@ -315,6 +414,84 @@ def doPanelization(input, output, preset, plugins=[]):
     if panel.hasErrors():
         raise NonFatalErrors(panel.errors)
 
+def panelizationWorker(conn, input, output, presetArgs):
+    """
+    Entry point of a process that performs a single panelization. The preset
+    is given by the arguments of obtainPreset. The progress and the result are
+    reported via conn as tuples:
+    - ("progress", stage, timestamp) whenever a stage starts,
+    - ("done",) on success,
+    - ("warning", message) when the panel was saved, but it contains non-fatal
+      errors,
+    - ("error", message, traceback) on failure.
+    """
+    import time
+    from kikit.common import fakeKiCADGui
+    app = fakeKiCADGui()
+
+    try:
+        from kikit import panelize_ui_impl as ki
+        from kikit.panelize import NonFatalErrors
+        preset = ki.obtainPreset([], **presetArgs)
+        try:
+            doPanelization(input, output, preset,
+                reportProgress=lambda stage: conn.send(("progress", stage, time.time())))
+        except NonFatalErrors as e:
+            conn.send(("warning", str(e)))
+        else:
+            conn.send(("done",))
+    except Exception as e:
+        conn.send(("error", str(e), traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+@click.command("panelize-batch")
+@click.argument("manifest", type=click.Path(dir_okay=False, exists=True),
+    **addCompatibleShellCompletion(pathCompletion()))
+@click.option("--jobs", "-j", type=click.IntRange(min=1), default=1,
+    help="Number of worker processes. 1 runs all jobs in the current process.")
+@click.option("--report", type=click.Path(dir_okay=False),
+    help="Write a JSON report with per-job status and timing.")
+@click.option("--trace/--no-trace", default=False,
+    help="Include tracebacks of failed jobs in the output.")
+def panelizeBatch(manifest, jobs, report, trace):
+    """
+    Panelize multiple boards described by a manifest in a single run.
+
+    The manifest is a JSON or CSV file listing the jobs; each job specifies the
+    input board, the output panel, the preset chain and optionally section
+    overrides. Jobs are isolated from each other; a failing job does not stop
+    the batch.
+    """
+    import sys
+    import time
+    from kikit import panelize_batch as batch
+    from kikit.common import fakeKiCADGui
+    app = fakeKiCADGui()
+
+    try:
+        batchJobs = batch.readManifest(manifest)
+    except batch.ManifestError as e:
+        sys.stderr.write("An error occurred: " + str(e) + "\n")
+        sys.exit(1)
+
+    def onResult(i, result):
+        name = os.path.basename(result.output)
+        sys.stderr.write(f"[{i + 1}/{len(batchJobs)}] {name}: {result.status} ({result.time:.2f} s)\n")
+        if result.message:
+            sys.stderr.write("    " + result.message.replace("\n", "\n    ").rstrip() + "\n")
+
+    start = time.perf_counter()
+    results = batch.runBatch(batchJobs, workers=jobs, trace=trace, onResult=onResult)
+    wallTime = time.perf_counter() - start
+
+    print(batch.formatSummary(results, wallTime))
+    if report:
+        batch.writeReport(report, results, wallTime)
+    if any(r.failed for r in results):
+        sys.exit(1)
+
 
 @click.command()
 @click.argument("input", type=click.Path(dir_okay=False))
@@ -11,6 +11,7 @@ from kikit.panelize_ui_sections import *
 from kikit.substrate import SubstrateNeighbors
 from kikit.common import resolveAnchor
 import commentjson
+import copy
 import enum
 import json
 import csv
@@ -104,6 +105,10 @@ def postProcessPreset(preset):
     for name, section in preset.items():
         process[name](section)
 
+# Parsed presets indexed by (absolute path, modification time). Long running
+# processes (e.g., panelize-batch) load the same presets over and over again.
+_presetCache: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
 def loadPreset(path):
     """
     Load a preset from path and perform simple validation on its structure.
@@ -115,10 +120,14 @@ def loadPreset(path):
         if not os.path.exists(path):
             raise RuntimeError(f"Uknown built-in preset '{presetName}'")
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            preset = commentjson.load(f)
-            validatePresetLayout(preset)
-            return preset
+        cacheKey = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+        if cacheKey not in _presetCache:
+            with open(path, "r", encoding="utf-8") as f:
+                preset = commentjson.load(f)
+                validatePresetLayout(preset)
+                _presetCache[cacheKey] = preset
+        # The callers merge into the preset, never give away the cached copy
+        return copy.deepcopy(_presetCache[cacheKey])
     except OSError as e:
         raise RuntimeError(f"Cannot open preset '{path}'")
     except PresetError as e:
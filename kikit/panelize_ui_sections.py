@@ -745,7 +745,10 @@ POST_SECTION = {
     "edgewidth": SLength(
         always(),
         "Specify line width for the Edge.Cuts of the panel"
-    )
+    ),
+    "lowmemory": SBool(
+        always(),
+        "Store the geometry of individual boards compactly once the frame is built")
 }
 
 def ppPost(section):
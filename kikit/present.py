@@ -48,6 +48,50 @@ def readTemplate(path):
     except KeyError:
         raise RuntimeError("Unknown template type '{}'".format(tType))
 
+# Options of pcbdraw used for rendering the boards; they are part of the cache
+# key of the renders
+PCBDRAW_OPTIONS = ["--vcuts=Cmts.User", "--silent"]
+
+def renderBoard(source, outputDirectory, files):
+    """
+    Render board images and gerber archive of a single board. Files maps
+    "front", "back" and "gerbers" to paths relative to outputDirectory.
+    """
+    pcbdraw = shutil.which("pcbdraw")
+    for side in ["front", "back"]:
+        subprocess.check_call([pcbdraw, "plot", *PCBDRAW_OPTIONS, f"--side={side}",
+            source, os.path.join(outputDirectory, files[side])])
+
+    with export.ZipSink(os.path.join(outputDirectory, files["gerbers"])) as sink:
+        export.gerberImpl(source, sink)
+
+def _initRenderWorker():
+    from kikit.common import fakeKiCADGui
+    global _workerApp
+    _workerApp = fakeKiCADGui()
+
+def pcbdrawVersion():
+    proc = subprocess.run([shutil.which("pcbdraw"), "--version"],
+                          capture_output=True, text=True)
+    return proc.stdout.strip()
+
+def renderCacheKey(source, pcbdrawVersion):
+    """
+    Compute the cache key of board renders.
+    """
+    from kikit.cache import (computeKey, hashFiles, projectFiles, kikitVersion,
+        kicadVersion)
+
+    return computeKey({
+        "kind": "boardpage",
+        "kikit": kikitVersion(),
+        "kicad": kicadVersion(),
+        "pcbdraw": pcbdrawVersion,
+        "pcbdrawOptions": PCBDRAW_OPTIONS,
+        "board": os.path.basename(source),
+        "inputs": hashFiles(projectFiles(source))
+    })
+
 def copyRelativeTo(sourceTree, sourceFile, outputDir):
     sourceTree = os.path.abspath(sourceTree)
     sourceFile = os.path.abspath(sourceFile)
@@ -95,10 +139,11 @@ class Template:
             "source": boardfile
         })
 
-    def _renderBoards(self, outputDirectory):
+    def _renderBoards(self, outputDirectory, jobs=1, cache=None):
         """
         Convert all boards to images and gerber exports. Enrich self.boards
-        with paths of generated files
+        with paths of generated files. The boards are rendered in up to jobs
+        worker processes; with a cache, renders of unchanged boards are reused.
         """
         pcbdraw = shutil.which("pcbdraw")
         if not pcbdraw:
@@ -107,6 +152,8 @@ class Template:
         dirPrefix = "boards"
         boardDir = os.path.join(outputDirectory, dirPrefix)
         Path(boardDir).mkdir(parents=True, exist_ok=True)
+        version = pcbdrawVersion() if cache is not None else None
+        pending = []
         for boardDesc in self.boards:
             boardName = os.path.basename(boardDesc["source"]).replace(".kicad_pcb", "")
             boardDesc["front"] = os.path.join(dirPrefix, boardName + "-front.png")
@@ -114,21 +161,43 @@ class Template:
             boardDesc["gerbers"] = os.path.join(dirPrefix, boardName + "-gerbers.zip")
             boardDesc["file"] = os.path.join(dirPrefix, boardName + ".kicad_pcb")
 
-            subprocess.check_call([pcbdraw, "plot", "--vcuts=Cmts.User", "--silent", "--side=front", boardDesc["source"],
-                os.path.join(outputDirectory, boardDesc["front"])])
-            subprocess.check_call([pcbdraw, "plot", "--vcuts=Cmts.User", "--silent", "--side=back", boardDesc["source"],
-                os.path.join(outputDirectory, boardDesc["back"])])
+            key = None
+            if cache is not None:
+                key = renderCacheKey(boardDesc["source"], version)
+                if cache.restore(key, outputDirectory):
+                    continue
+            pending.append((boardDesc, key))
 
-            tmp = tempfile.mkdtemp()
-            export.gerberImpl(boardDesc["source"], tmp)
-            shutil.make_archive(os.path.join(outputDirectory, boardDesc["gerbers"])[:-4], "zip", tmp)
-            shutil.rmtree(tmp)
+        files = lambda desc: {k: desc[k] for k in ["front", "back", "gerbers"]}
+        if jobs > 1 and len(pending) > 1:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
 
+            # pcbnew is not fork-safe, therefore, always spawn fresh workers
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(jobs, len(pending)),
+                                     mp_context=context,
+                                     initializer=_initRenderWorker) as executor:
+                futures = [executor.submit(renderBoard, desc["source"],
+                                           outputDirectory, files(desc))
+                           for desc, _ in pending]
+                for f in futures:
+                    f.result()
+        else:
+            for desc, _ in pending:
+                renderBoard(desc["source"], outputDirectory, files(desc))
+
+        if cache is not None:
+            for desc, key in pending:
+                cache.store(key, outputDirectory, files(desc).values())
+            cache.evict()
+
+        for boardDesc in self.boards:
             shutil.copy(boardDesc["source"], os.path.join(outputDirectory, boardDesc["file"]))
 
-    def render(self, outputDirectory):
+    def render(self, outputDirectory, jobs=1, cache=None):
         self._copyResources(outputDirectory)
-        self._renderBoards(outputDirectory)
+        self._renderBoards(outputDirectory, jobs, cache)
         self._renderPage(outputDirectory)
 
     def gitRevision(self):
@@ -175,7 +244,8 @@ class HtmlTemplate(Template):
         with open(os.path.join(outputDirectory, "index.html"),"w", encoding="utf-8") as outFile:
             outFile.write(content)
 
-def boardpage(outdir, description, board, resource, template, repository, name):
+def boardpage(outdir, description, board, resource, template, repository, name,
+              jobs=1, cache=None):
     try:
         Path(outdir).mkdir(parents=True, exist_ok=True)
         template = readTemplate(template)
@@ -186,7 +256,7 @@ def boardpage(outdir, description, board, resource, template, repository, name):
             template.addResource(r)
         for name, comment, file in board:
             template.addBoard(name, comment, file)
-        template.render(outdir)
+        template.render(outdir, jobs, cache)
     except Exception as e:
         sys.stderr.write("An error occurred: " + str(e) + "\n")
         sys.exit(1)
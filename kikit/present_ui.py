@@ -1,5 +1,7 @@
 import click
 
+from .cache_ui import cacheOptions, openCache
+
 @click.command()
 @click.argument("outdir", type=click.Path(file_okay=False))
 @click.option("--description", "-d", type=click.Path(dir_okay=False),
@@ -12,6 +14,9 @@ import click
     help="Path to a template directory or a name of built-in one. See doc/present.md for template specification.")
 @click.option("--repository", type=str, help="URL of the repository")
 @click.option("--name", type=str, help="Name of the board (used e.g., for title)", required=True)
+@click.option("--jobs", "-j", type=click.IntRange(min=1), default=1,
+    help="Render the boards in this many worker processes")
+@cacheOptions
 def boardpage(**kwargs):
     """
     Build a board presentation page based on markdown description and include
@@ -19,9 +24,14 @@ def boardpage(**kwargs):
     """
     from kikit import present
     from kikit.common import fakeKiCADGui
+    import sys
     app = fakeKiCADGui()
 
-    return present.boardpage(**kwargs)
+    cache, printStats = openCache(kwargs)
+    result = present.boardpage(**kwargs, cache=cache)
+    if printStats:
+        sys.stderr.write(cache.formatStats() + "\n")
+    return result
 
 @click.group()
 def present():
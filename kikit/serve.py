@@ -0,0 +1,525 @@
+import io
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+# A local KiKit server. It keeps a pool of warm worker processes with pcbnew
+# already imported and executes KiKit commands submitted over HTTP on
+# localhost. Each job is a regular KiKit command line (e.g., ["fab", "jlcpcb",
+# "board.kicad_pcb", "out"]), so the jobs behave exactly as the CLI does.
+
+ALLOWED_COMMANDS = ["panelize", "export", "fab"]
+LOCAL_HOSTS = ["localhost", "127.0.0.1"]
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class JobError(RuntimeError):
+    pass
+
+@dataclass
+class Job:
+    id: str
+    command: List[str]
+    cwd: str
+    status: str = QUEUED
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    exitCode: Optional[int] = None
+    output: str = ""
+    error: str = ""
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    cancelRequested: bool = False
+
+    @property
+    def isFinished(self) -> bool:
+        return self.status in [DONE, FAILED, CANCELLED]
+
+    def summary(self) -> Dict[str, Any]:
+        now = time.time()
+        queueTime = (self.started or self.finished or now) - self.submitted
+        runTime = None
+        if self.started is not None:
+            runTime = (self.finished or now) - self.started
+        return {
+            "id": self.id,
+            "command": self.command,
+            "cwd": self.cwd,
+            "status": self.status,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "queueTime": queueTime,
+            "runTime": runTime,
+            "exitCode": self.exitCode,
+            "output": self.output,
+            "error": self.error,
+            "stage": self.events[-1]["stage"] if self.events else None
+        }
+
+def validateJob(spec: Any) -> Job:
+    """
+    Build a job out of the user-supplied JSON specification.
+    """
+    if not isinstance(spec, dict):
+        raise JobError("Job specification has to be an object")
+    command = spec.get("command")
+    if not isinstance(command, list) or len(command) == 0 or \
+            not all(isinstance(x, str) for x in command):
+        raise JobError("'command' has to be a non-empty list of strings")
+    if command[0] not in ALLOWED_COMMANDS:
+        raise JobError(f"Unsupported command '{command[0]}'; supported are: {', '.join(ALLOWED_COMMANDS)}")
+    cwd = spec.get("cwd", os.getcwd())
+    if not isinstance(cwd, str) or not os.path.isdir(cwd):
+        raise JobError(f"Working directory '{cwd}' doesn't exist")
+    return Job(id=uuid.uuid4().hex, command=command, cwd=os.path.abspath(cwd))
+
+def _runPanelize(args: List[str], reportProgress: Callable[[str], None]) -> None:
+    from kikit.panelize_ui import panelize, runPanelization
+    from kikit.panelize_batch import SECTION_NAMES
+    from kikit.cache_ui import CACHE_OPTIONS
+    from kikit import panelize_ui_impl as ki
+
+    # Parse the arguments exactly as the CLI does, but invoke the panelization
+    # directly, so we can observe its progress
+    with panelize.make_context("panelize", list(args)) as ctx:
+        params = dict(ctx.params)
+    preset = ki.obtainPreset(params["preset"],
+        **{name: params[name] for name in SECTION_NAMES})
+    runPanelization(params["input"], params["output"], preset, params["plugin"],
+                    params["checkpoints"], {k: params[k] for k in CACHE_OPTIONS},
+                    reportProgress=reportProgress)
+    if params["dump"]:
+        with open(params["dump"], "w", encoding="utf-8") as f:
+            f.write(ki.dumpPreset(preset))
+
+def _runCommand(command: List[str], reportProgress: Callable[[str], None]) -> int:
+    from kikit.ui import cli
+
+    if command[0] == "panelize":
+        _runPanelize(command[1:], reportProgress)
+        return 0
+    try:
+        cli.main(args=list(command), prog_name="kikit", standalone_mode=False)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    return 0
+
+def _workerMain(conn) -> None:
+    """
+    Entry point of a worker process. Receives jobs via conn and reports back
+    progress and results.
+    """
+    from kikit.common import fakeKiCADGui
+    app = fakeKiCADGui()
+    # This is the expensive part we want to do only once
+    import pcbnew
+    import kikit.panelize_ui_impl
+    import kikit.export
+    conn.send(("ready",))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        jobId, command, cwd = message
+
+        def reportProgress(stage):
+            conn.send(("progress", jobId, stage, time.time()))
+
+        output = io.StringIO()
+        exitCode, error = 0, ""
+        try:
+            os.chdir(cwd)
+            with redirect_stdout(output), redirect_stderr(output):
+                exitCode = _runCommand(command, reportProgress)
+        except Exception as e:
+            exitCode = 1
+            error = f"{e}\n{traceback.format_exc()}"
+        conn.send(("done", jobId, exitCode, output.getvalue(), error))
+
+class _Worker:
+    def __init__(self, context):
+        self.parentConn, childConn = context.Pipe()
+        self.process = context.Process(target=_workerMain, args=(childConn,),
+                                       daemon=True)
+        self.process.start()
+        childConn.close()
+        self.job: Optional[Job] = None
+        self.ready = False
+
+class JobServer:
+    """
+    Manages the job queue and the pool of warm worker processes.
+    """
+    def __init__(self, workers: int=1, keepFinished: int=1000):
+        import multiprocessing
+        # pcbnew is not fork-safe, therefore, always spawn fresh workers
+        self._context = multiprocessing.get_context("spawn")
+        self._workerCount = workers
+        self._keepFinished = keepFinished
+        self._lock = threading.Condition()
+        self._jobs: Dict[str, Job] = {}
+        self._finished: Deque[str] = deque()
+        self._queue: Deque[str] = deque()
+        self._workers: List[_Worker] = []
+        self._running = False
+
+    def start(self) -> None:
+        with self._lock:
+            self._running = True
+            for _ in range(self._workerCount):
+                self._spawnWorker()
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+            workers = list(self._workers)
+        for w in workers:
+            try:
+                w.parentConn.send(None)
+            except (OSError, ValueError):
+                pass
+            w.process.join(timeout=5)
+            if w.process.is_alive():
+                w.process.kill()
+
+    def submit(self, job: Job) -> Job:
+        with self._lock:
+            self._jobs[job.id] = job
+            if len(self._workers) == 0:
+                job.error = "There are no worker processes available"
+                self._finishJob(job, FAILED)
+                return job
+            self._queue.append(job.id)
+            self._lock.notify_all()
+        return job
+
+    def cancel(self, jobId: str) -> Job:
+        with self._lock:
+            job = self._getJob(jobId)
+            if job.status == QUEUED:
+                self._queue.remove(jobId)
+                self._finishJob(job, CANCELLED)
+            elif job.status == RUNNING:
+                job.cancelRequested = True
+                for w in self._workers:
+                    if w.job is job:
+                        # The reader thread notices the dead worker, finishes
+                        # the job and spawns a replacement
+                        w.process.terminate()
+            return job
+
+    def job(self, jobId: str) -> Job:
+        with self._lock:
+            return self._getJob(jobId)
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "busyWorkers": len([w for w in self._workers if w.job is not None]),
+                "readyWorkers": len([w for w in self._workers if w.ready]),
+                "queued": len(self._queue),
+                "jobs": len(self._jobs)
+            }
+
+    def events(self, jobId: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield progress events of a job as they come. Finishes when the job
+        finishes; the last event carries the final status. An unknown job is
+        reported on the first event; once the stream starts, it is kept even
+        when the job is evicted from the list of finished jobs.
+        """
+        sent = 0
+        with self._lock:
+            job = self._getJob(jobId)
+        while True:
+            with self._lock:
+                while sent == len(job.events) and not job.isFinished:
+                    self._lock.wait(timeout=1)
+                pending = job.events[sent:]
+                finished = job.isFinished
+                summary = job.summary()
+            for e in pending:
+                yield e
+            sent += len(pending)
+            if finished:
+                yield {"stage": "finished", "status": summary["status"],
+                       "exitCode": summary["exitCode"], "time": summary["finished"]}
+                return
+
+    def wait(self, jobId: str, timeout: Optional[float]=None) -> Job:
+        with self._lock:
+            job = self._getJob(jobId)
+            self._lock.wait_for(lambda: job.isFinished, timeout=timeout)
+            return job
+
+    def _getJob(self, jobId: str) -> Job:
+        try:
+            return self._jobs[jobId]
+        except KeyError:
+            raise JobError(f"Unknown job '{jobId}'") from None
+
+    def _finishJob(self, job: Job, status: str) -> None:
+        job.status = status
+        job.finished = time.time()
+        self._finished.append(job.id)
+        while len(self._finished) > self._keepFinished:
+            del self._jobs[self._finished.popleft()]
+        self._lock.notify_all()
+
+    def _spawnWorker(self) -> None:
+        worker = _Worker(self._context)
+        self._workers.append(worker)
+        threading.Thread(target=self._readWorker, args=(worker,),
+                         daemon=True).start()
+
+    def _dispatch(self) -> None:
+        with self._lock:
+            while self._running:
+                idle = [w for w in self._workers if w.ready and w.job is None]
+                if len(idle) == 0 or len(self._queue) == 0:
+                    self._lock.wait()
+                    continue
+                worker = idle[0]
+                job = self._jobs[self._queue.popleft()]
+                job.status = RUNNING
+                job.started = time.time()
+                worker.job = job
+                try:
+                    worker.parentConn.send((job.id, job.command, job.cwd))
+                except (OSError, ValueError):
+                    # The worker died in the meantime; its reader thread
+                    # takes care of the job
+                    pass
+                self._lock.notify_all()
+
+    def _readWorker(self, worker: _Worker) -> None:
+        while True:
+            try:
+                message = worker.parentConn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                if message[0] == "ready":
+                    worker.ready = True
+                elif message[0] == "progress":
+                    _, jobId, stage, timestamp = message
+                    if worker.job is not None and worker.job.id == jobId:
+                        worker.job.events.append({"stage": stage, "time": timestamp})
+                elif message[0] == "done":
+                    _, jobId, exitCode, output, error = message
+                    job = worker.job
+                    worker.job = None
+                    if job is not None and job.id == jobId:
+                        job.exitCode = exitCode
+                        job.output = output
+                        job.error = error
+                        self._finishJob(job, DONE if exitCode == 0 else FAILED)
+                self._lock.notify_all()
+        # The worker is gone - either cancelled, crashed or we are stopping
+        worker.process.join()
+        with self._lock:
+            self._workers.remove(worker)
+            job = worker.job
+            if job is not None and not job.isFinished:
+                if job.cancelRequested:
+                    self._finishJob(job, CANCELLED)
+                else:
+                    job.error = f"The worker process crashed with exit code {worker.process.exitcode}"
+                    self._finishJob(job, FAILED)
+            if self._running and worker.ready:
+                self._spawnWorker()
+            elif self._running and len(self._workers) == 0:
+                # The worker died during start up (e.g., pcbnew cannot be
+                # imported). Respawning it would only loop, so give up on the
+                # queued jobs instead.
+                while len(self._queue) > 0:
+                    queued = self._jobs[self._queue.popleft()]
+                    queued.error = "Cannot start a worker process"
+                    self._finishJob(queued, FAILED)
+            self._lock.notify_all()
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "KiKit"
+    # Events are streamed until the job finishes, then the connection closes
+    protocol_version = "HTTP/1.0"
+
+    @property
+    def jobServer(self) -> JobServer:
+        return self.server.jobServer
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _sendJson(self, code: int, payload: Any) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _path(self) -> List[str]:
+        return [x for x in urlparse(self.path).path.split("/") if x != ""]
+
+    def _checkHost(self) -> bool:
+        """
+        Reject requests addressed to other hosts than the server itself. A web
+        page can make the browser talk to the server via a DNS name pointing
+        to 127.0.0.1 (DNS rebinding); such requests carry the foreign name.
+        """
+        host = self.headers.get("Host", "")
+        name = host.rsplit(":", 1)[0] if not host.endswith("]") else host
+        if name.lower() in self.server.allowedHosts:
+            return True
+        self._sendJson(403, {"error": f"Host '{host}' is not allowed"})
+        return False
+
+    def do_GET(self):
+        if not self._checkHost():
+            return
+        path = self._path()
+        try:
+            if path == ["status"]:
+                return self._sendJson(200, self.jobServer.status())
+            if path == ["jobs"]:
+                return self._sendJson(200, [j.summary() for j in self.jobServer.jobs()])
+            if len(path) == 2 and path[0] == "jobs":
+                return self._sendJson(200, self.jobServer.job(path[1]).summary())
+            if len(path) == 3 and path[0] == "jobs" and path[2] == "events":
+                events = self.jobServer.events(path[1])
+                first = next(events)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                self.wfile.write((json.dumps(first) + "\n").encode("utf-8"))
+                self.wfile.flush()
+                for e in events:
+                    self.wfile.write((json.dumps(e) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                return
+        except JobError as e:
+            return self._sendJson(404, {"error": str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        self._sendJson(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        if not self._checkHost():
+            return
+        if self._path() != ["jobs"]:
+            return self._sendJson(404, {"error": f"Unknown endpoint {self.path}"})
+        # A web page cannot send a JSON request to a different origin without a
+        # CORS preflight, which we never answer; plain form posts are refused
+        contentType = self.headers.get("Content-Type", "").split(";")[0].strip()
+        if contentType.lower() != "application/json":
+            return self._sendJson(415, {"error": "Jobs have to be submitted as application/json"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            spec = json.loads(self.rfile.read(length).decode("utf-8"))
+            job = self.jobServer.submit(validateJob(spec))
+        except (ValueError, JobError) as e:
+            return self._sendJson(400, {"error": str(e)})
+        self._sendJson(201, job.summary())
+
+    def do_DELETE(self):
+        if not self._checkHost():
+            return
+        path = self._path()
+        if len(path) != 2 or path[0] != "jobs":
+            return self._sendJson(404, {"error": f"Unknown endpoint {self.path}"})
+        try:
+            self._sendJson(200, self.jobServer.cancel(path[1]).summary())
+        except JobError as e:
+            self._sendJson(404, {"error": str(e)})
+
+def makeHttpServer(jobServer: JobServer, host: str="127.0.0.1", port: int=0,
+                   verbose: bool=False) -> ThreadingHTTPServer:
+    """
+    Create an HTTP front end for the job server. Port 0 picks a free port; read
+    it from server.server_address.
+
+    Only requests addressed to localhost, 127.0.0.1 or the address the server
+    listens on are accepted.
+    """
+    httpServer = ThreadingHTTPServer((host, port), _RequestHandler)
+    httpServer.daemon_threads = True
+    httpServer.allowedHosts = set(LOCAL_HOSTS)
+    if host not in ["", "0.0.0.0", "::"]:
+        httpServer.allowedHosts.add(host.lower())
+    httpServer.jobServer = jobServer
+    httpServer.verbose = verbose
+    return httpServer
+
+class ServeClient:
+    """
+    A minimal client for the KiKit server.
+    """
+    def __init__(self, url: str="http://127.0.0.1:8765"):
+        self.url = url.rstrip("/")
+
+    def _request(self, method: str, path: str, payload: Any=None) -> Any:
+        import urllib.request
+        import urllib.error
+
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+            headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            raise JobError(json.loads(e.read().decode("utf-8"))["error"]) from None
+
+    def submit(self, command: List[str], cwd: Optional[str]=None) -> Dict[str, Any]:
+        return self._request("POST", "/jobs",
+            {"command": command, "cwd": cwd if cwd is not None else os.getcwd()})
+
+    def job(self, jobId: str) -> Dict[str, Any]:
+        return self._request("GET", f"/jobs/{jobId}")
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        return self._request("GET", "/jobs")
+
+    def status(self) -> Dict[str, Any]:
+        return self._request("GET", "/status")
+
+    def cancel(self, jobId: str) -> Dict[str, Any]:
+        return self._request("DELETE", f"/jobs/{jobId}")
+
+    def events(self, jobId: str) -> Iterator[Dict[str, Any]]:
+        import urllib.request
+
+        with urllib.request.urlopen(f"{self.url}/jobs/{jobId}/events") as response:
+            for line in response:
+                yield json.loads(line.decode("utf-8"))
+
+    def wait(self, jobId: str) -> Dict[str, Any]:
+        for _ in self.events(jobId):
+            pass
+        return self.job(jobId)
@@ -0,0 +1,34 @@
+import click
+
+@click.command()
+@click.option("--host", type=str, default="127.0.0.1",
+    help="Address to listen on. Keep it on localhost; there is no authentication.")
+@click.option("--port", type=int, default=8765,
+    help="Port to listen on.")
+@click.option("--workers", "-j", type=click.IntRange(min=1), default=1,
+    help="Number of worker processes, i.e., how many jobs run concurrently.")
+@click.option("--verbose/--quiet", default=False,
+    help="Log every request.")
+def serve(host, port, workers, verbose):
+    """
+    Run a local KiKit server that executes panelize, export and fab jobs.
+
+    The server keeps warm worker processes with KiCAD already loaded, so the
+    jobs do not pay the startup cost. Jobs are submitted over HTTP; see the
+    documentation for the API.
+    """
+    import sys
+    from kikit.serve import JobServer, makeHttpServer
+
+    jobServer = JobServer(workers=workers)
+    jobServer.start()
+    httpServer = makeHttpServer(jobServer, host, port, verbose)
+    address, port = httpServer.server_address[:2]
+    sys.stderr.write(f"KiKit server is listening on http://{address}:{port}\n")
+    try:
+        httpServer.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpServer.server_close()
+        jobServer.stop()
@@ -1,10 +1,13 @@
 import pcbnew
 import numpy as np
 import json
+import hashlib
+import time
 from collections import OrderedDict
 from kikit.common import *
 from kikit.defs import *
-from kikit.substrate import Substrate, extractRings, toShapely, linestringToKicad
+from kikit.substrate import (Substrate, extractRings, toShapely, linestringToKicad,
+    shapePolyToShapely)
 from kikit.export import gerberImpl, pasteDxfExport
 from kikit.export import exportSettingsJlcpcb
 import solid
@@ -13,7 +16,9 @@ import subprocess
 import shutil
 from kikit.common import removeComponents, parseReferences
 
-from shapely.geometry import Point
+from shapely.geometry import Point, Polygon
+from shapely.ops import unary_union
+import shapely.affinity
 
 
 OUTER_BORDER = fromMm(7.5)
@@ -284,6 +289,68 @@ def renderScad(infile, outfile):
         message += f"Did you install it? Program `openscad` has to be in PATH"
         raise RuntimeError(message)
 
+def _renderStampFile(outfile):
+    directory, name = os.path.split(outfile)
+    return os.path.join(directory, "." + name + ".stamp")
+
+def openscadVersion():
+    """
+    Return the version string of OpenSCAD or None if it is not available.
+    """
+    try:
+        result = subprocess.run(["openscad", "--version"],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=True)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    return result.stdout.decode("utf-8", errors="replace").strip()
+
+def _renderStamp(infile, dependencies, version):
+    h = hashlib.sha256()
+    h.update(str(version).encode("utf-8"))
+    for path in [infile] + dependencies:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def renderScadFiles(renders):
+    """
+    Render a list of (scad file, output file, dependencies) concurrently. The
+    dependencies are files the scad file refers to (e.g., imported DXF). A
+    render is skipped when the output was produced from byte-identical inputs
+    by the same version of OpenSCAD. Report the time of each render.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    version = openscadVersion()
+    def render(infile, outfile, dependencies):
+        stamp = _renderStamp(infile, dependencies, version)
+        stampFile = _renderStampFile(outfile)
+        try:
+            with open(stampFile, encoding="utf-8") as f:
+                if os.path.exists(outfile) and f.read() == stamp:
+                    return None
+        except FileNotFoundError:
+            pass
+        # Do not trust a stale output if the render fails
+        if os.path.exists(stampFile):
+            os.remove(stampFile)
+        start = time.perf_counter()
+        renderScad(infile, outfile)
+        with open(stampFile, "w", encoding="utf-8") as f:
+            f.write(stamp)
+        return time.perf_counter() - start
+
+    # The renders are independent, single-threaded OpenSCAD processes
+    with ThreadPoolExecutor(max_workers=max(1, len(renders))) as executor:
+        futures = [executor.submit(render, *r) for r in renders]
+        for (_, outfile, _), future in zip(renders, futures):
+            duration = future.result()
+            name = os.path.basename(outfile)
+            if duration is None:
+                print(f"{name}: up to date, render skipped")
+            else:
+                print(f"{name}: rendered in {duration:.1f} s")
+
 def shapelyToSHAPE_POLY_SET(polygon):
     p = pcbnew.SHAPE_POLY_SET()
     p.AddOutline(linestringToKicad(polygon.exterior))
@@ -388,11 +455,14 @@ def create(inputboard, outputdir, jigsize, jigthickness, pcbthickness,
 
     topRegisterFile = os.path.join(outputdir, "topRegister.scad")
     solid.scad_render_to_file(topRegister, topRegisterFile)
-    renderScad(topRegisterFile, os.path.join(outputdir, "topRegister.stl"))
 
     bottomRegisterFile = os.path.join(outputdir, "bottomRegister.scad")
     solid.scad_render_to_file(bottomRegister, bottomRegisterFile)
-    renderScad(bottomRegisterFile, os.path.join(outputdir, "bottomRegister.stl"))
+
+    renderScadFiles([
+        (topRegisterFile, os.path.join(outputdir, "topRegister.stl"), []),
+        (bottomRegisterFile, os.path.join(outputdir, "bottomRegister.stl"), [])
+    ])
 
 def printedStencilSubstrate(outlineDxf, thickness, frameHeight, frameWidth, frameClearance):
     bodyOffset = solid.utils.up(0) if frameWidth + frameClearance == 0 else solid.offset(r=frameWidth + frameClearance)
@@ -445,10 +515,82 @@ def printedStencil(outlineDxf, holesDxf, extraHoles, thickness, frameHeight, fra
                     solid.polygon(h.exterior.coords)))
     return solid.rotate(a=xRotate, v=[1, 0, 0])(substrate)
 
+def toMmGeometry(geometry):
+    """
+    Convert shapely geometry in KiCAD units into millimeters with the Y axis
+    pointing up (as in the DXF export).
+    """
+    return shapely.affinity.scale(geometry, toMm(1), -toMm(1), origin=(0, 0))
+
+def layerGeometry(board, layer):
+    """
+    Return the content of a board layer as shapely geometry (in KiCAD units).
+    For paste layers, the pads are enlarged by their paste margin.
+    """
+    polygons = pcbnew.SHAPE_POLY_SET()
+    board.ConvertBrdLayerToPolygonalContours(layer, polygons)
+    if polygons.OutlineCount() == 0:
+        return Polygon()
+    return unary_union(list(listGeometries(shapePolyToShapely(polygons))))
+
+def printedStencilMesh(outline, paste, extraHoles, thickness, frameHeight,
+                       frameWidth, frameClearance, enlargeHoles, front):
+    """
+    Build the mesh of a printed stencil directly, without OpenSCAD. The
+    geometry is in millimeters. The result is the same solid as printedStencil
+    describes: a sheet with the paste holes and a register frame around the
+    board. As in the OpenSCAD model, the holes are cut only up to twice the
+    sheet thickness and only the exteriors of the extra holes are used.
+    """
+    from kikit.mesh import extrude, mirrorY
+
+    body = outline if frameWidth + frameClearance == 0 \
+           else outline.buffer(frameWidth + frameClearance)
+    cavity = outline if frameClearance == 0 else outline.buffer(frameClearance)
+    holes = paste if enlargeHoles == 0 \
+            else paste.buffer(enlargeHoles, join_style="mitre")
+    holes = unary_union([holes] + [Polygon(h.exterior) for h in extraHoles])
+
+    # We split the solid into prisms that do not overlap: the sheet over the
+    # board and the frame around it; the frame is split at the height the
+    # holes reach
+    top = thickness + frameHeight
+    holesTop = min(2 * thickness, top)
+    sheet = cavity.difference(holes)
+    frame = body.difference(cavity)
+    facets = [
+        extrude(sheet, 0, thickness),
+        extrude(frame.difference(holes), 0, holesTop)]
+    if top > holesTop:
+        facets.append(extrude(frame, holesTop, top))
+    facets = np.concatenate(facets)
+    # The front stencil is flipped upside down; that is the same as mirroring
+    # it
+    return mirrorY(facets) if front else facets
+
+def createPrintedNative(board, outputdir, cutoutComponents, thickness, height,
+                        framewidth, frameclearance, enlargeholes):
+    from kikit.mesh import writeBinaryStl
+
+    outline = toMmGeometry(Substrate(collectEdges(board, Layer.Edge_Cuts)).substrates)
+    for layer, crtYd, name, front in [(pcbnew.B_Paste, pcbnew.B_CrtYd, "bottomStencil", False),
+                                      (pcbnew.F_Paste, pcbnew.F_CrtYd, "topStencil", True)]:
+        paste = toMmGeometry(layerGeometry(board, layer))
+        cutout = [toMmGeometry(x) for x in extractComponentPolygons(cutoutComponents, crtYd)]
+        mesh = printedStencilMesh(outline, paste, cutout, thickness, height,
+            framewidth, frameclearance, enlargeholes, front)
+        stlFile = os.path.join(outputdir, name + ".stl")
+        # The STL no longer comes from OpenSCAD; a later OpenSCAD render must
+        # not consider it up to date
+        if os.path.exists(_renderStampFile(stlFile)):
+            os.remove(_renderStampFile(stlFile))
+        writeBinaryStl(stlFile, mesh, name)
+
 def createPrinted(inputboard, outputdir, pcbthickness, thickness, framewidth,
-                  ignore, cutout, frameclearance, enlargeholes):
+                  ignore, cutout, frameclearance, enlargeholes, renderer="native"):
     """
-    Create a 3D printed self-registering stencil.
+    Create a 3D printed self-registering stencil. The renderer is either
+    "native" (the mesh is built directly) or "openscad".
     """
     board = pcbnew.LoadBoard(inputboard)
     refs = parseReferences(ignore)
@@ -456,10 +598,17 @@ def createPrinted(inputboard, outputdir, pcbthickness, thickness, framewidth,
     removeComponents(board, refs)
     Path(outputdir).mkdir(parents=True, exist_ok=True)
 
+    height = min(pcbthickness, max(0.5, pcbthickness - 0.3))
+    if renderer == "native":
+        createPrintedNative(board, outputdir, cutoutComponents, thickness,
+            height, framewidth, frameclearance, enlargeholes)
+        return
+    if renderer != "openscad":
+        raise RuntimeError(f"Unknown renderer '{renderer}'")
+
     # We create the stencil based on DXF export. Using it avoids the necessity
     # to interpret KiCAD PAD shapes which constantly change with newer and newer
     # versions.
-    height = min(pcbthickness, max(0.5, pcbthickness - 0.3))
     bottomPaste, topPaste, outline = pasteDxfExport(board, outputdir)
     # On Windows, OpenSCAD requires to use forward slashes instead of backslashes,
     # hence, the replacement:
@@ -478,12 +627,16 @@ def createPrinted(inputboard, outputdir, pcbthickness, thickness, framewidth,
     bottomStencilFile = os.path.join(outputdir, "bottomStencil.scad")
     solid.scad_render_to_file(bottomStencil, bottomStencilFile,
         file_header=f'$fa = 0.4; $fs = 0.4;', include_orig_code=True)
-    renderScad(bottomStencilFile, os.path.join(outputdir, "bottomStencil.stl"))
 
     topStencilFile = os.path.join(outputdir, "topStencil.scad")
     solid.scad_render_to_file(topStencil, topStencilFile,
         file_header=f'$fa = 0.4; $fs = 0.4;', include_orig_code=True)
-    renderScad(topStencilFile, os.path.join(outputdir, "topStencil.stl"))
+
+    # The geometry of the stencils lives in the imported DXF files
+    renderScadFiles([
+        (bottomStencilFile, os.path.join(outputdir, "bottomStencil.stl"), [outline, bottomPaste]),
+        (topStencilFile, os.path.join(outputdir, "topStencil.stl"), [outline, topPaste])
+    ])
 
 
 
@@ -21,6 +21,8 @@ from .common import execute_with_debug
     help="Clearance for the stencil register in milimeters")
 @click.option("--enlargeholes", type=float, default=0,
     help="Enlarge pad holes by x mm")
+@click.option("--renderer", type=click.Choice(["native", "openscad"]), default="native",
+    help="Build the mesh directly (native) or render it via OpenSCAD")
 @click.option("--debug", is_flag=True, default=False,
         help="Print extra debugging information")
 def createPrinted(**kwargs):
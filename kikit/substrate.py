@@ -9,7 +9,7 @@ import numpy as np
 from kikit.intervals import Interval, BoxNeighbors, BoxPartitionLines
 import pcbnew
 from enum import IntEnum
-from itertools import product
+from itertools import product, chain
 
 from typing import Iterable, List, Tuple, Union
 
@@ -234,6 +234,58 @@ def approximateBezier(bezier, endWith):
 
     return outline
 
+# Conversion of coordinates between shapely and KiCAD. Crossing the SWIG
+# boundary is expensive, so we cross it as few times as possible: we read all
+# points of a line chain by a single call and we append points from a list of
+# plain integers prepared by NumPy in advance.
+
+def linechainToArray(lineChain: pcbnew.SHAPE_LINE_CHAIN) -> np.ndarray:
+    """
+    Return the points of the line chain as an array of shape (n, 2)
+    """
+    points = lineChain.CPoints()
+    coords = np.fromiter(chain.from_iterable((p.x, p.y) for p in points),
+                         dtype=np.int64, count=2 * len(points))
+    return coords.reshape(-1, 2)
+
+def arrayToLinechain(coords: np.ndarray, closed: bool=True) -> pcbnew.SHAPE_LINE_CHAIN:
+    """
+    Build a line chain out of an array of points of shape (n, 2). Float
+    coordinates are truncated the same way as int() does.
+    """
+    lineChain = pcbnew.SHAPE_LINE_CHAIN()
+    lineChain.SetClosed(closed)
+    append = lineChain.Append
+    for x, y in np.asarray(coords).astype(np.int64).tolist():
+        append(x, y)
+    return lineChain
+
+def appendToShapePolySet(polySet: pcbnew.SHAPE_POLY_SET, geometry) -> None:
+    """
+    Append all polygons (including their holes) of a shapely geometry to
+    SHAPE_POLY_SET. Other geometries (e.g., lines) are ignored.
+    """
+    if isinstance(geometry, Polygon):
+        polygons = [geometry]
+    elif hasattr(geometry, "geoms"):
+        polygons = [g for g in geometry.geoms if isinstance(g, Polygon)]
+    else:
+        polygons = []
+    for polygon in polygons:
+        if polygon.is_empty:
+            continue
+        polySet.AddOutline(arrayToLinechain(shapely.get_coordinates(polygon.exterior)))
+        for hole in polygon.interiors:
+            polySet.AddHole(arrayToLinechain(shapely.get_coordinates(hole)))
+
+def shapelyToShapePolySet(geometry) -> pcbnew.SHAPE_POLY_SET:
+    """
+    Convert polygons of a shapely geometry into SHAPE_POLY_SET
+    """
+    polySet = pcbnew.SHAPE_POLY_SET()
+    appendToShapePolySet(polySet, geometry)
+    return polySet
+
 def shapeLinechainToList(l: pcbnew.SHAPE_LINE_CHAIN) -> List[Tuple[int, int]]:
     return [(p.x, p.y) for p in l.CPoints()]
 
@@ -246,11 +298,11 @@ def shapePolyToShapely(p: pcbnew.SHAPE_POLY_SET) \
     for pIdx in range(p.OutlineCount()):
         kOutline = p.Outline(pIdx)
         assert kOutline.IsClosed()
-        outline = shapeLinechainToList(kOutline)
+        outline = linechainToArray(kOutline)
         holes = []
         for hIdx in range(p.HoleCount(pIdx)):
             kHole = p.Hole(pIdx, hIdx)
-            holes.append(shapeLinechainToList(kHole))
+            holes.append(linechainToArray(kHole))
         polygons.append(Polygon(outline, holes=holes))
     if len(polygons) == 1:
         return polygons[0]
@@ -634,11 +686,22 @@ def linestringToKicad(linestring):
     """
     Convert Shapely linestring to KiCAD's linechain
     """
-    lineChain = pcbnew.SHAPE_LINE_CHAIN()
-    lineChain.SetClosed(True)
-    for c in linestring.coords:
-        lineChain.Append(int(c[0]), int(c[1]))
-    return lineChain
+    return arrayToLinechain(shapely.get_coordinates(linestring))
+
+class TranslatedRevertTransformation:
+    """
+    Reverts a translation by vec and then applies the original revert
+    transformation (if any). Unlike a closure, it can be pickled.
+    """
+    def __init__(self, orig, vec):
+        self.orig = orig
+        self.vec = (vec[0], vec[1])
+
+    def __call__(self, point):
+        prevPoint = (point[0] - self.vec[0], point[1] - self.vec[1])
+        if self.orig is not None:
+            return self.orig(prevPoint)
+        return prevPoint
 
 class Substrate:
     """
@@ -655,6 +718,47 @@ class Substrate:
         self.annotations = []
         self.revertTransformation = revertTransformation
 
+    def __getattr__(self, name):
+        # Invoked only for missing attributes; i.e., for the geometry of a
+        # compacted substrate. Decode it on every access without keeping it,
+        # so reading the geometry doesn't make the substrate live again.
+        if name in ("substrates", "partitionLine") and "_compactGeometry" in self.__dict__:
+            substrates, partitionLine = self.__dict__["_compactGeometry"]
+            return shapely.from_wkb(substrates if name == "substrates" else partitionLine)
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        # Assigning the geometry of a compacted substrate makes it live again
+        if name in ("substrates", "partitionLine") and "_compactGeometry" in self.__dict__:
+            self.expand()
+        super().__setattr__(name, value)
+
+    def compact(self):
+        """
+        Store the geometry as WKB to save memory. Use it for substrates that are
+        not needed in live form anymore; reading the geometry decodes it without
+        keeping it, assigning it makes the substrate live again.
+        """
+        if self.isCompact():
+            return
+        self._compactGeometry = (shapely.to_wkb(self.substrates),
+                                 shapely.to_wkb(self.partitionLine))
+        del self.substrates
+        del self.partitionLine
+
+    def expand(self):
+        """
+        Restore the live geometry of a compacted substrate
+        """
+        if not self.isCompact():
+            return
+        substrates, partitionLine = self.__dict__.pop("_compactGeometry")
+        self.substrates = shapely.from_wkb(substrates)
+        self.partitionLine = shapely.from_wkb(partitionLine)
+
+    def isCompact(self):
+        return "_compactGeometry" in self.__dict__
+
     def backToSource(self, point):
         """
         Return a point in the source form (if a reverse transformation was set)
@@ -1030,18 +1134,18 @@ class Substrate:
         """
         Translate substrate by vec
         """
+        compact = self.isCompact()
+        self.expand()
         self.substrates = shapely.affinity.translate(self.substrates, vec[0], vec[1])
         self.partitionLine = shapely.affinity.translate(self.partitionLine, vec[0], vec[1])
         for annotation in self.annotations:
             o = annotation.origin
             annotation.origin = (o[0] + vec[0], o[1] + vec[1])
 
-        def newRevertTransformation(point, orig=self.revertTransformation, vec=vec):
-            prevPoint = (point[0] - vec[0], point[1] - vec[1])
-            if orig is not None:
-                return orig(prevPoint)
-            return prevPoint
-        self.revertTransformation = newRevertTransformation
+        self.revertTransformation = TranslatedRevertTransformation(
+            self.revertTransformation, vec)
+        if compact:
+            self.compact()
 
 def showPolygon(polygon):
     import matplotlib.pyplot as plt
@@ -1,6 +1,6 @@
 import click
 from kikit import (panelize_ui, export_ui, present_ui, stencil_ui,
-    modify_ui, fab_ui, drc_ui)
+    modify_ui, fab_ui, drc_ui, serve_ui)
 from kikit import __version__
 import sys
 
@@ -11,12 +11,14 @@ def cli():
 
 cli.add_command(export_ui.export)
 cli.add_command(panelize_ui.panelize)
+cli.add_command(panelize_ui.panelizeBatch)
 cli.add_command(panelize_ui.separate)
 cli.add_command(present_ui.present)
 cli.add_command(modify_ui.modify)
 cli.add_command(stencil_ui.stencil)
 cli.add_command(fab_ui.fab)
 cli.add_command(drc_ui.drc)
+cli.add_command(serve_ui.serve)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of appending boards to a panel. Compares calling Panel.appendBoard
+for each board with Panel.appendBoards, which prepares the substrates and
+the zone crops of the distinct source boards in worker processes.
+"""
+
+import os
+import tempfile
+import time
+import click
+from pcbnew import VECTOR2I
+from kikit.common import fromMm
+from kikit.panelize import Panel
+
+def makeBatch(boards, copies, spacing):
+    return [{"filename": os.path.abspath(board),
+             "destination": VECTOR2I(i * fromMm(spacing), j * fromMm(spacing))}
+            for j, board in enumerate(boards) for i in range(copies)]
+
+@click.command()
+@click.argument("boards", nargs=-1, required=True, type=click.Path(dir_okay=False))
+@click.option("--copies", type=int, default=2, help="Copies of each board")
+@click.option("--spacing", type=float, default=500, help="Spacing of the boards in mm")
+@click.option("--jobs", type=int, default=None, help="Number of workers of appendBoards")
+def run(boards, copies, spacing, jobs):
+    """
+    Measure appending the copies of the given boards. Pass several distinct
+    boards, as appendBoards prepares each distinct board only once.
+    """
+    batch = makeBatch(boards, copies, spacing)
+    with tempfile.TemporaryDirectory() as tmp:
+        panel = Panel(os.path.join(tmp, "serial.kicad_pcb"))
+        start = time.perf_counter()
+        for item in batch:
+            panel.appendBoard(**item)
+        serial = time.perf_counter() - start
+
+        panel = Panel(os.path.join(tmp, "parallel.kicad_pcb"))
+        start = time.perf_counter()
+        panel.appendBoards(batch, jobs=jobs)
+        parallel = time.perf_counter() - start
+
+    print(f"{len(boards)} boards, {copies} copies each")
+    print(f"{'appendBoard loop':20} {serial:8.2f} s")
+    print(f"{'appendBoards':20} {parallel:8.2f} s")
+
+if __name__ == "__main__":
+    run()
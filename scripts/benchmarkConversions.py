@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+"""
+Micro-benchmark of coordinate conversions between shapely and KiCAD
+SHAPE_LINE_CHAIN/SHAPE_POLY_SET. Compares the conversions KiKit used before
+the bulk conversion layer in kikit.substrate with the layer itself.
+"""
+
+import timeit
+import click
+import numpy as np
+import pcbnew
+import shapely
+from shapely.geometry import Polygon
+from kikit.substrate import (linechainToArray, arrayToLinechain,
+    shapelyToShapePolySet, shapePolyToShapely)
+
+# The previous implementations, kept here verbatim for the comparison
+
+def previousLinestringToKicad(linestring):
+    lineChain = pcbnew.SHAPE_LINE_CHAIN()
+    lineChain.SetClosed(True)
+    coords = shapely.get_coordinates(linestring).astype(np.int64).tolist()
+    for x, y in coords:
+        lineChain.Append(x, y)
+    return lineChain
+
+def previousLinechainToList(l):
+    return [(p.x, p.y) for p in l.CPoints()]
+
+def previousShapePolyToShapely(p):
+    polygons = []
+    for pIdx in range(p.OutlineCount()):
+        kOutline = p.Outline(pIdx)
+        assert kOutline.IsClosed()
+        outline = previousLinechainToList(kOutline)
+        holes = []
+        for hIdx in range(p.HoleCount(pIdx)):
+            kHole = p.Hole(pIdx, hIdx)
+            holes.append(previousLinechainToList(kHole))
+        polygons.append(Polygon(outline, holes=holes))
+    if len(polygons) == 1:
+        return polygons[0]
+    return shapely.geometry.MultiPolygon(polygons=polygons)
+
+def previousShapelyToShapePolySet(polygon):
+    polySet = pcbnew.SHAPE_POLY_SET()
+    polySet.AddOutline(previousLinestringToKicad(polygon.exterior))
+    for hole in polygon.interiors:
+        polySet.AddHole(previousLinestringToKicad(hole))
+    return polySet
+
+def testPolygon(vertices, holes):
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    outline = np.column_stack([np.cos(angles), np.sin(angles)]) * pcbnew.FromMM(100)
+    holeRings = []
+    for i in range(holes):
+        center = np.array([(i - holes / 2) * pcbnew.FromMM(100) / holes, 0])
+        holeRings.append(center + np.column_stack([np.cos(angles), np.sin(angles)]) * pcbnew.FromMM(1))
+    return Polygon(outline, holes=holeRings)
+
+@click.command()
+@click.option("--vertices", type=int, default=10000, help="Vertices per ring")
+@click.option("--holes", type=int, default=10, help="Number of holes")
+@click.option("--repeat", type=int, default=10, help="Number of repetitions")
+def run(vertices, holes, repeat):
+    """
+    Measure the conversion of a polygon with holes from shapely to KiCAD and
+    back.
+    """
+    polygon = testPolygon(vertices, holes)
+    lineChain = arrayToLinechain(np.asarray(polygon.exterior.coords))
+    polySet = shapelyToShapePolySet(polygon)
+
+    cases = [
+        ("shapely -> SHAPE_LINE_CHAIN, previous",
+            lambda: previousLinestringToKicad(polygon.exterior)),
+        ("shapely -> SHAPE_LINE_CHAIN, bulk",
+            lambda: arrayToLinechain(np.asarray(polygon.exterior.coords))),
+        ("SHAPE_LINE_CHAIN -> points, previous",
+            lambda: previousLinechainToList(lineChain)),
+        ("SHAPE_LINE_CHAIN -> points, bulk",
+            lambda: linechainToArray(lineChain)),
+        ("shapely -> SHAPE_POLY_SET, previous",
+            lambda: previousShapelyToShapePolySet(polygon)),
+        ("shapely -> SHAPE_POLY_SET, bulk",
+            lambda: shapelyToShapePolySet(polygon)),
+        ("SHAPE_POLY_SET -> shapely, previous",
+            lambda: previousShapePolyToShapely(polySet)),
+        ("SHAPE_POLY_SET -> shapely, bulk",
+            lambda: shapePolyToShapely(polySet)),
+    ]
+    print(f"Polygon with {holes} holes, {vertices} vertices per ring, {repeat} repetitions")
+    for name, case in cases:
+        duration = min(timeit.repeat(case, number=1, repeat=repeat))
+        print(f"{name:45} {1000 * duration:8.2f} ms")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+"""
+Measure the peak memory usage (RSS) of panelizing a large grid with and
+without the lowmemory postprocessing option. Each run happens in a fresh process, so
+the reported high-water marks belong to the runs only.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import click
+
+def panelize(input, output, rows, cols, lowmemory):
+    from kikit.common import fakeKiCADGui
+    from kikit import panelize_ui_impl as ki
+    from kikit.panelize_ui import doPanelization
+    from kikit.panelize_batch import peakRss
+
+    app = fakeKiCADGui()
+    preset = ki.obtainPreset([],
+        layout={"type": "grid", "rows": str(rows), "cols": str(cols)},
+        tabs={"type": "fixed"}, cuts={"type": "mousebites"},
+        framing={"type": "railstb"},
+        post={"lowmemory": "true" if lowmemory else "false"})
+    doPanelization(input, output, preset)
+    return peakRss()
+
+@click.command()
+@click.argument("input", type=click.Path(dir_okay=False))
+@click.option("--rows", type=int, default=20, help="Rows of the grid")
+@click.option("--cols", type=int, default=20, help="Columns of the grid")
+def run(input, rows, cols):
+    """
+    Panelize INPUT into a grid with and without the lowmemory option and
+    report the peak RSS of both runs.
+    """
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "panel.kicad_pcb")
+        print(f"{rows}x{cols} grid of {input}")
+        for lowmemory in [False, True]:
+            with context.Pool(1) as pool:
+                rss = pool.apply(panelize, (os.path.abspath(input), output,
+                                            rows, cols, lowmemory))
+            label = "lowmemory" if lowmemory else "default"
+            print(f"{label:10} peak RSS {rss / (1 << 20):8.0f} MiB")
+
+if __name__ == "__main__":
+    run()
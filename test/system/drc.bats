@@ -29,3 +29,23 @@ load common
     echo "Report of fail-ignored\n: $output"
     [ "$status" -eq 0 ]
 }
+
+@test "Cached DRC" {
+    if [ $(kikit-info drcapi) -lt 1 ]; then
+        skip "KiCAD $(kikit-info kicadversion) does not support DRC API"
+    fi
+
+    export XDG_CACHE_HOME=$(pwd)/drc-cache
+
+    run kikit drc run $RES/conn-fail.kicad_pcb
+    [ "$status" -eq 1 ]
+    FRESH="$output"
+
+    run kikit drc run $RES/conn-fail.kicad_pcb
+    [ "$status" -eq 1 ]
+    [ "$output" = "$FRESH" ]
+
+    run kikit drc run --no-cache $RES/conn-fail.kicad_pcb
+    [ "$status" -eq 1 ]
+    [ "$output" = "$FRESH" ]
+}
@@ -313,3 +313,50 @@ load common
     # Instead, we sort the files
     cmp -s <(sort panel-original-plugin.kicad_pcb) <(sort panel-copy-plugin.kicad_pcb)
 }
+
+@test "Batch panelization" {
+    cat > batch.json <<EOF2
+[
+    {
+        "input": "$RES/conn.kicad_pcb",
+        "output": "panel-batch-1.kicad_pcb",
+        "layout": "grid; rows: 2; cols: 2",
+        "tabs": "full",
+        "cuts": "vcuts",
+        "debug": "deterministic: true"
+    },
+    {
+        "input": "$RES/conn.kicad_pcb",
+        "output": "panel-batch-2.kicad_pcb",
+        "preset": ":jlcTooling",
+        "layout": "grid; rows: 2; cols: 2; space: 2mm",
+        "tabs": "fixed; width: 5mm",
+        "cuts": "mousebites; drill: 0.5mm; spacing: 1mm; offset: 0.2mm"
+    }
+]
+EOF2
+    kikit panelize-batch --jobs 2 --report batch-report.json batch.json
+    [ -f panel-batch-1.kicad_pcb ]
+    [ -f panel-batch-2.kicad_pcb ]
+}
+
+@test "Resume panelization from checkpoints" {
+    COMMON="--layout 'grid; rows: 2; cols: 2; space: 2mm' \
+        --tabs 'fixed; width: 5mm' \
+        --cuts 'mousebites; drill: 0.5mm; spacing: 1mm; offset: 0.2mm' \
+        --framing 'railstb; width: 5mm; space: 3mm' \
+        --debug 'deterministic: true'"
+
+    eval kikit panelize --checkpoints checkpoints $COMMON \
+        --text "'simple; text: First; anchor: mt; voffset: 2.5mm'" \
+        $RES/conn.kicad_pcb panel-checkpoint-1.kicad_pcb
+    # Only the text changed, the layout, tabs and framing are reused
+    eval kikit panelize --checkpoints checkpoints $COMMON \
+        --text "'simple; text: Second; anchor: mt; voffset: 2.5mm'" \
+        $RES/conn.kicad_pcb panel-checkpoint-2.kicad_pcb
+    eval kikit panelize --checkpoints fresh-checkpoints $COMMON \
+        --text "'simple; text: Second; anchor: mt; voffset: 2.5mm'" \
+        $RES/conn.kicad_pcb panel-checkpoint-3.kicad_pcb
+
+    cmp -s <(sort panel-checkpoint-2.kicad_pcb) <(sort panel-checkpoint-3.kicad_pcb)
+}
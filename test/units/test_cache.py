@@ -0,0 +1,68 @@
+import os
+import time
+from kikit.cache import BuildCache, cachedRun, computeKey, parseSize
+
+def test_parseSize():
+    assert parseSize("100") == 100
+    assert parseSize("2K") == 2048
+    assert parseSize("1.5M") == 1536 * 1024
+
+def test_cachedRun(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"))
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "unrelated.txt").write_text("keep me out")
+    calls = []
+
+    def run():
+        calls.append(1)
+        (out / "sub").mkdir(exist_ok=True)
+        (out / "sub" / "a.gbr").write_text("gerber")
+        (out / "b.zip").write_text("zip")
+
+    key = computeKey({"input": "x"})
+    assert not cachedRun(cache, key, str(out), run)
+    assert len(calls) == 1
+
+    restored = tmp_path / "restored"
+    assert cachedRun(cache, key, str(restored), run)
+    assert len(calls) == 1
+    assert (restored / "sub" / "a.gbr").read_text() == "gerber"
+    assert (restored / "b.zip").read_text() == "zip"
+    assert not (restored / "unrelated.txt").exists()
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["entries"] == 1
+
+def test_failedRunIsNotStored(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"))
+    def run():
+        (tmp_path / "partial").write_text("x")
+        raise RuntimeError("Failure")
+    try:
+        cachedRun(cache, "key", str(tmp_path), run)
+    except RuntimeError:
+        pass
+    assert cache.stats()["entries"] == 0
+
+def test_eviction(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a").write_text("a" * 100)
+    (src / "b").write_text("b" * 100)
+
+    cache = BuildCache(str(tmp_path / "cache"), maxSize=150)
+    cache.store("old", str(src), ["a"])
+    past = time.time() - 100
+    os.utime(os.path.join(cache.directory, "entries", "old.json"), (past, past))
+    cache.store("new", str(src), ["b"])
+    cache.evict()
+    assert not cache.restore("old", str(tmp_path / "x"))
+    assert cache.restore("new", str(tmp_path / "x"))
+    assert cache.stats()["size"] == 100
+
+    cache.maxAge = 0
+    cache.evict()
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["blobs"] == 0
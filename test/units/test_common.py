@@ -0,0 +1,47 @@
+import os
+import pcbnew
+from kikit.common import (BoardItemIndex, collectItems, collectFootprints,
+    collectZones, collectEdges, findBoardBoundingBox, fromMm, findBoundingBox,
+    getBBoxWithoutContours, combineBoundingBoxes)
+from kikit.panelize import expandRect
+from kikit.defs import Layer
+
+RESOURCES = os.path.join(os.path.dirname(__file__), "..", "resources")
+
+def uuids(items):
+    return [x.m_Uuid.AsString() for x in items]
+
+def test_boardItemIndexMatchesCollect():
+    board = pcbnew.LoadBoard(os.path.join(RESOURCES, "multiboard.kicad_pcb"))
+    index = BoardItemIndex(board)
+    boardArea = findBoardBoundingBox(board)
+    areas = [boardArea, expandRect(boardArea, -fromMm(20)),
+             pcbnew.BOX2I(boardArea.GetPosition(),
+                          pcbnew.VECTOR2I(boardArea.GetWidth() // 2, boardArea.GetHeight()))]
+    for area in areas:
+        assert uuids(index.drawings(area)) == uuids(collectItems(board.GetDrawings(), area))
+        assert uuids(index.tracks(area)) == uuids(collectItems(board.GetTracks(), area))
+        assert uuids(index.footprints(area)) == uuids(collectFootprints(board.GetFootprints(), area))
+        assert uuids(index.zones(area)) == uuids(collectZones(board.Zones(), area))
+        assert uuids(index.edges(Layer.Edge_Cuts, area)) == \
+            uuids(collectEdges(board, Layer.Edge_Cuts, area))
+    assert findBoardBoundingBox(board, boardArea, index=index) == \
+        findBoardBoundingBox(board, boardArea)
+    assert uuids(index.edges(Layer.Edge_Cuts)) == uuids(collectEdges(board, Layer.Edge_Cuts))
+
+def test_findBoundingBoxCombinesEdges():
+    board = pcbnew.LoadBoard(os.path.join(RESOURCES, "multiboard.kicad_pcb"))
+    edges = collectEdges(board, Layer.Edge_Cuts)
+    expected = getBBoxWithoutContours(edges[0])
+    for edge in edges[1:]:
+        expected = combineBoundingBoxes(expected, getBBoxWithoutContours(edge))
+    assert findBoundingBox(edges) == expected
+
+def test_boardItemIndexIsLazy():
+    board = pcbnew.LoadBoard(os.path.join(RESOURCES, "multiboard.kicad_pcb"))
+    index = BoardItemIndex(board)
+    area = findBoardBoundingBox(board, index=index)
+    # Only the edges of the queried layer are indexed
+    assert list(index._indices.keys()) == []
+    index.edges(Layer.Edge_Cuts, area)
+    assert list(index._indices.keys()) == [("edges", Layer.Edge_Cuts)]
@@ -0,0 +1,136 @@
+import os
+import re
+import zipfile
+import pcbnew
+import kikit.export
+from kikit.fab.oshpark import exportOSHPark
+from kikit.fab.jlcpcb import exportJlcpcb
+from kikit.fab.common import (CorrectionPattern, CorrectionPatternIndex,
+    getField, getFields)
+from kikit.fab import jlcpcb
+from kikit.eeschema_v6 import Symbol
+
+RESOURCES = os.path.join(os.path.dirname(__file__), "..", "resources")
+
+def countLoads(monkeypatch):
+    loads = []
+    originalLoad = pcbnew.LoadBoard
+    def load(filename, *args, **kwargs):
+        loads.append(filename)
+        return originalLoad(filename, *args, **kwargs)
+    monkeypatch.setattr(pcbnew, "LoadBoard", load)
+    monkeypatch.setattr(kikit.export, "LoadBoard", load)
+    return loads
+
+def test_oshparkLoadsBoardOnce(tmp_path, monkeypatch):
+    loads = countLoads(monkeypatch)
+    exportOSHPark(os.path.join(RESOURCES, "conn.kicad_pcb"), str(tmp_path),
+                  nametemplate="{}", drc=False)
+    assert len(loads) == 1
+    with zipfile.ZipFile(tmp_path / "gerbers.zip") as archive:
+        assert any(x.endswith(".gbrjob") for x in archive.namelist())
+
+def test_jlcpcbLoadsBoardOnce(tmp_path, monkeypatch):
+    loads = countLoads(monkeypatch)
+    exportJlcpcb(os.path.join(RESOURCES, "conn.kicad_pcb"), str(tmp_path),
+                 assembly=False, schematic=None, ignore="", field="LCSC",
+                 corrections="JLCPCB_CORRECTION", correctionpatterns=None,
+                 missingerror=False, nametemplate="{}", drc=False,
+                 autoname=False)
+    assert len(loads) == 1
+    assert (tmp_path / "gerbers.zip").exists()
+
+def test_gerberImplAcceptsLoadedBoard(tmp_path, monkeypatch):
+    board = pcbnew.LoadBoard(os.path.join(RESOURCES, "conn.kicad_pcb"))
+    loads = countLoads(monkeypatch)
+    kikit.export.gerberImpl(board, str(tmp_path))
+    assert len(loads) == 0
+    assert (tmp_path / "conn.gbrjob").exists()
+
+def test_zipSink(tmp_path):
+    archivePath = tmp_path / "out.zip"
+    with kikit.export.ZipSink(str(archivePath), "gerber") as sink:
+        staging = sink.directory
+        with open(os.path.join(staging, "a.gbr"), "w") as f:
+            f.write("layer")
+        sink.add(os.path.join(staging, "a.gbr"))
+        assert not os.path.exists(os.path.join(staging, "a.gbr"))
+        # Files the sink was not notified about are collected on close
+        with open(os.path.join(staging, "b.drl"), "w") as f:
+            f.write("drill")
+    assert not os.path.exists(staging)
+    with zipfile.ZipFile(archivePath) as archive:
+        assert archive.namelist() == ["gerber/", "gerber/a.gbr", "gerber/b.drl"]
+        assert archive.read("gerber/b.drl") == b"drill"
+
+def test_zipSinkDiscardsOnError(tmp_path):
+    archivePath = tmp_path / "out.zip"
+    try:
+        with kikit.export.ZipSink(str(archivePath)) as sink:
+            staging = sink.directory
+            raise RuntimeError("Plot failed")
+    except RuntimeError:
+        pass
+    assert not archivePath.exists()
+    assert not os.path.exists(staging)
+
+def correctionPatterns(patterns):
+    return [CorrectionPattern(re.compile(p), re.compile(".*"), i, -i, 90 * i)
+            for i, p in enumerate(patterns)]
+
+def linearLookup(patterns, name):
+    for p in patterns:
+        if p.footprint.match(name):
+            return (p.x_correction, p.y_correction, p.rotation)
+    return (0, 0, 0)
+
+def test_correctionPatternIndexFirstMatchWins():
+    patterns = correctionPatterns([
+        "Resistor_SMD:R_0402.*", "Resistor_SMD:.*", "Capacitor.*", "R"])
+    index = CorrectionPatternIndex(patterns)
+    assert index.combined is not None
+    for name in ["Resistor_SMD:R_0402_1005Metric", "Resistor_SMD:R_0603_1608Metric",
+                 "Capacitor_SMD:C_0805", "Relay:G5V", "Diode:D"]:
+        assert index.lookup(name) == linearLookup(patterns, name)
+        # Cached lookup gives the same result
+        assert index.lookup(name) == linearLookup(patterns, name)
+
+def test_correctionPatternIndexWithGroups():
+    patterns = correctionPatterns(["X", r"(ab)\1.*", "abab"])
+    index = CorrectionPatternIndex(patterns)
+    assert index.combined is None
+    assert index.lookup("ababX") == linearLookup(patterns, "ababX")
+
+def test_legacyFieldsMatchGetField():
+    component = {"fields": [
+        {"number": 0, "text": "R1"},
+        {"number": 1, "text": "10k"},
+        {"number": 2, "text": "R_0805"},
+        {"number": 4, "name": "LCSC", "text": "C17414"},
+        {"number": 5, "name": "LCSC", "text": "C0000"},
+        {"number": 6, "name": "Value", "text": "shadowed"}
+    ]}
+    fields = getFields(component)
+    for name in ["Reference", "Value", "Footprint", "Datasheet", "LCSC", "Missing"]:
+        assert fields.get(name) == getField(component, name)
+
+def test_jlcpcbBomGroupsInOrder():
+    def symbol(ref, value, lcsc="", unit=1, **kwargs):
+        return Symbol(unit=unit, properties={"Reference": ref, "Value": value,
+            "Footprint": "R_0805", "LCSC": lcsc, "JLCPCB_IGNORE": ""}, **kwargs)
+    components = [
+        symbol("R2", "10k", "C1"),
+        symbol("R1", "1k"),
+        symbol("R3", "10k", "C1"),
+        symbol("R3", "10k", "C1", unit=2),
+        symbol("R4", "10k", "C1", dnp=True),
+        symbol("#PWR01", "GND"),
+        symbol("R5", "1k", " "),
+        symbol("R6", "1k")
+    ]
+    bom = jlcpcb.collectBom(components, ["LCSC"], ["R6"])
+    assert list(bom.items()) == [
+        (("10k", "R_0805", "C1"), ["R2", "R3"]),
+        (("1k", "R_0805", ""), ["R1"]),
+        (("1k", "R_0805", " "), ["R5"])
+    ]
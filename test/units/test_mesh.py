@@ -0,0 +1,46 @@
+import numpy as np
+from shapely.geometry import Point, Polygon, box
+from shapely.ops import unary_union
+from kikit.mesh import extrude, mirrorY, triangulatePolygon, writeBinaryStl
+
+def volume(facets):
+    return np.einsum("ij,ij->i", facets[:, 0],
+                     np.cross(facets[:, 1], facets[:, 2])).sum() / 6
+
+def isClosed(facets):
+    # Every directed edge has to be present exactly once together with its
+    # reverse
+    edges = np.concatenate([facets, np.roll(facets, -1, axis=1)], axis=2).reshape(-1, 6)
+    edges = [tuple(e) for e in np.round(edges, 9)]
+    edgeSet = set(edges)
+    return len(edgeSet) == len(edges) and \
+        all((e[3:] + e[:3]) in edgeSet for e in edges)
+
+def test_triangulateConcavePolygon():
+    polygon = Polygon([(0, 0), (10, 0), (10, 10), (9, 10), (9, 1), (1, 1), (1, 10), (0, 10)])
+    triangles, rings = triangulatePolygon(polygon)
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    areas = ((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) -
+             (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])) / 2
+    assert np.all(areas > 0)
+    assert np.isclose(areas.sum(), polygon.area)
+    assert len(rings) == 1
+
+def test_extrudePolygonWithHoles():
+    holes = unary_union([Point(x, y).buffer(0.6) for x in range(2, 10, 2) for y in range(2, 10, 2)])
+    geometry = box(0, 0, 10, 10).difference(holes)
+    facets = extrude(geometry, 0, 0.5)
+    assert isClosed(facets)
+    assert np.isclose(volume(facets), geometry.area * 0.5)
+
+    mirrored = mirrorY(facets)
+    assert isClosed(mirrored)
+    assert np.isclose(volume(mirrored), geometry.area * 0.5)
+
+def test_writeBinaryStl(tmp_path):
+    facets = extrude(box(0, 0, 1, 1), 0, 1)
+    path = tmp_path / "cube.stl"
+    writeBinaryStl(str(path), facets)
+    data = path.read_bytes()
+    assert len(data) == 84 + 50 * len(facets)
+    assert int.from_bytes(data[80:84], "little") == len(facets) == 12
@@ -1,13 +1,24 @@
+import json
+import os
 import pytest
+import pcbnew
+import shapely
+import shapely.affinity
+import kikit.common
 from pcbnew import EDA_ANGLE, DEGREES_T
-from kikit.common import KiAngle
+from kikit.common import KiAngle, fromMm
+from kikit.defs import STROKE_T
 from kikit.panelize import (
     GridPlacerBase, BasicGridPosition, OddEvenRowsPosition,
-    OddEvenColumnPosition, OddEvenRowsColumnsPosition, prolongCut
+    OddEvenColumnPosition, OddEvenRowsColumnsPosition, prolongCut, Panel,
+    cropZoneByPolygon, polygonToZone, placementTransform
 )
-from shapely.geometry import LineString
+from kikit.substrate import shapePolyToShapely
+from shapely.geometry import LineString, Point, box
 from math import sqrt
 
+RESOURCES = os.path.join(os.path.dirname(__file__), "..", "resources")
+
 
 def test_grid_place_base_rotation():
     placer = GridPlacerBase()
@@ -70,3 +81,119 @@ def test_prolongCut():
 
     assert prolonged.coords[0] == pytest.approx((sqrt(2)/2 * -0.5, sqrt(2)/2 * -0.5))
     assert prolonged.coords[1] == pytest.approx((1 + sqrt(2)/2 * 0.5, 1 + sqrt(2)/2 * 0.5))
+
+def test_sourceNetClasses(tmp_path):
+    pro = tmp_path / "board.kicad_pro"
+    pro.write_text(json.dumps({"net_settings": {
+        "classes": [{"name": "Default"}, {"name": "Power", "nets": ["/VBAT"]}],
+        "netclass_patterns": [{"netclass": "Power", "pattern": "/VCC*"}]
+    }}))
+    panel = Panel(str(tmp_path / "panel.kicad_pcb"))
+    nets = ["/VCC", "/VCC3V3", "/VBAT", "/SDA", "/SCL"]
+    project, patterns, assignment, defaultNets = panel._sourceNetClasses(str(pro), nets)
+    assert patterns == [("Power", "/VCC*")]
+    assert assignment["Power"] == {"/VCC", "/VCC3V3"}
+    assert defaultNets == ["/SDA", "/SCL"]
+    # The second query is served from the cache
+    assert panel._sourceNetClasses(str(pro), nets)[0] is project
+    assert panel._sourceNetClasses(str(tmp_path / "missing.kicad_pro"), nets) is None
+
+
+def test_cropZoneByPolygon():
+    board = pcbnew.BOARD()
+    crop = box(0, 0, 1000000, 1000000)
+    shapely.prepare(crop)
+
+    inside = polygonToZone(box(100000, 100000, 200000, 200000), board)
+    assert cropZoneByPolygon(inside, crop) is None
+    assert shapePolyToShapely(inside.Outline()).equals(box(100000, 100000, 200000, 200000))
+
+    overlapping = polygonToZone(box(500000, 500000, 1500000, 1500000), board)
+    cropped = cropZoneByPolygon(overlapping, crop)
+    assert cropped.equals(box(500000, 500000, 1000000, 1000000))
+    assert shapePolyToShapely(overlapping.Outline()).equals(cropped)
+
+
+def test_placementTransform():
+    origin = pcbnew.VECTOR2I(3000000, -2000000)
+    translation = pcbnew.VECTOR2I(10000000, 5000000)
+    for angle in (0, 30, 90, 135, 180, 270):
+        rotation = EDA_ANGLE(angle, DEGREES_T)
+        matrix = placementTransform(rotation, origin, translation)
+
+        segment = pcbnew.PCB_SHAPE()
+        segment.SetShape(STROKE_T.S_SEGMENT)
+        segment.SetStart(pcbnew.VECTOR2I(7000000, 1000000))
+        segment.SetEnd(pcbnew.VECTOR2I(0, 0))
+        segment.Rotate(origin, rotation)
+        segment.Move(translation)
+
+        placed = shapely.affinity.affine_transform(Point(7000000, 1000000), matrix)
+        assert placed.x == pytest.approx(segment.GetStartX(), abs=2)
+        assert placed.y == pytest.approx(segment.GetStartY(), abs=2)
+
+
+def test_appendBoardReusesSourceBoard(tmp_path, monkeypatch):
+    scanned = []
+    itemBoxes, pointBoxes = kikit.common._itemBoxes, kikit.common._pointBoxes
+    def countItemBoxes(items):
+        scanned.append(len(items))
+        return itemBoxes(items)
+    def countPointBoxes(points):
+        scanned.append(None)
+        return pointBoxes(points)
+    monkeypatch.setattr(kikit.common, "_itemBoxes", countItemBoxes)
+    monkeypatch.setattr(kikit.common, "_pointBoxes", countPointBoxes)
+
+    multiboard = os.path.join(RESOURCES, "multiboard.kicad_pcb")
+    panel = Panel(str(tmp_path / "panel.kicad_pcb"))
+    panel.appendBoard(multiboard, pcbnew.VECTOR2I(0, 0))
+    firstScan = len(scanned)
+    assert firstScan > 0
+    panel.appendBoard(multiboard, pcbnew.VECTOR2I(fromMm(300), 0),
+                      rotationAngle=EDA_ANGLE(90, DEGREES_T))
+    # The second extraction queries the existing index
+    assert len(scanned) == firstScan
+    assert len(panel._sourceBoards) == 1
+
+    # The extraction works on copies, so the cached board stays intact
+    source, _ = panel._sourceBoard(multiboard)
+    fresh = pcbnew.LoadBoard(multiboard)
+    def footprints(board):
+        return [(f.GetReference(), f.GetPosition()) for f in board.GetFootprints()]
+    assert footprints(source) == footprints(fresh)
+
+
+def test_appendBoardsMatchesAppendBoard(tmp_path):
+    multiboard = os.path.join(RESOURCES, "multiboard.kicad_pcb")
+    conn = os.path.join(RESOURCES, "conn.kicad_pcb")
+    batch = [
+        {"filename": multiboard, "destination": pcbnew.VECTOR2I(0, 0)},
+        {"filename": conn, "destination": pcbnew.VECTOR2I(fromMm(300), 0),
+         "rotationAngle": EDA_ANGLE(90, DEGREES_T)},
+        {"filename": multiboard, "destination": pcbnew.VECTOR2I(0, fromMm(300)),
+         "rotationAngle": EDA_ANGLE(30, DEGREES_T)},
+    ]
+    serial = Panel(str(tmp_path / "serial.kicad_pcb"))
+    serialBoxes = [serial.appendBoard(**item) for item in batch]
+    parallel = Panel(str(tmp_path / "parallel.kicad_pcb"))
+    parallelBoxes = parallel.appendBoards(batch, jobs=2)
+
+    assert parallelBoxes == serialBoxes
+    def nets(panel):
+        return sorted(p.GetNetname() for f in panel.board.GetFootprints() for p in f.Pads()) + \
+               sorted(t.GetNetname() for t in panel.board.GetTracks())
+    assert nets(parallel) == nets(serial)
+    def refs(panel):
+        return sorted(f.GetReference() for f in panel.board.GetFootprints())
+    assert refs(parallel) == refs(serial)
+    # The arcs of the edges are approximated before the placement, not after
+    # it, so the substrates match only up to the approximation
+    assert len(parallel.substrates) == len(serial.substrates)
+    for p, s in zip(parallel.substrates, serial.substrates):
+        assert p.substrates.symmetric_difference(s.substrates).area <= 1e-4 * s.substrates.area
+    def zones(panel):
+        return [shapePolyToShapely(z.Outline()) for z in panel.board.Zones()]
+    assert len(zones(parallel)) == len(zones(serial))
+    for p, s in zip(zones(parallel), zones(serial)):
+        assert p.symmetric_difference(s).area <= 1e-4 * s.area
@@ -0,0 +1,59 @@
+import pytest
+from kikit.panelize_batch import readManifest, ManifestError
+
+def test_jsonManifest(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text("""[
+        // Comments are allowed
+        {
+            "input": "boards/a.kicad_pcb",
+            "output": "panels/a.kicad_pcb",
+            "preset": [":jlcTooling", "my.json"],
+            "layout": {"rows": 2, "cols": 2},
+            "cuts": "vcuts; clearance: 1mm"
+        }
+    ]""")
+    jobs = readManifest(str(manifest))
+    assert len(jobs) == 1
+    job = jobs[0]
+    assert job.input == str(tmp_path / "boards/a.kicad_pcb")
+    assert job.output == str(tmp_path / "panels/a.kicad_pcb")
+    assert job.presets == [":jlcTooling", str(tmp_path / "my.json")]
+    assert job.sections == {
+        "layout": {"rows": 2, "cols": 2},
+        "cuts": {"type": "vcuts", "clearance": "1mm"}
+    }
+
+def test_csvManifest(tmp_path):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(
+        "input,output,preset,layout\n"
+        "a.kicad_pcb,pa.kicad_pcb,:jlcTooling;my.json,grid; rows: 2\n"
+        "b.kicad_pcb,pb.kicad_pcb,,\n")
+    jobs = readManifest(str(manifest))
+    assert len(jobs) == 2
+    assert jobs[0].presets == [":jlcTooling", str(tmp_path / "my.json")]
+    assert jobs[0].sections == {"layout": {"type": "grid", "rows": "2"}}
+    assert jobs[1].presets == []
+    assert jobs[1].sections == {}
+
+def test_invalidManifest(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text('[{"input": "a.kicad_pcb"}]')
+    with pytest.raises(ManifestError):
+        readManifest(str(manifest))
+
+    manifest.write_text('[{"input": "a.kicad_pcb", "output": "b", "tbas": "full"}]')
+    with pytest.raises(ManifestError):
+        readManifest(str(manifest))
+
+def test_summaryPeakRss():
+    from kikit.panelize_batch import BatchResult, formatSummary
+    results = [
+        BatchResult("a.kicad_pcb", "pa.kicad_pcb", "ok", 1.5, peakRss=300 << 20),
+        BatchResult("b.kicad_pcb", "pb.kicad_pcb", "failed", 0.5, "Error")
+    ]
+    lines = formatSummary(results, 2).split("\n")
+    assert lines[1].endswith("300 MiB")
+    assert lines[2].endswith("n/a")
+    assert lines[-1].endswith("process peak RSS 300 MiB")
@@ -30,4 +30,14 @@ def test_merge():
     assert a == {"a": {
         "value": 43,
         "otherValue": 70
-    }}
\ No newline at end of file
+    }}
+
+def test_loadPresetIsCached(tmp_path):
+    path = tmp_path / "preset.json"
+    path.write_text('{"layout": {"rows": 2}}')
+
+    a = loadPreset(str(path))
+    # Mutating the loaded preset must not leak to the subsequent loads
+    mergePresets(a, {"layout": {"rows": 3}})
+    b = loadPreset(str(path))
+    assert b == {"layout": {"rows": 2}}
@@ -0,0 +1,98 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import pytest
+from kikit.serve import (validateJob, JobError, Job, JobServer, ServeClient,
+    makeHttpServer, QUEUED, RUNNING, DONE)
+
+def test_validateJob(tmp_path):
+    job = validateJob({"command": ["fab", "jlcpcb", "a.kicad_pcb", "out"],
+                       "cwd": str(tmp_path)})
+    assert job.command == ["fab", "jlcpcb", "a.kicad_pcb", "out"]
+    assert job.cwd == str(tmp_path)
+    assert job.status == QUEUED
+
+    with pytest.raises(JobError):
+        validateJob({"command": ["modify", "references"]})
+    with pytest.raises(JobError):
+        validateJob({"command": []})
+    with pytest.raises(JobError):
+        validateJob({"command": ["panelize"], "cwd": str(tmp_path / "missing")})
+
+def test_jobSummary():
+    job = Job(id="x", command=["export", "gerber", "a.kicad_pcb"], cwd="/")
+    summary = job.summary()
+    assert summary["runTime"] is None
+    assert summary["stage"] is None
+
+    job.started = job.submitted + 1
+    job.finished = job.submitted + 3
+    job.events.append({"stage": "save", "time": job.started})
+    summary = job.summary()
+    assert summary["queueTime"] == pytest.approx(1)
+    assert summary["runTime"] == pytest.approx(2)
+    assert summary["stage"] == "save"
+
+def test_eventsOutliveEviction():
+    jobServer = JobServer(workers=0, keepFinished=1)
+    job = Job(id="a", command=["fab"], cwd="/", status=RUNNING)
+    jobServer._jobs[job.id] = job
+    events = jobServer.events(job.id)
+    job.events.append({"stage": "layout", "time": 1})
+    assert next(events)["stage"] == "layout"
+
+    with jobServer._lock:
+        jobServer._finishJob(job, DONE)
+    # There are no workers, so the job fails immediately and evicts the first one
+    jobServer.submit(Job(id="b", command=["fab"], cwd="/"))
+    with pytest.raises(JobError):
+        jobServer.job("a")
+    last = next(events)
+    assert last["stage"] == "finished"
+    assert last["status"] == DONE
+    with pytest.raises(StopIteration):
+        next(events)
+
+@pytest.fixture
+def server():
+    jobServer = JobServer(workers=1)
+    jobServer.start()
+    httpServer = makeHttpServer(jobServer, port=0)
+    threading.Thread(target=httpServer.serve_forever, daemon=True).start()
+    address, port = httpServer.server_address[:2]
+    yield f"http://{address}:{port}"
+    httpServer.shutdown()
+    httpServer.server_close()
+    jobServer.stop()
+
+def test_serveJob(server, tmp_path):
+    client = ServeClient(server)
+    with pytest.raises(JobError):
+        client.submit(["modify", "references"])
+
+    job = client.submit(["export", "--help"], cwd=str(tmp_path))
+    assert job["status"] == QUEUED
+    job = client.wait(job["id"])
+    assert job["status"] == DONE
+    assert job["exitCode"] == 0
+    assert "Usage" in job["output"]
+    assert [j["id"] for j in client.jobs()] == [job["id"]]
+    assert client.status()["workers"] == 1
+
+def test_serveRejectsForeignRequests(server, tmp_path):
+    payload = json.dumps({"command": ["export", "--help"], "cwd": str(tmp_path)})
+    # A form post of a web page
+    request = urllib.request.Request(server + "/jobs", data=payload.encode("utf-8"),
+        method="POST", headers={"Content-Type": "text/plain"})
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(request)
+    assert e.value.code == 415
+    # DNS rebinding
+    request = urllib.request.Request(server + "/jobs", data=payload.encode("utf-8"),
+        method="POST", headers={"Content-Type": "application/json",
+                                "Host": "attacker.example.com"})
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(request)
+    assert e.value.code == 403
+    assert ServeClient(server).jobs() == []
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+from shapely.geometry import Polygon, box
+from kikit.stencil import printedStencilMesh
+
+def volume(facets):
+    return np.einsum("ij,ij->i", facets[:, 0],
+                     np.cross(facets[:, 1], facets[:, 2])).sum() / 6
+
+def test_printedStencilMeshHoles():
+    outline = box(0, 0, 10, 10)
+    paste = box(4, 4, 5, 5)
+    # A courtyard with a hole; only its exterior is cut out
+    courtyard = Polygon(box(10.5, 2, 11.5, 3).exterior.coords,
+                        [box(10.8, 2.3, 11.2, 2.7).exterior.coords])
+    thickness, frameHeight, frameWidth = 0.2, 1, 2
+    facets = printedStencilMesh(outline, paste, [courtyard], thickness,
+        frameHeight, frameWidth, 0, 0, False)
+
+    frameArea = outline.buffer(frameWidth).area - outline.area
+    # The holes reach only up to twice the thickness, like in the OpenSCAD
+    # model
+    expected = (outline.area - paste.area) * thickness + \
+               frameArea * (thickness + frameHeight) - 1 * 2 * thickness
+    assert volume(facets) == pytest.approx(expected, rel=1e-6)
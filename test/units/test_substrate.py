@@ -21,3 +21,44 @@ def test_biteBoundary():
 
     t5 = biteBoundary(l1, Point(1, 0.25), Point(1, 0.75), 0.1)
     assert t5 == LineString([(1, 0.25), (1, 0.75)])
+
+def test_revertTransformationIsPicklable():
+    import pickle
+    s = Substrate([])
+    s.translate((10, 20))
+    s.translate((1, 2))
+    restored = pickle.loads(pickle.dumps(s))
+    assert restored.backToSource((11, 22)) == (0, 0)
+
+def test_shapePolySetRoundtrip():
+    outer = Polygon([(0, 0), (100, 0), (100, 100), (0, 100)],
+                    holes=[[(10, 10), (20, 10), (20, 20), (10, 20)]])
+    other = Polygon([(200, 0), (300, 0), (300, 100.7)])
+    polySet = shapelyToShapePolySet(MultiPolygon([outer, other]))
+    assert polySet.OutlineCount() == 2
+    assert polySet.HoleCount(0) == 1
+    back = shapePolyToShapely(polySet)
+    assert back.geoms[0].equals(outer)
+    # Coordinates are truncated
+    assert back.geoms[1].equals(Polygon([(200, 0), (300, 0), (300, 100)]))
+    assert linechainToArray(linestringToKicad(outer.exterior)).tolist() == \
+        [[0, 0], [100, 0], [100, 100], [0, 100], [0, 0]]
+
+def test_compact():
+    s = Substrate([])
+    s.union(Polygon([(0, 0), (10, 0), (10, 10), (0, 10)]))
+    s.partitionLine = LineString([(0, -1), (10, -1)])
+    original = s.substrates
+
+    s.compact()
+    assert s.isCompact()
+    s.translate((5, 5))
+    assert s.isCompact()
+    # Reading the geometry doesn't make the substrate live again
+    assert s.substrates.equals(shapely.affinity.translate(original, 5, 5))
+    assert s.partitionLine.equals(LineString([(5, 4), (15, 4)]))
+    assert s.isCompact()
+    # Assigning it does
+    s.partitionLine = LineString([(0, 0), (1, 0)])
+    assert not s.isCompact()
+    assert s.substrates.equals(shapely.affinity.translate(original, 5, 5))